@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from reddit.models import (
     Group, Keyword, Subreddit, RedditPost, Classification, Reply, 
-    Notification, AIPersona, PerformanceMetrics, SystemConfig, Leaderboard
+    Notification, AIPersona, PerformanceMetrics, SystemConfig, Leaderboard, RedditAccount
 )
 from langagent.models import AILearningData, AIPromptTemplate, AIPerformanceMetrics
 
@@ -69,6 +69,7 @@ class ReplySerializer(serializers.ModelSerializer):
     post_title = serializers.CharField(source='post.title', read_only=True)
     post_url = serializers.CharField(source='post.url', read_only=True)
     display_content = serializers.SerializerMethodField()
+    outbox_state = serializers.SerializerMethodField()
     
     class Meta:
         model = Reply
@@ -79,12 +80,35 @@ class ReplySerializer(serializers.ModelSerializer):
             'post_title', 'post_url', 'confidence_score', 'requires_manual_approval',
             'edited_content', 'approved_by', 'approved_at',
             'marked_successful', 'marked_successful_at', 'marked_successful_by',
-            'success_notes', 'follow_up_sent', 'follow_up_content', 'follow_up_sent_at'
+            'success_notes', 'follow_up_sent', 'follow_up_content', 'follow_up_sent_at',
+            'outbox_state'
         ]
     
     def get_display_content(self, obj):
         """Return edited content if available, otherwise original content"""
         return obj.edited_content if obj.edited_content else obj.content
+    
+    def get_outbox_state(self, obj):
+        """Posting state once the reply is in the outbox (queued, in_flight, posted, failed)"""
+        entry = getattr(obj, 'outbox', None)
+        return entry.state if entry else None
+
+
+class RedditAccountSerializer(serializers.ModelSerializer):
+    subreddit_names = serializers.SlugRelatedField(source='subreddits', slug_field='name', many=True, read_only=True)
+    
+    class Meta:
+        model = RedditAccount
+        fields = [
+            'id', 'username', 'password', 'client_id', 'client_secret', 'is_active',
+            'requests_per_minute', 'cooldown_until', 'subreddits', 'subreddit_names',
+            'notes', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['cooldown_until', 'created_at', 'updated_at']
+        extra_kwargs = {
+            'password': {'write_only': True},
+            'client_secret': {'write_only': True},
+        }
 
 
 class NotificationSerializer(serializers.ModelSerializer):
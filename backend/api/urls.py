@@ -5,7 +5,7 @@ from .views import (
     ClassificationViewSet, ReplyViewSet, NotificationViewSet,
     AIPersonaViewSet, PerformanceMetricsViewSet, DashboardViewSet,
     SystemConfigViewSet, LeaderboardViewSet, AILearningDataViewSet,
-    AIPromptTemplateViewSet, AIPerformanceMetricsViewSet
+    AIPromptTemplateViewSet, AIPerformanceMetricsViewSet, RedditAccountViewSet
 )
 
 router = DefaultRouter()
@@ -15,6 +15,7 @@ router.register(r'subreddits', SubredditViewSet)
 router.register(r'posts', RedditPostViewSet)
 router.register(r'classifications', ClassificationViewSet)
 router.register(r'replies', ReplyViewSet)
+router.register(r'reddit-accounts', RedditAccountViewSet)
 router.register(r'notifications', NotificationViewSet)
 router.register(r'ai-personas', AIPersonaViewSet)
 router.register(r'performance-metrics', PerformanceMetricsViewSet)
@@ -6,7 +6,7 @@ from django.utils import timezone
 from datetime import timedelta
 from reddit.models import (
     Group, Keyword, Subreddit, RedditPost, Classification, Reply, 
-    Notification, AIPersona, PerformanceMetrics, SystemConfig, Leaderboard
+    Notification, AIPersona, PerformanceMetrics, SystemConfig, Leaderboard, RedditAccount
 )
 from langagent.models import AILearningData, AIPromptTemplate, AIPerformanceMetrics
 from .serializers import (
@@ -26,12 +26,20 @@ from .serializers import (
     LeaderboardSerializer,
     AILearningDataSerializer,
     AIPromptTemplateSerializer,
-    AIPerformanceMetricsSerializer
+    AIPerformanceMetricsSerializer,
+    RedditAccountSerializer
 )
 from django.shortcuts import get_object_or_404
-from reddit.poster import RedditPoster
+from reddit.outbox import enqueue_reply
+from reddit.accounts import AccountPool
 from reddit.fetcher import RedditFetcher
+from reddit.scheduler import PollScheduler, serialize_schedule_entry
+from reddit.claims import CLAIM_ORDER, HIGH_PRIORITY_THRESHOLD, classification_queue_stats
 from langagent.agent import RedditLeadAgent
+from langagent.cache import ClassificationCache
+from langagent.semantic import get_semantic_index
+from langagent.tokens import usage_by_subreddit
+from langagent.governor import get_openai_governor
 import subprocess
 import os
 
@@ -78,6 +86,18 @@ class SubredditViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(group_id=group_id)
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def schedule(self, request):
+        """Get the adaptive polling schedule for all active subreddits"""
+        scheduler = PollScheduler()
+        schedule = sorted(scheduler.compute_schedule(), key=lambda entry: entry['interval_minutes'])
+        return Response({
+            'min_interval_minutes': scheduler.min_interval,
+            'max_interval_minutes': scheduler.max_interval,
+            'polls_per_hour': round(sum(60 / entry['interval_minutes'] for entry in schedule), 1),
+            'subreddits': [serialize_schedule_entry(entry) for entry in schedule],
+        })
+
 
 class RedditPostViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = RedditPost.objects.all()
@@ -179,6 +199,52 @@ class RedditPostViewSet(viewsets.ReadOnlyModelViewSet):
         
         return Response({'status': 'follow_up_sent', 'reply_id': reply.id})
 
+    @action(detail=False, methods=['get'])
+    def classification_queue(self, request):
+        """Depth of the AI classification queue and age of its oldest posts"""
+        stats = classification_queue_stats()
+        stats['high_priority_threshold'] = HIGH_PRIORITY_THRESHOLD
+        stats['next'] = list(
+            RedditPost.objects.filter(classification__isnull=True)
+            .order_by(*CLAIM_ORDER)
+            .values('id', 'title', 'classification_priority', 'fetched_at', 'claimed_by')[:10]
+        )
+        return Response(stats)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Past posts most similar to this one in the semantic index"""
+        post = self.get_object()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=400)
+        leads_only = request.query_params.get('leads_only', 'false').lower() == 'true'
+        
+        try:
+            matches = get_semantic_index().similar(post, limit=limit, leads_only=leads_only)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+        
+        posts = RedditPost.objects.select_related('subreddit', 'classification').in_bulk(
+            [post_id for post_id, _ in matches]
+        )
+        results = []
+        for post_id, similarity in matches:
+            match = posts.get(post_id)
+            if match is None:
+                continue
+            classification = getattr(match, 'classification', None)
+            results.append({
+                'id': match.id,
+                'title': match.title,
+                'subreddit': match.subreddit.name,
+                'url': match.url,
+                'similarity': round(similarity, 4),
+                'is_opportunity': classification.is_opportunity if classification else None,
+            })
+        return Response(results)
+
     @action(detail=False, methods=['get'])
     def final_test(self, request):
         """Final test method at the end of the class"""
@@ -208,9 +274,14 @@ class ClassificationViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """Get classification cache totals, and hit/miss counters for the web process"""
+        return Response(ClassificationCache().stats())
+
 
 class ReplyViewSet(viewsets.ModelViewSet):
-    queryset = Reply.objects.all()
+    queryset = Reply.objects.select_related('post', 'outbox')
     serializer_class = ReplySerializer
     filterset_fields = ['status', 'requires_manual_approval']
     search_fields = ['content', 'post__title']
@@ -251,24 +322,19 @@ class ReplyViewSet(viewsets.ModelViewSet):
             post=reply.post
         )
         
-        # Post the reply to Reddit using RedditPoster
-        reddit_poster = RedditPoster()
-        try:
-            # Use edited content if available, otherwise use original content
-            content_to_post = reply.edited_content if reply.edited_content else reply.content
-            reply.content = content_to_post  # Update the main content with edited version
-            
-            success = reddit_poster._post_reply(reply)
-            if success:
-                return Response({'status': 'approved_and_posted', 'reply_id': reply.id})
-            else:
-                reply.status = 'rejected'  # Revert status on failure
-                reply.save()
-                return Response({'status': 'approved_failed_to_post', 'error': 'Failed to post to Reddit'}, status=500)
-        except Exception as e:
-            reply.status = 'rejected'  # Revert status on failure
+        # Queue the reply in the outbox; the dispatcher posts it at the
+        # account's next pacing slot, and approving twice doesn't post twice
+        if reply.edited_content:
+            reply.content = reply.edited_content
             reply.save()
-            return Response({'status': 'approved_failed_to_post', 'error': str(e)}, status=500)
+        entry, _ = enqueue_reply(reply)
+        return Response({
+            'status': 'approved_and_queued',
+            'reply_id': reply.id,
+            'outbox_id': entry.id,
+            'state': entry.state,
+            'available_at': entry.available_at,
+        }, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
@@ -301,6 +367,18 @@ class ReplyViewSet(viewsets.ModelViewSet):
         return Response({'status': 'content_edited'})
 
 
+class RedditAccountViewSet(viewsets.ModelViewSet):
+    queryset = RedditAccount.objects.prefetch_related('subreddits')
+    serializer_class = RedditAccountSerializer
+    filterset_fields = ['is_active']
+    search_fields = ['username']
+
+    @action(detail=False, methods=['get'])
+    def pool(self, request):
+        """Posting pool utilisation and per-account throughput"""
+        return Response(AccountPool().stats())
+
+
 class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
@@ -455,6 +533,7 @@ class DashboardViewSet(viewsets.ViewSet):
                 'posts_saved': len(saved_posts),
                 'posts_processed': processed_count,
                 'opportunities_found': Classification.objects.filter(is_opportunity=True).count(),
+                'subreddit_results': [result.as_dict() for result in fetcher.last_fetch_results],
                 'group': group_info
             })
             
@@ -528,6 +607,17 @@ class AIPerformanceMetricsViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(date__gte=cutoff_date)
         return queryset.order_by('-date')
 
+    @action(detail=False, methods=['get'])
+    def usage(self, request):
+        """Token usage, cost and latency of AI calls per subreddit"""
+        days = int(request.query_params.get('days', 7))
+        return Response(usage_by_subreddit(timezone.now() - timedelta(days=days)))
+
+    @action(detail=False, methods=['get'])
+    def governor(self, request):
+        """Current OpenAI concurrency limit, in-flight calls and circuit breaker state"""
+        return Response(get_openai_governor().stats())
+
 
 class AILearningDataViewSet(viewsets.ModelViewSet):
     queryset = AILearningData.objects.all()
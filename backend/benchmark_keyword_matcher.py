@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the compiled KeywordMatcher against the old per-post keyword scan.
+
+Runs against a throwaway in-memory SQLite database, so the legacy numbers are
+a best case: against the real Postgres server every per-post Keyword query
+also pays a network round-trip.
+"""
+import os
+import sys
+import random
+import time
+import django
+
+# Setup Django on a throwaway in-memory database
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'redditlead.settings')
+from django.conf import settings
+settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+django.setup()
+
+from django.core.management import call_command
+from reddit.models import Keyword
+from reddit.matcher import KeywordMatcher, HIGH_PRIORITY_KEYWORDS
+
+SAMPLE_KEYWORDS = [
+    'python developer', 'django', 'fastapi', 'chatbot', 'openai', 'gpt',
+    'scraper', 'web scraping', 'automation', 'dashboard', 'saas', 'mvp',
+    'landing page', 'shopify', 'wordpress', 'api integration', 'pdf',
+    'rag', 'vector database', 'data pipeline', 'etl', 'pandas', 'streamlit',
+    'telegram bot', 'discord bot', 'stripe', 'postgres', 'aws', 'docker',
+    'machine learning', 'computer vision', 'nlp', 'voice agent', 'crm',
+]
+
+FILLER_WORDS = (
+    'the quick brown fox jumps over lazy dog we are a small team looking '
+    'to ship something this month please read details below thanks in '
+    'advance for any pointers or recommendations about the approach'
+).split()
+
+
+def legacy_contains_keywords(text):
+    """The old _contains_keywords implementation, including its Keyword query"""
+    text_lower = text.lower()
+    matched_keywords = []
+    for keyword in Keyword.objects.filter(is_active=True):
+        if keyword.keyword.lower() in text_lower:
+            matched_keywords.append(keyword.keyword)
+    if matched_keywords:
+        return True
+    for keyword in HIGH_PRIORITY_KEYWORDS:
+        if keyword in text_lower:
+            return True
+    return False
+
+
+def make_posts(count, rng):
+    """Generate synthetic post bodies with a sprinkling of keywords"""
+    posts = []
+    for _ in range(count):
+        words = rng.choices(FILLER_WORDS, k=rng.randint(40, 400))
+        if rng.random() < 0.4:
+            words.insert(rng.randrange(len(words)), rng.choice(SAMPLE_KEYWORDS))
+        posts.append(' '.join(words))
+    return posts
+
+
+def time_per_post(func, posts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in posts:
+            func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(posts) / best
+
+
+def run_benchmark(post_count=5000, repeat=3):
+    call_command('migrate', verbosity=0)
+    Keyword.objects.bulk_create([Keyword(keyword=k) for k in SAMPLE_KEYWORDS])
+
+    posts = make_posts(post_count, random.Random(42))
+
+    build_start = time.perf_counter()
+    matcher = KeywordMatcher.from_active_keywords()
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    # Both implementations must agree before timing means anything
+    for text in posts:
+        assert bool(matcher.match(text)) == legacy_contains_keywords(text)
+
+    results = {
+        'legacy scan': time_per_post(legacy_contains_keywords, posts, repeat),
+        'compiled matcher': time_per_post(matcher.match, posts, repeat),
+    }
+
+    print(f"📊 Keyword matching throughput ({post_count} posts, "
+          f"{len(SAMPLE_KEYWORDS)} keywords + {len(HIGH_PRIORITY_KEYWORDS)} built-in)")
+    for name, posts_per_sec in results.items():
+        print(f"   {name:<18} {posts_per_sec:>12,.0f} posts/sec")
+    print(f"   speedup            {results['compiled matcher'] / results['legacy scan']:>12.1f}x")
+    print(f"   matcher build time {build_ms:>12.2f} ms (once per fetch run)")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    run_benchmark(count)
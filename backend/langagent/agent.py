@@ -1,97 +1,77 @@
-import os
 import json
 import logging
 import random
-from openai import OpenAI
-from decouple import config
-from reddit.models import ReplyTemplate, AIPersona
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .cache import ClassificationCache, content_hash
+from .governor import GOVERNOR_ERRORS, create_openai_client, get_openai_governor
+from .prefilter import LeadPreFilter
+from .prompts import get_compiled_prompts
+from .tokens import count_tokens, estimate_cost, fit_to_budget
 
 logger = logging.getLogger(__name__)
 
 class RedditLeadAgent:
-    def __init__(self):
-        self.client = OpenAI(api_key=config('OPENAI_API_KEY'))
-        self.default_persona = AIPersona.objects.filter(is_active=True).first()
+    def __init__(self, defer_replies=False):
+        # Retries are handled by the shared governor, not the client
+        self.client = create_openai_client(max_retries=0, timeout=settings.OPENAI_TIMEOUT_SECONDS)
+        self.governor = get_openai_governor()
+        self.classification_cache = ClassificationCache()
+        self.prefilter = LeadPreFilter()
+        self.max_content_tokens = self.get_max_content_tokens()
+        self.classification_tiers = self.get_classification_tiers()
+        self.escalation_band = self.get_escalation_band()
+        self.reply_model = self.get_reply_model()
+        # Queue reply drafting on the 'reply' Celery queue instead of doing it inline
+        self.defer_replies = defer_replies
     
-    def classify_post(self, post):
-        """Classify if a Reddit post is an opportunity"""
+    def classify_post(self, post, start_tier=0):
+        """Classify if a Reddit post is an opportunity.
+        
+        Starts on the model tier `start_tier` (the cheapest by default) and
+        re-runs on the next tier while the response can't be parsed or its
+        confidence falls inside the uncertainty band. Returns None on errors,
+        except when the OpenAI governor gives up (GOVERNOR_ERRORS): those are
+        raised so callers stop instead of sending more requests.
+        """
         try:
-            # Create classification prompt
-            classification_prompt = f"""
-            Analyze this Reddit post and determine if it's a freelance/project opportunity.
-            
-            Post Title: {post.title}
-            Post Content: {post.content}
-            
-            Always respond with valid JSON in this exact format:
-            {{
-                "is_opportunity": true/false,
-                "confidence_score": 0.0-1.0,
-                "priority": "high/medium/low",
-                "intent": "brief description of what they want",
-                "services_needed": "list of services/technologies",
-                "budget_amount": "estimated budget or budget range",
-                "urgency": "high/medium/low",
-                "summary": "brief summary of the opportunity"
-            }}
-            
-            Guidelines:
-            - Look for keywords like "need help", "looking for", "hire", "freelancer", "developer", "build", "create"
-            - Consider if they're asking for technical work, consulting, or development
-            - Assess if they have a clear project description
-            - Determine if they seem serious about hiring
-            - Consider subreddit rules (avoid platform links in replies)
-            
-            SKILL-SPECIFIC FILTERING:
-            - HIGH PRIORITY: AI automation, LangChain, LangGraph, RAG, PDF chat, voice agents, web development, Django, Next.js, React
-            - MEDIUM PRIORITY: Data analysis, business intelligence, analytics, reporting, API development
-            - LOW PRIORITY: General programming, basic automation
-            - REJECT: Voice recording, transcription, translation, manual data entry, non-technical tasks
-            
-            Only classify as opportunity if it matches your core skills (AI automation, web development, data analysis)
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that analyzes Reddit posts for freelance opportunities. Always respond with valid JSON."},
-                    {"role": "user", "content": classification_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=300
-            )
-            
-            response_text = response.choices[0].message.content.strip()
+            # Reuse the result for identical content (crossposts, reposts)
+            cached = self._cached_classification(post)
+            if cached:
+                return cached
             
-            # Clean up response (remove markdown if present)
-            if response_text.startswith('```json'):
-                response_text = response_text.replace('```json', '').replace('```', '').strip()
-            elif response_text.startswith('```'):
-                response_text = response_text.replace('```', '').strip()
+            # Static instructions first so the provider can cache the prefix
+            content, truncated = self._prompt_content(post)
+            messages = get_compiled_prompts().classification_messages(post, content)
             
-            # Parse JSON response
-            try:
-                classification_data = json.loads(response_text)
-                
-                # Create classification record
-                from reddit.models import Classification
-                classification = Classification.objects.create(
-                    post=post,
-                    is_opportunity=classification_data.get('is_opportunity', False),
-                    confidence_score=classification_data.get('confidence_score', 0.0),
-                    priority=classification_data.get('priority', 'low'),
-                    intent=classification_data.get('intent', ''),
-                    services_needed=classification_data.get('services_needed', ''),
-                    budget_amount=classification_data.get('budget_amount', ''),
-                    urgency_level=classification_data.get('urgency', 'low'),
-                    summary=classification_data.get('summary', '')
+            tiers = self.classification_tiers
+            for tier in range(min(start_tier, len(tiers) - 1), len(tiers)):
+                model = tiers[tier]
+                response = self._chat(
+                    'classification',
+                    [post],
+                    messages=messages,
+                    model=model,
+                    truncated_post_ids={post.id} if truncated else (),
+                    temperature=0.3,
+                    max_tokens=300
                 )
                 
-                logger.info(f"Classified post {post.id} as opportunity: {classification.is_opportunity}")
-                return classification
+                response_text = response.choices[0].message.content.strip()
+                classification_data = self._parse_classification(response_text)
                 
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON response: {e}")
+                if tier < len(tiers) - 1 and self._should_escalate(classification_data):
+                    self._record_tier_outcome(model, escalated=True, failed=classification_data is None)
+                    logger.info(f"Escalating post {post.id} from {model} to {tiers[tier + 1]}")
+                    continue
+                self._record_tier_outcome(model, failed=classification_data is None)
+                break
+            
+            if classification_data is None:
                 # Create default classification
                 from reddit.models import Classification
                 classification = Classification.objects.create(
@@ -103,29 +83,292 @@ class RedditLeadAgent:
                     services_needed='',
                     budget_amount='',
                     urgency_level='low',
-                    summary='Classification failed'
+                    summary='Classification failed',
+                    classified_by=model,
+                    model_tier=tier,
+                    escalated=tier > 0
                 )
                 return classification
+            
+            classification = self._create_classification(
+                post, classification_data, model=model, tier=tier, escalated=tier > 0
+            )
+            self._remember_classification(post, classification)
+            
+            logger.info(f"Classified post {post.id} with {model} as opportunity: {classification.is_opportunity}")
+            return classification
                 
+        except GOVERNOR_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error classifying post {post.id}: {e}")
             return None
     
+    def _parse_classification(self, response_text):
+        """Parsed classification dict, or None if the response isn't a JSON object"""
+        try:
+            classification_data = self._parse_json_response(response_text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON response: {e}")
+            return None
+        return classification_data if isinstance(classification_data, dict) else None
+    
+    def _should_escalate(self, classification_data):
+        """True if a result should be re-run on a larger model"""
+        if classification_data is None:
+            return True
+        try:
+            confidence = float(classification_data.get('confidence_score', 0.0))
+        except (TypeError, ValueError):
+            return True
+        return self.escalation_band[0] <= confidence <= self.escalation_band[1]
+    
+    def classify_posts_batch(self, posts):
+        """Classify several posts with one request, sharing the instruction block.
+        
+        Returns a dict of post id -> Classification (or None). Cached content
+        is cloned without a request and duplicate content is only sent once.
+        Posts missing from the response, or with an unusable entry, are
+        retried one at a time with classify_post; if the whole response is
+        malformed every post in the batch falls back that way. GOVERNOR_ERRORS
+        are raised rather than falling back.
+        """
+        results = {}
+        pending_posts = []
+        for post in posts:
+            cached = self._cached_classification(post)
+            if cached:
+                results[post.id] = cached
+            else:
+                pending_posts.append(post)
+        
+        # Send each distinct content once; duplicates are cloned from the cache afterwards
+        unique_posts = {}
+        duplicate_posts = []
+        for post in pending_posts:
+            key = content_hash(post.title, post.content)
+            if key in unique_posts:
+                duplicate_posts.append(post)
+            else:
+                unique_posts[key] = post
+        
+        results.update(self._classify_uncached_batch(list(unique_posts.values())))
+        for post in duplicate_posts:
+            results[post.id] = self.classify_post(post)
+        
+        return results
+    
+    def _classify_uncached_batch(self, posts):
+        """Send one batch classification request, falling back per post on failures"""
+        if not posts:
+            return {}
+        if len(posts) == 1:
+            return {posts[0].id: self.classify_post(posts[0])}
+        
+        results = {}
+        escalated_posts = {}
+        try:
+            contents = {post.id: self._prompt_content(post) for post in posts}
+            messages = get_compiled_prompts().batch_classification_messages(
+                posts, {post_id: content for post_id, (content, _) in contents.items()}
+            )
+            
+            model = self.classification_tiers[0]
+            response = self._chat(
+                'classification',
+                posts,
+                model=model,
+                messages=messages,
+                truncated_post_ids={post_id for post_id, (_, truncated) in contents.items() if truncated},
+                temperature=0.3,
+                max_tokens=300 * len(posts)
+            )
+            
+            response_text = response.choices[0].message.content.strip()
+            entries = self._parse_json_response(response_text)
+            if not isinstance(entries, list):
+                raise ValueError("Batch response is not a JSON array")
+            
+            posts_by_id = {post.id: post for post in posts}
+            for entry in entries:
+                try:
+                    post = posts_by_id.get(int(entry.get('post_id')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if post is None or post.id in results or post.id in escalated_posts:
+                    continue
+                if len(self.classification_tiers) > 1 and self._should_escalate(entry):
+                    self._record_tier_outcome(model, escalated=True)
+                    escalated_posts[post.id] = post
+                    continue
+                try:
+                    # A savepoint, so a bad entry doesn't break a surrounding transaction for the fallback
+                    with transaction.atomic():
+                        results[post.id] = self._create_classification(post, entry, model=model, tier=0)
+                    self._remember_classification(post, results[post.id])
+                    self._record_tier_outcome(model)
+                    logger.info(f"Classified post {post.id} with {model} as opportunity: {results[post.id].is_opportunity}")
+                except Exception as e:
+                    logger.error(f"Invalid batch classification entry for post {post.id}: {e}")
+                    
+        except GOVERNOR_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Batch classification failed for {len(posts)} posts: {e}")
+        
+        # Uncertain answers go straight to the next tier, one post at a time
+        for post in escalated_posts.values():
+            results[post.id] = self.classify_post(post, start_tier=1)
+        
+        failed_posts = [post for post in posts if post.id not in results and post.id not in escalated_posts]
+        if failed_posts:
+            logger.warning(f"Falling back to single classification for {len(failed_posts)} posts")
+        for post in failed_posts:
+            results[post.id] = self.classify_post(post)
+        
+        return results
+    
+    def _prompt_content(self, post):
+        """Post body cut to the content token budget; returns (content, truncated)"""
+        content, truncated = fit_to_budget(post.content, self.max_content_tokens)
+        if truncated:
+            logger.info(f"Truncated content of post {post.id} to {self.max_content_tokens} tokens")
+        return content, truncated
+    
+    def _chat(self, call_type, posts, messages, model="gpt-4", truncated_post_ids=(), **kwargs):
+        """Send a chat completion and record its token usage and latency against posts"""
+        started = time.monotonic()
+        response = self.governor.chat_completion(self.client, model=model, messages=messages, **kwargs)
+        latency_ms = (time.monotonic() - started) * 1000
+        
+        try:
+            self._record_usage(call_type, posts, messages, response, model, latency_ms, truncated_post_ids)
+            self._record_call_metrics(call_type, model, latency_ms, len(posts))
+        except Exception as e:
+            logger.error(f"Error recording AI usage: {e}")
+        return response
+    
+    def _metrics_row(self, call_type, model):
+        from .models import AIPerformanceMetrics
+        today = timezone.now().date()
+        try:
+            metrics, _ = AIPerformanceMetrics.objects.get_or_create(date=today, template_type=call_type, model=model)
+        except IntegrityError:
+            # Another worker created today's row first
+            metrics = AIPerformanceMetrics.objects.get(date=today, template_type=call_type, model=model)
+        return AIPerformanceMetrics.objects.filter(pk=metrics.pk)
+    
+    def _record_call_metrics(self, call_type, model, latency_ms, post_count=1):
+        """Count a call's posts against today's per-model metrics and fold in its latency"""
+        self._metrics_row(call_type, model).update(
+            avg_response_time=(
+                (F('avg_response_time') * F('total_requests') + latency_ms * post_count)
+                / (F('total_requests') + post_count)
+            ),
+            total_requests=F('total_requests') + post_count,
+        )
+    
+    def _record_tier_outcome(self, model, escalated=False, failed=False):
+        """Record whether a classification tier's answer was kept, escalated or unusable"""
+        try:
+            if failed:
+                changes = {'failed_requests': F('failed_requests') + 1}
+            elif escalated:
+                changes = {}
+            else:
+                changes = {'successful_requests': F('successful_requests') + 1}
+            if escalated:
+                changes['escalated_requests'] = F('escalated_requests') + 1
+            self._metrics_row('classification', model).update(**changes)
+        except Exception as e:
+            logger.error(f"Error recording tier metrics for {model}: {e}")
+    
+    def _record_usage(self, call_type, posts, messages, response, model, latency_ms, truncated_post_ids):
+        """Store one AIUsageRecord per post, splitting a shared call's tokens by post length"""
+        from .models import AIUsageRecord
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', None)
+        if prompt_tokens is None:
+            prompt_tokens = sum(count_tokens(message['content'], model) for message in messages)
+        completion_tokens = getattr(usage, 'completion_tokens', None)
+        if completion_tokens is None:
+            completion_tokens = count_tokens(response.choices[0].message.content or '', model)
+        
+        weights = [len(post.title) + min(len(post.content), self.max_content_tokens * 4) + 1 for post in posts]
+        total_weight = sum(weights)
+        records = []
+        for post, weight in zip(posts, weights):
+            post_prompt_tokens = round(prompt_tokens * weight / total_weight)
+            post_completion_tokens = round(completion_tokens / len(posts))
+            records.append(AIUsageRecord(
+                post=post,
+                subreddit=post.subreddit.name,
+                call_type=call_type,
+                model=model,
+                prompt_tokens=post_prompt_tokens,
+                completion_tokens=post_completion_tokens,
+                cost_usd=estimate_cost(model, post_prompt_tokens, post_completion_tokens),
+                latency_ms=latency_ms,
+                batch_size=len(posts),
+                content_truncated=post.id in truncated_post_ids,
+            ))
+        AIUsageRecord.objects.bulk_create(records)
+    
+    def _cached_classification(self, post):
+        try:
+            return self.classification_cache.lookup(post)
+        except Exception as e:
+            logger.error(f"Classification cache lookup failed for post {post.id}: {e}")
+            return None
+    
+    def _remember_classification(self, post, classification):
+        try:
+            self.classification_cache.store(post, classification)
+        except Exception as e:
+            logger.error(f"Error caching classification for post {post.id}: {e}")
+    
+    def _parse_json_response(self, response_text):
+        """Parse a JSON model response, tolerating markdown code fences"""
+        # Clean up response (remove markdown if present)
+        if response_text.startswith('```json'):
+            response_text = response_text.replace('```json', '').replace('```', '').strip()
+        elif response_text.startswith('```'):
+            response_text = response_text.replace('```', '').strip()
+        
+        return json.loads(response_text)
+    
+    def _create_classification(self, post, classification_data, model='gpt-4', tier=None, escalated=False):
+        """Create the Classification record for a post from parsed model output"""
+        from reddit.models import Classification
+        return Classification.objects.create(
+            post=post,
+            is_opportunity=classification_data.get('is_opportunity', False),
+            confidence_score=classification_data.get('confidence_score', 0.0),
+            priority=classification_data.get('priority', 'low'),
+            intent=classification_data.get('intent', ''),
+            services_needed=classification_data.get('services_needed', ''),
+            budget_amount=classification_data.get('budget_amount', ''),
+            urgency_level=classification_data.get('urgency', 'low'),
+            summary=classification_data.get('summary', ''),
+            classified_by=model,
+            model_tier=tier,
+            escalated=escalated
+        )
+    
     def generate_reply(self, post, classification):
         """Generate a reply for a Reddit post using dynamic templates"""
         try:
-            # Get AI persona
-            persona = self.default_persona
+            prompts = get_compiled_prompts()
             
             # Determine template type based on classification
             template_type = self._determine_template_type(classification)
             
             # Get multiple templates for the type and randomly select one
-            templates = self._get_reply_templates(template_type)
+            templates = prompts.reply_templates.get(template_type, [])
             
             if not templates:
                 # Fallback to general templates
-                templates = self._get_reply_templates('general')
+                templates = prompts.reply_templates.get('general', [])
             
             if templates:
                 # Randomly select a template
@@ -138,41 +381,14 @@ class RedditLeadAgent:
                     classification
                 )
                 
-                # Create reply prompt with the filled template
-                reply_prompt = f"""
-                Generate a natural, helpful reply to this Reddit post. The post is classified as an opportunity.
-                
-                Post Title: {post.title}
-                Post Content: {post.content}
-                Opportunity Summary: {classification.summary}
-                Services Needed: {classification.services_needed}
-                
-                Use this template as a base but adapt it naturally:
-                {filled_content}
-                
-                Guidelines:
-                1. Be helpful and professional
-                2. Show understanding of their needs
-                3. Offer relevant expertise
-                4. Keep it concise but informative
-                5. Sound natural and human-like
-                6. Don't be overly promotional
-                7. Make sure the reply flows naturally
-                """
-                
-                if persona:
-                    reply_prompt += f"\n\nPersona Style: {persona.style}"
-                    if persona.include_portfolio and persona.portfolio_url:
-                        reply_prompt += f"\nInclude portfolio link: {persona.portfolio_url}"
-                    if persona.include_cta:
-                        reply_prompt += f"\nInclude call-to-action: {persona.cta_text}"
-                
-                response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful freelancer responding to Reddit posts. Be genuine and professional."},
-                        {"role": "user", "content": reply_prompt}
-                    ],
+                # Persona and guidelines are the cached prefix; the post and template come last
+                content, truncated = self._prompt_content(post)
+                response = self._chat(
+                    'reply_generation',
+                    [post],
+                    model=self.reply_model,
+                    messages=prompts.reply_messages(post, content, classification, filled_content),
+                    truncated_post_ids={post.id} if truncated else (),
                     temperature=0.7,
                     max_tokens=400
                 )
@@ -234,17 +450,6 @@ I'd love to discuss your project requirements!"""
         else:
             return 'general'
     
-    def _get_reply_templates(self, template_type):
-        """Get reply templates for the given type"""
-        try:
-            return list(ReplyTemplate.objects.filter(
-                template_type=template_type,
-                is_active=True
-            ))
-        except Exception as e:
-            logger.error(f"Error fetching reply templates for type {template_type}: {e}")
-            return []
-    
     def _fill_template_placeholders(self, template_content, post, classification):
         """Fill dynamic placeholders in template content"""
         filled_content = template_content
@@ -300,35 +505,165 @@ I'd love to discuss your project requirements!"""
     def process_post(self, post):
         """Process a Reddit post through classification and reply generation"""
         try:
-            # Classify the post
-            classification = self.classify_post(post)
-            if not classification:
-                return None
-            
-            # Generate reply if it's an opportunity
-            reply = None
-            if classification.is_opportunity and classification.confidence_score > 0.5:
-                reply = self.generate_reply(post, classification)
-            
-            return {
-                'classification': classification,
-                'reply': reply
-            }
+            # Reject obvious non-leads locally, classify the rest
+            result = self.prefilter.score(post)
+            if result.rejected:
+                classification = self.prefilter.reject(post, result)
+            else:
+                classification = self.classify_post(post)
+                self._record_prefilter_scores([classification], {post.id: result.score})
+            return self._finish_post(post, classification)
             
+        except GOVERNOR_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error processing post {post.id}: {e}")
             return None
     
-    def process_unclassified_posts(self):
-        """Process all posts that haven't been classified yet"""
-        from reddit.models import RedditPost
-        unclassified_posts = RedditPost.objects.filter(classification__isnull=True)
+    def _finish_post(self, post, classification):
+        """Generate a reply for a classified post if it's a confident opportunity"""
+        if not classification:
+            return None
+        
+        # Generate reply if it's an opportunity
+        reply = None
+        if classification.is_opportunity and classification.confidence_score > 0.5:
+            if self.defer_replies:
+                self._enqueue_reply(classification)
+            else:
+                reply = self.generate_reply(post, classification)
         
+        return {
+            'classification': classification,
+            'reply': reply
+        }
+    
+    def _enqueue_reply(self, classification):
+        from reddit.tasks import generate_post_reply
+        try:
+            generate_post_reply.delay(classification.id)
+        except Exception as e:
+            logger.error(f"Error queueing reply for post {classification.post_id}, drafting it inline: {e}")
+            self.generate_reply(classification.post, classification)
+    
+    def _record_prefilter_scores(self, classifications, scores):
+        """Store the pre-filter score on classifications made after the post passed it"""
+        from reddit.models import Classification
+        scored = []
+        for classification in classifications:
+            if classification and classification.post_id in scores:
+                classification.prefilter_score = scores[classification.post_id]
+                scored.append(classification)
+        try:
+            Classification.objects.bulk_update(scored, ['prefilter_score'])
+        except Exception as e:
+            logger.error(f"Error saving pre-filter scores: {e}")
+    
+    def get_classification_batch_size(self):
+        from reddit.models import SystemConfig
+        try:
+            return max(1, int(SystemConfig.get_value('ai_classification_batch_size', 5)))
+        except (TypeError, ValueError):
+            return 5
+    
+    def get_classification_tiers(self):
+        """Classification models from cheapest to most capable"""
+        from reddit.models import SystemConfig
+        tiers = SystemConfig.get_value('ai_classification_tiers', 'gpt-4o-mini,gpt-4')
+        return [model.strip() for model in tiers.split(',') if model.strip()] or ['gpt-4']
+    
+    def get_escalation_band(self):
+        """Confidence range (inclusive) in which a tier's answer is re-run on the next tier"""
+        from reddit.models import SystemConfig
+        try:
+            return (
+                float(SystemConfig.get_value('ai_escalation_band_low', 0.3)),
+                float(SystemConfig.get_value('ai_escalation_band_high', 0.7)),
+            )
+        except (TypeError, ValueError):
+            return (0.3, 0.7)
+    
+    def get_reply_model(self):
+        from reddit.models import SystemConfig
+        return SystemConfig.get_value('ai_reply_model', 'gpt-4')
+    
+    def get_max_content_tokens(self):
+        from reddit.models import SystemConfig
+        try:
+            return max(50, int(SystemConfig.get_value('ai_max_content_tokens', 1500)))
+        except (TypeError, ValueError):
+            return 1500
+    
+    def get_max_in_flight(self):
+        from reddit.models import SystemConfig
+        try:
+            return max(1, int(SystemConfig.get_value('ai_max_in_flight', 4)))
+        except (TypeError, ValueError):
+            return 4
+    
+    def process_unclassified_posts(self, max_in_flight=None, claimer=None):
+        """Process all posts that haven't been classified yet.
+        
+        Posts are claimed in classification batches (see reddit.claims), so
+        any number of workers can drain the backlog at once without
+        classifying the same post twice. Up to max_in_flight batches run at
+        once on a thread pool; each thread keeps claiming until nothing is left.
+        """
+        from reddit.claims import PostClaimer
+        claimer = claimer or PostClaimer()
+        if max_in_flight is None:
+            max_in_flight = self.get_max_in_flight()
+        
+        if max_in_flight > 1:
+            with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='ai-classify') as executor:
+                processed_count = sum(executor.map(
+                    lambda _: self._drain_claims_in_worker(claimer), range(max_in_flight)
+                ))
+        else:
+            processed_count = self._drain_claims(claimer)
+        
+        logger.info(f"Processed {processed_count} unclassified posts")
+        return processed_count
+    
+    def _drain_claims(self, claimer):
+        """Claim and process batches until no unleased unclassified posts remain"""
+        batch_size = self.get_classification_batch_size()
         processed_count = 0
-        for post in unclassified_posts:
-            result = self.process_post(post)
+        while True:
+            posts = claimer.claim(batch_size)
+            if not posts:
+                return processed_count
+            try:
+                processed_count += self._process_batch(posts)
+            finally:
+                claimer.finish(posts)
+    
+    def _drain_claims_in_worker(self, claimer):
+        """Thread pool entry point for _drain_claims"""
+        from django.db import connection
+        try:
+            return self._drain_claims(claimer)
+        finally:
+            # Worker threads open their own DB connections; don't leak them
+            connection.close()
+    
+    def _process_batch(self, posts):
+        """Classify and reply to a batch of posts; return how many were processed"""
+        processed_count = 0
+        if len(posts) == 1:
+            return 1 if self.process_post(posts[0]) else 0
+        
+        passed_posts, scores, classifications = self.prefilter.split(posts)
+        llm_classifications = self.classify_posts_batch(passed_posts)
+        self._record_prefilter_scores(llm_classifications.values(), scores)
+        classifications.update(llm_classifications)
+        for post in posts:
+            try:
+                result = self._finish_post(post, classifications.get(post.id))
+            except Exception as e:
+                logger.error(f"Error processing post {post.id}: {e}")
+                result = None
             if result:
                 processed_count += 1
         
-        logger.info(f"Processed {processed_count} unclassified posts")
-        return processed_count 
\ No newline at end of file
+        return processed_count
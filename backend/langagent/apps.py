@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class LangagentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'langagent'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from reddit.models import AIPersona, ReplyTemplate
+        from .models import AIPromptTemplate
+        from .prompts import invalidate_prompts
+
+        # Static prompt prefixes are built from these rows
+        for model in (AIPersona, ReplyTemplate, AIPromptTemplate):
+            post_save.connect(invalidate_prompts, sender=model, dispatch_uid=f'invalidate_prompts_{model.__name__}')
+            post_delete.connect(invalidate_prompts, sender=model, dispatch_uid=f'invalidate_prompts_delete_{model.__name__}')
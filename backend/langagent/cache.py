@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import ClassificationCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Fields copied between Classification rows and cache entries
+CACHED_FIELDS = [
+    'is_opportunity', 'priority', 'confidence_score', 'summary', 'intent',
+    'budget_mentioned', 'budget_amount', 'services_needed', 'urgency_level',
+]
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def content_hash(title, content):
+    """Hash of title + content, normalized so crossposts and reposts collide.
+
+    Case, punctuation and whitespace differences are ignored.
+    """
+    normalized = []
+    for text in (title or '', content or ''):
+        text = unicodedata.normalize('NFKC', text).lower()
+        normalized.append(' '.join(_NON_WORD.sub(' ', text).split()))
+    return hashlib.sha256('\n'.join(normalized).encode('utf-8')).hexdigest()
+
+
+class ClassificationCache:
+    """Database-backed cache of classification results keyed by content_hash.
+
+    Entries expire after `ttl_hours`, and the table is trimmed to `max_entries`
+    (least recently used first) whenever a new entry is stored.
+    """
+
+    # Counters for this process only (each worker and the web server has its
+    # own); hit_count on the entries is the total across all of them
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    def __init__(self, ttl_hours=None, max_entries=None):
+        from reddit.models import SystemConfig
+
+        self.enabled = SystemConfig.get_value('classification_cache_enabled', 'true').lower() == 'true'
+        self.ttl_hours = ttl_hours or float(SystemConfig.get_value('classification_cache_ttl_hours', 168))
+        self.max_entries = max_entries or int(SystemConfig.get_value('classification_cache_max_entries', 10000))
+
+    @classmethod
+    def _count(cls, hit):
+        with cls._lock:
+            if hit:
+                cls.hits += 1
+            else:
+                cls.misses += 1
+
+    def _fresh_entries(self):
+        return ClassificationCacheEntry.objects.filter(
+            created_at__gte=timezone.now() - timedelta(hours=self.ttl_hours)
+        )
+
+    def lookup(self, post):
+        """Return a new Classification cloned from the cache for post, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        key = content_hash(post.title, post.content)
+        entry = self._fresh_entries().filter(content_hash=key).first()
+        if entry is None:
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        ClassificationCacheEntry.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1,
+            last_hit_at=timezone.now(),
+        )
+
+        from reddit.models import Classification
+        classification = Classification.objects.create(
+            post=post,
+            classified_by='cache',
+            **{field: getattr(entry, field) for field in CACHED_FIELDS}
+        )
+        logger.info(f"Classification cache hit for post {post.id}")
+        return classification
+
+    def store(self, post, classification):
+        """Remember a classification for every future post with the same content"""
+        if not self.enabled:
+            return
+
+        key = content_hash(post.title, post.content)
+        values = {field: getattr(classification, field) for field in CACHED_FIELDS}
+        try:
+            entry, created = ClassificationCacheEntry.objects.update_or_create(
+                content_hash=key,
+                defaults={**values, 'created_at': timezone.now()},
+            )
+        except IntegrityError:
+            # Another worker stored the same content first
+            return
+
+        if created:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        cutoff = timezone.now() - timedelta(hours=self.ttl_hours)
+        expired, _ = ClassificationCacheEntry.objects.filter(created_at__lt=cutoff).delete()
+
+        overflow = ClassificationCacheEntry.objects.count() - self.max_entries
+        evicted = 0
+        if overflow > 0:
+            stale_ids = list(
+                ClassificationCacheEntry.objects
+                .order_by(F('last_hit_at').asc(nulls_first=True), 'created_at')
+                .values_list('id', flat=True)[:overflow]
+            )
+            evicted, _ = ClassificationCacheEntry.objects.filter(id__in=stale_ids).delete()
+
+        if expired or evicted:
+            logger.info(f"Classification cache evicted {expired} expired and {evicted} overflow entries")
+        return expired + evicted
+
+    def stats(self):
+        """Hit/miss counters for this process (process_*) plus totals stored in the database"""
+        with self._lock:
+            hits, misses = ClassificationCache.hits, ClassificationCache.misses
+        lookups = hits + misses
+        return {
+            'enabled': self.enabled,
+            'process_hits': hits,
+            'process_misses': misses,
+            'process_hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'entries': ClassificationCacheEntry.objects.count(),
+            'total_hits': ClassificationCacheEntry.objects.aggregate(total=Sum('hit_count'))['total'] or 0,
+            'ttl_hours': self.ttl_hours,
+            'max_entries': self.max_entries,
+        }
@@ -0,0 +1,75 @@
+import re
+import zlib
+import numpy as np
+from django.conf import settings
+from .governor import create_openai_client
+
+# Keep requests well under the embedding model's input limit
+MAX_EMBEDDING_CHARS = 8000
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def post_text(post):
+    """Text embedded for a post"""
+    return f"{post.title}\n{post.content}"[:MAX_EMBEDDING_CHARS]
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class HashingEmbedder:
+    """Deterministic local embedder for tests and offline use.
+
+    Unigrams and bigrams are hashed into a fixed number of signed buckets
+    (the "hashing trick"), so the same text always gets the same vector and
+    texts sharing words get a positive cosine similarity. No network calls.
+    """
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+        self.name = f'hashing-{dimensions}'
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(text.lower())
+            features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode('utf-8'))
+                vectors[row, h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(vectors)
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API, shortened to `dimensions` components"""
+
+    def __init__(self, model='text-embedding-3-small', dimensions=256, client=None):
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f'openai-{model}-{dimensions}'
+        self.client = client or create_openai_client()
+
+    def embed(self, texts):
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        response = self.client.embeddings.create(
+            model=self.model,
+            input=list(texts),
+            dimensions=self.dimensions,
+        )
+        data = sorted(response.data, key=lambda item: item.index)
+        return _normalize(np.array([item.embedding for item in data], dtype=np.float32))
+
+
+def get_embedder():
+    """Embedder selected by the EMBEDDING_BACKEND setting ('openai' or 'hashing')"""
+    backend = settings.EMBEDDING_BACKEND
+    if backend == 'hashing':
+        return HashingEmbedder(dimensions=settings.EMBEDDING_DIMENSIONS)
+    if backend == 'openai':
+        return OpenAIEmbedder(model=settings.EMBEDDING_MODEL, dimensions=settings.EMBEDDING_DIMENSIONS)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
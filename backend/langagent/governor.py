@@ -0,0 +1,315 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from django.conf import settings
+from openai import OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying; anything else (bad request, auth) is raised immediately
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """Seconds in an OpenAI reset header such as '1s', '250ms' or '6m0s'"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class OpenAIUnavailable(Exception):
+    """Raised when the circuit breaker is open or no request slot frees up in time"""
+
+
+# What OpenAIGovernor.call raises once it has given up: the breaker is open,
+# or a retryable error outlived the retries. Callers should stop, not fall back.
+GOVERNOR_ERRORS = (OpenAIUnavailable,) + RETRYABLE_ERRORS
+
+
+class LocalStateStore:
+    """Governor state for a single process"""
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def update(self, fn):
+        with self._lock:
+            return fn(self._state)
+
+
+class RedisStateStore:
+    """Governor state shared by every worker through one JSON value in Redis.
+
+    Each update runs in a WATCH/MULTI transaction, so concurrent workers
+    never overwrite each other's changes. If Redis can't be reached the
+    store falls back to process-local state until it comes back.
+    """
+
+    def __init__(self, client, key='openai:governor'):
+        self.client = client
+        self.key = key
+        self.fallback = LocalStateStore()
+        self.using_fallback = False
+
+    def update(self, fn):
+        import redis
+
+        def transaction(pipe):
+            raw = pipe.get(self.key)
+            state = json.loads(raw) if raw else {}
+            result = fn(state)
+            pipe.multi()
+            pipe.set(self.key, json.dumps(state), ex=86400)
+            return result
+
+        try:
+            result = self.client.transaction(transaction, self.key, value_from_callable=True)
+        except redis.RedisError as e:
+            if not self.using_fallback:
+                logger.warning(f"OpenAI governor can't reach Redis, using local state: {e}")
+                self.using_fallback = True
+            return self.fallback.update(fn)
+
+        if self.using_fallback:
+            logger.info("OpenAI governor reconnected to Redis")
+            self.using_fallback = False
+        return result
+
+
+class OpenAIGovernor:
+    """Shared concurrency limit, retries and circuit breaker for OpenAI calls.
+
+    Every call holds a lease while it's in flight, and the number of leases
+    is capped by an adaptive limit. The limit grows by 1/limit after each
+    success and is halved after a 429 or when the x-ratelimit-remaining-*
+    headers say the account is nearly out of requests or tokens (AIMD).
+    Retryable errors are retried with full-jitter exponential backoff,
+    honouring Retry-After. After `circuit_failures` consecutive failures
+    the circuit opens for `circuit_cooldown` seconds and calls fail fast;
+    afterwards a single trial call is let through at the minimum limit.
+    """
+
+    # A slot held longer than this is assumed to belong to a dead worker
+    LEASE_SECONDS = 300
+    # Below these fractions of the account limits, back off instead of growing
+    LOW_REMAINING_FRACTION = 0.1
+    DECREASE_FACTOR = 0.5
+
+    def __init__(self, store=None, min_concurrency=1, max_concurrency=None, max_retries=None,
+                 circuit_failures=None, circuit_cooldown=None, base_backoff=1.0, max_backoff=60.0,
+                 acquire_timeout=120.0):
+        self.store = store or LocalStateStore()
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency or settings.OPENAI_MAX_CONCURRENCY
+        self.max_retries = settings.OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        self.circuit_failures = circuit_failures or settings.OPENAI_CIRCUIT_FAILURES
+        self.circuit_cooldown = circuit_cooldown or settings.OPENAI_CIRCUIT_COOLDOWN_SECONDS
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.acquire_timeout = acquire_timeout
+
+    def _limit(self, state):
+        return state.get('limit', float(self.max_concurrency))
+
+    def _try_acquire(self, lease_id):
+        now = time.time()
+
+        def acquire(state):
+            leases = {k: v for k, v in state.get('leases', {}).items() if v > now}
+            state['leases'] = leases
+            blocked_until = max(state.get('open_until', 0), state.get('paused_until', 0))
+            if now < blocked_until:
+                return 'open' if now < state.get('open_until', 0) else 'paused', blocked_until - now
+            if len(leases) < max(self.min_concurrency, int(self._limit(state))):
+                leases[lease_id] = now + self.LEASE_SECONDS
+                return 'acquired', 0
+            return 'full', 0
+
+        return self.store.update(acquire)
+
+    def acquire(self):
+        """Wait for a request slot; return its lease id"""
+        lease_id = uuid.uuid4().hex
+        deadline = time.monotonic() + self.acquire_timeout
+        wait = 0.05
+        while True:
+            status, blocked_for = self._try_acquire(lease_id)
+            if status == 'acquired':
+                return lease_id
+            if status == 'open':
+                raise OpenAIUnavailable(f"OpenAI circuit breaker open for another {blocked_for:.0f}s")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise OpenAIUnavailable(f"No OpenAI request slot within {self.acquire_timeout:.0f}s")
+            sleep_for = blocked_for if status == 'paused' else wait
+            time.sleep(min(remaining, sleep_for))
+            wait = min(wait * 2, 1.0)
+
+    def release(self, lease_id):
+        self.store.update(lambda state: state.get('leases', {}).pop(lease_id, None))
+
+    def _is_low(self, headers, kind):
+        remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+        limit = headers.get(f'x-ratelimit-limit-{kind}')
+        if remaining is None or limit is None:
+            return False
+        try:
+            return float(remaining) < float(limit) * self.LOW_REMAINING_FRACTION
+        except ValueError:
+            return False
+
+    def _pause_for(self, headers):
+        """Seconds until the account's request or token window resets, if it's exhausted"""
+        pauses = []
+        for kind in ('requests', 'tokens'):
+            if headers.get(f'x-ratelimit-remaining-{kind}') in ('0', 0):
+                pauses.append(parse_duration(headers.get(f'x-ratelimit-reset-{kind}')) or 1.0)
+        return min(max(pauses), self.max_backoff) if pauses else 0
+
+    def record_success(self, headers=None):
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        low = self._is_low(headers, 'requests') or self._is_low(headers, 'tokens')
+        pause = self._pause_for(headers)
+        now = time.time()
+
+        def success(state):
+            limit = self._limit(state)
+            if low:
+                limit = max(self.min_concurrency, limit * self.DECREASE_FACTOR)
+            else:
+                limit = min(self.max_concurrency, limit + 1.0 / limit)
+            state['limit'] = limit
+            state['failures'] = 0
+            if pause:
+                state['paused_until'] = now + pause
+            state['remaining_requests'] = headers.get('x-ratelimit-remaining-requests')
+            state['remaining_tokens'] = headers.get('x-ratelimit-remaining-tokens')
+
+        self.store.update(success)
+
+    def record_failure(self, rate_limited, retry_after=None):
+        """Count a failed call; return True if it opened the circuit breaker"""
+        now = time.time()
+
+        def failure(state):
+            state['failures'] = state.get('failures', 0) + 1
+            if rate_limited:
+                state['limit'] = max(self.min_concurrency, self._limit(state) * self.DECREASE_FACTOR)
+                if retry_after:
+                    state['paused_until'] = max(state.get('paused_until', 0), now + retry_after)
+            if state['failures'] >= self.circuit_failures:
+                state['open_until'] = now + self.circuit_cooldown
+                state['limit'] = float(self.min_concurrency)
+                return True
+            return False
+
+        opened = self.store.update(failure)
+        if opened:
+            logger.error(f"OpenAI circuit breaker opened for {self.circuit_cooldown}s after repeated failures")
+        return opened
+
+    def _retry_after(self, error):
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        headers = response.headers
+        if headers.get('retry-after-ms'):
+            return parse_duration(f"{headers['retry-after-ms']}ms")
+        return parse_duration(headers.get('retry-after'))
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after:
+            return min(self.max_backoff, retry_after + random.uniform(0, self.base_backoff))
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def call(self, send):
+        """Run send() -> (result, headers) under the governor, retrying retryable errors"""
+        for attempt in range(self.max_retries + 1):
+            lease_id = self.acquire()
+            try:
+                result, headers = send()
+            except RETRYABLE_ERRORS as e:
+                self.release(lease_id)
+                rate_limited = isinstance(e, RateLimitError)
+                retry_after = self._retry_after(e) if rate_limited else None
+                circuit_opened = self.record_failure(rate_limited, retry_after)
+                if circuit_opened or attempt >= self.max_retries:
+                    raise
+                backoff = self._backoff(attempt, retry_after)
+                logger.warning(f"OpenAI call failed ({type(e).__name__}), retry {attempt + 1} in {backoff:.1f}s")
+                time.sleep(backoff)
+                continue
+            except Exception:
+                self.release(lease_id)
+                raise
+
+            self.release(lease_id)
+            self.record_success(headers)
+            return result
+
+    def chat_completion(self, client, **kwargs):
+        """client.chat.completions.create(**kwargs) with rate-limit headers fed back"""
+        completions = client.chat.completions
+        raw_api = getattr(completions, 'with_raw_response', None)
+
+        def send():
+            if raw_api is None:
+                return completions.create(**kwargs), {}
+            raw = raw_api.create(**kwargs)
+            return raw.parse(), raw.headers
+
+        return self.call(send)
+
+    def stats(self):
+        now = time.time()
+
+        def snapshot(state):
+            return {
+                'concurrency_limit': round(self._limit(state), 2),
+                'in_flight': sum(1 for expires in state.get('leases', {}).values() if expires > now),
+                'consecutive_failures': state.get('failures', 0),
+                'circuit_open': now < state.get('open_until', 0),
+                'paused_for_seconds': round(max(0, state.get('paused_until', 0) - now), 1),
+                'remaining_requests': state.get('remaining_requests'),
+                'remaining_tokens': state.get('remaining_tokens'),
+            }
+
+        return self.store.update(snapshot)
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_openai_governor():
+    """Process-wide governor, sharing state through Redis unless OPENAI_GOVERNOR_BACKEND is 'local'"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            store = None
+            if settings.OPENAI_GOVERNOR_BACKEND == 'redis':
+                import redis
+                client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=2, socket_connect_timeout=2)
+                store = RedisStateStore(client)
+            _governor = OpenAIGovernor(store=store)
+        return _governor
+
+
+def create_openai_client(**kwargs):
+    """OpenAI client for the configured key, pointed at OPENAI_BASE_URL when that is set"""
+    return OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None, **kwargs)
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('langagent', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('is_opportunity', models.BooleanField()),
+                ('priority', models.CharField(default='low', max_length=10)),
+                ('confidence_score', models.FloatField(default=0.0)),
+                ('summary', models.TextField(blank=True)),
+                ('intent', models.TextField(blank=True)),
+                ('budget_mentioned', models.BooleanField(default=False)),
+                ('budget_amount', models.CharField(blank=True, max_length=50)),
+                ('services_needed', models.TextField(blank=True)),
+                ('urgency_level', models.CharField(blank=True, max_length=20)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='langagent_c_created_bf2ab5_idx')],
+            },
+        ),
+    ]
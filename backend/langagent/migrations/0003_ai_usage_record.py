@@ -0,0 +1,36 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('langagent', '0002_classification_cache'),
+        ('reddit', '0006_classification_prefilter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIUsageRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subreddit', models.CharField(blank=True, max_length=50)),
+                ('call_type', models.CharField(choices=[('classification', 'Post Classification'), ('reply_generation', 'Reply Generation')], max_length=20)),
+                ('model', models.CharField(max_length=50)),
+                ('prompt_tokens', models.IntegerField(default=0)),
+                ('completion_tokens', models.IntegerField(default=0)),
+                ('cost_usd', models.FloatField(default=0.0)),
+                ('latency_ms', models.FloatField(default=0.0)),
+                ('batch_size', models.IntegerField(default=1)),
+                ('content_truncated', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ai_usage', to='reddit.redditpost')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='langagent_a_created_38cc83_idx'), models.Index(fields=['subreddit', 'created_at'], name='langagent_a_subredd_9b3d44_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('langagent', '0003_ai_usage_record'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='aiperformancemetrics',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='aiperformancemetrics',
+            name='escalated_requests',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aiperformancemetrics',
+            name='model',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AlterUniqueTogether(
+            name='aiperformancemetrics',
+            unique_together={('date', 'template_type', 'model')},
+        ),
+    ]
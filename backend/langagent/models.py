@@ -60,22 +60,85 @@ class AIPerformanceMetrics(models.Model):
     """Track AI model performance over time"""
     date = models.DateField()
     template_type = models.CharField(max_length=20, choices=AIPromptTemplate.TEMPLATE_TYPE_CHOICES)
+    model = models.CharField(max_length=50, blank=True, default='')  # Blank for all-model totals
     total_requests = models.IntegerField(default=0)
     successful_requests = models.IntegerField(default=0)
     failed_requests = models.IntegerField(default=0)
-    avg_response_time = models.FloatField(default=0.0)
+    escalated_requests = models.IntegerField(default=0)  # Results handed on to a larger model
+    avg_response_time = models.FloatField(default=0.0)  # Milliseconds
     avg_engagement_score = models.FloatField(default=0.0)
     avg_success_score = models.FloatField(default=0.0)
     
     class Meta:
-        unique_together = ['date', 'template_type']
+        unique_together = ['date', 'template_type', 'model']
         ordering = ['-date']
     
     def __str__(self):
-        return f"{self.date}: {self.get_template_type_display()}"
+        suffix = f" ({self.model})" if self.model else ''
+        return f"{self.date}: {self.get_template_type_display()}{suffix}"
     
     @property
     def success_rate(self):
         if self.total_requests == 0:
             return 0.0
         return (self.successful_requests / self.total_requests) * 100
+    
+    @property
+    def escalation_rate(self):
+        if self.total_requests == 0:
+            return 0.0
+        return (self.escalated_requests / self.total_requests) * 100
+
+class ClassificationCacheEntry(models.Model):
+    """Cached classification result keyed by a hash of normalized post title + content"""
+    content_hash = models.CharField(max_length=64, unique=True)
+    is_opportunity = models.BooleanField()
+    priority = models.CharField(max_length=10, default='low')
+    confidence_score = models.FloatField(default=0.0)
+    summary = models.TextField(blank=True)
+    intent = models.TextField(blank=True)
+    budget_mentioned = models.BooleanField(default=False)
+    budget_amount = models.CharField(max_length=50, blank=True)
+    services_needed = models.TextField(blank=True)
+    urgency_level = models.CharField(max_length=20, blank=True)
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.hit_count} hits)"
+
+class AIUsageRecord(models.Model):
+    """Token usage, cost and latency of an OpenAI call, attributed to one post"""
+    CALL_TYPE_CHOICES = [
+        ('classification', 'Post Classification'),
+        ('reply_generation', 'Reply Generation'),
+    ]
+    
+    post = models.ForeignKey('reddit.RedditPost', on_delete=models.SET_NULL, null=True, blank=True, related_name='ai_usage')
+    subreddit = models.CharField(max_length=50, blank=True)
+    call_type = models.CharField(max_length=20, choices=CALL_TYPE_CHOICES)
+    model = models.CharField(max_length=50)
+    prompt_tokens = models.IntegerField(default=0)
+    completion_tokens = models.IntegerField(default=0)
+    cost_usd = models.FloatField(default=0.0)
+    latency_ms = models.FloatField(default=0.0)
+    batch_size = models.IntegerField(default=1)  # Posts sharing the call; tokens are this post's share
+    content_truncated = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['subreddit', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.call_type} {self.model}: {self.prompt_tokens}+{self.completion_tokens} tokens"
@@ -0,0 +1,205 @@
+import logging
+import re
+from reddit.matcher import KeywordMatcher
+from reddit.models import Keyword, SystemConfig
+
+logger = logging.getLogger(__name__)
+
+# Signals checked against the lowercased "title\ncontent" text, with their score weights
+HIRING_TAG = re.compile(r'\[\s*(hiring|task|paid|job)\s*\]')
+FOR_HIRE_TAG = re.compile(r'\[\s*(for\s*hire|offer|offering)\s*\]')
+BUDGET = re.compile(
+    r'(\$\s?\d|\d\s?\$|\b\d+(?:[.,]\d+)?\s?(?:k|usd|eur|gbp|dollars?|/hr|/hour|per hour)\b|\bbudget\b|\bpaid\b|\bwill pay\b)'
+)
+HIRING_VERB = re.compile(
+    r'\b(hiring|to hire|want to hire|looking for (?:a |an )?(?:developer|dev|freelancer|programmer|engineer|someone|expert)'
+    r'|need (?:a |an )?(?:developer|dev|freelancer|programmer|engineer|someone|help)|seeking (?:a |an )?\w+|will pay)\b'
+)
+SELF_PROMOTION = re.compile(r'\b(hire me|my services|i will build|i can build|available for (?:work|hire)|my portfolio)\b')
+
+SIGNAL_WEIGHTS = {
+    'hiring_tag': 4.0,
+    'for_hire_tag': -5.0,
+    'budget': 2.0,
+    'hiring_verb': 2.0,
+    'self_promotion': -2.0,
+    'too_short': -1.0,
+    'semantic_match': 3.0,
+    'semantic_mismatch': -2.0,
+}
+
+# Default reject threshold: a [for hire] tag or self-promotion on its own, but not just a short post
+DEFAULT_REJECT_THRESHOLD = -2.0
+
+# Keyword matches add their Keyword.weight, capped so a keyword-stuffed post can't dominate
+MAX_KEYWORD_SCORE = 3.0
+
+
+def _config_float(key, default):
+    try:
+        return float(SystemConfig.get_value(key, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+class PreFilterResult:
+    """Score and decision for one post"""
+
+    def __init__(self, score, signals):
+        self.score = score
+        self.signals = signals
+        self.rejected = False
+
+    @property
+    def reason(self):
+        described = ', '.join(f"{name} ({weight:+g})" for name, weight in self.signals) or 'no lead signals'
+        return f"Pre-filter score {self.score:+.1f}: {described}"
+
+
+class LeadPreFilter:
+    """Cheap local scoring stage that rejects obvious non-leads before the LLM.
+
+    Posts scoring at or below `prefilter_reject_threshold` get a negative
+    Classification straight away, recording the score and the signals that
+    produced it; everything else goes on to the LLM. Only net-negative
+    evidence (a [for hire] tag, self-promotion) rejects a post: a score of
+    0 just means none of the signals fired, so such posts always reach the
+    LLM whatever the threshold. Set `prefilter_enabled` to false to send
+    every post to the LLM.
+
+    With `semantic_prefilter_enabled`, similarity to the centroids of past
+    leads in the SemanticIndex adds a bonus or penalty as well.
+    """
+
+    def __init__(self, reject_threshold=None, min_length=None, enabled=None, semantic=None):
+        if enabled is None:
+            enabled = SystemConfig.get_value('prefilter_enabled', 'true').lower() == 'true'
+        self.enabled = enabled
+        self.reject_threshold = (
+            reject_threshold if reject_threshold is not None
+            else _config_float('prefilter_reject_threshold', DEFAULT_REJECT_THRESHOLD)
+        )
+        self.min_length = min_length if min_length is not None else _config_float('prefilter_min_length', 80)
+
+        keywords = Keyword.objects.filter(is_active=True).values_list('keyword', 'weight')
+        self.keyword_weights = {keyword.lower(): weight for keyword, weight in keywords}
+        self.matcher = KeywordMatcher(list(self.keyword_weights), builtin_keywords=[])
+
+        if semantic is None:
+            semantic = SystemConfig.get_value('semantic_prefilter_enabled', 'false').lower() == 'true'
+        self.semantic_index = None
+        if semantic:
+            from .semantic import get_semantic_index
+            self.semantic_index = get_semantic_index()
+            self.semantic_match_threshold = _config_float('semantic_match_threshold', 0.5)
+            self.semantic_mismatch_threshold = _config_float('semantic_mismatch_threshold', 0.2)
+
+    def score(self, post):
+        """Score a post from its title and content"""
+        text = f"{post.title}\n{post.content}".lower()
+        signals = []
+
+        if HIRING_TAG.search(text):
+            signals.append(('hiring_tag', SIGNAL_WEIGHTS['hiring_tag']))
+        if FOR_HIRE_TAG.search(text):
+            signals.append(('for_hire_tag', SIGNAL_WEIGHTS['for_hire_tag']))
+        if BUDGET.search(text):
+            signals.append(('budget', SIGNAL_WEIGHTS['budget']))
+        if HIRING_VERB.search(text):
+            signals.append(('hiring_verb', SIGNAL_WEIGHTS['hiring_verb']))
+        if SELF_PROMOTION.search(text):
+            signals.append(('self_promotion', SIGNAL_WEIGHTS['self_promotion']))
+        if len(text.strip()) < self.min_length:
+            signals.append(('too_short', SIGNAL_WEIGHTS['too_short']))
+
+        matched = self.matcher.match(text).keywords
+        if matched:
+            keyword_score = min(MAX_KEYWORD_SCORE, sum(self.keyword_weights.get(k, 1.0) for k in matched))
+            signals.append((f"keywords[{', '.join(matched)}]", keyword_score))
+
+        similarity = self._semantic_similarity(post)
+        if similarity is not None:
+            if similarity >= self.semantic_match_threshold:
+                signals.append(('semantic_match', SIGNAL_WEIGHTS['semantic_match']))
+            elif similarity < self.semantic_mismatch_threshold:
+                signals.append(('semantic_mismatch', SIGNAL_WEIGHTS['semantic_mismatch']))
+
+        result = PreFilterResult(sum(weight for _, weight in signals), signals)
+        result.rejected = self.enabled and result.score < 0 and result.score <= self.reject_threshold
+        return result
+
+    def _semantic_similarity(self, post):
+        if self.semantic_index is None:
+            return None
+        try:
+            return self.semantic_index.score(post)
+        except Exception as e:
+            logger.error(f"Semantic scoring failed for post {post.id}: {e}")
+            return None
+
+    def reject(self, post, result):
+        """Record a negative Classification for a post the pre-filter rejected"""
+        from reddit.models import Classification
+        classification = Classification.objects.create(
+            post=post,
+            is_opportunity=False,
+            confidence_score=0.0,
+            priority='low',
+            intent='Rejected by local pre-filter',
+            summary=result.reason,
+            urgency_level='low',
+            classified_by='prefilter',
+            prefilter_score=result.score,
+        )
+        logger.info(f"Pre-filter rejected post {post.id}: {result.reason}")
+        return classification
+
+    def split(self, posts):
+        """Reject clear negatives; return (posts for the LLM, {post id: score}, rejected classifications)"""
+        passed = []
+        scores = {}
+        rejected = {}
+        for post in posts:
+            result = self.score(post)
+            scores[post.id] = result.score
+            if result.rejected:
+                rejected[post.id] = self.reject(post, result)
+            else:
+                passed.append(post)
+        return passed, scores, rejected
+
+    def evaluate(self, classifications):
+        """Compare pre-filter decisions with historical LLM classifications.
+
+        A rejected post counts as a predicted negative. Precision and recall are
+        reported for the "send to LLM" decision against is_opportunity, so
+        recall is the share of real leads the pre-filter would have kept.
+        """
+        total = kept_leads = kept_non_leads = rejected_leads = rejected_non_leads = 0
+        for classification in classifications:
+            result = self.score(classification.post)
+            total += 1
+            if classification.is_opportunity:
+                if result.rejected:
+                    rejected_leads += 1
+                else:
+                    kept_leads += 1
+            elif result.rejected:
+                rejected_non_leads += 1
+            else:
+                kept_non_leads += 1
+
+        kept = kept_leads + kept_non_leads
+        leads = kept_leads + rejected_leads
+        rejected = rejected_leads + rejected_non_leads
+        return {
+            'evaluated': total,
+            'reject_threshold': self.reject_threshold,
+            'llm_calls_saved': round(rejected / total, 3) if total else 0.0,
+            'precision': round(kept_leads / kept, 3) if kept else 0.0,
+            'recall': round(kept_leads / leads, 3) if leads else 0.0,
+            'rejected_leads': rejected_leads,
+            'rejected_non_leads': rejected_non_leads,
+            'kept_leads': kept_leads,
+            'kept_non_leads': kept_non_leads,
+        }
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_SYSTEM_PROMPT = "You are a helpful assistant that analyzes Reddit posts for freelance opportunities. Always respond with valid JSON."
+
+CLASSIFICATION_GUIDELINES = """Guidelines:
+- Look for keywords like "need help", "looking for", "hire", "freelancer", "developer", "build", "create"
+- Consider if they're asking for technical work, consulting, or development
+- Assess if they have a clear project description
+- Determine if they seem serious about hiring
+- Consider subreddit rules (avoid platform links in replies)
+
+SKILL-SPECIFIC FILTERING:
+- HIGH PRIORITY: AI automation, LangChain, LangGraph, RAG, PDF chat, voice agents, web development, Django, Next.js, React
+- MEDIUM PRIORITY: Data analysis, business intelligence, analytics, reporting, API development
+- LOW PRIORITY: General programming, basic automation
+- REJECT: Voice recording, transcription, translation, manual data entry, non-technical tasks
+
+Only classify as opportunity if it matches your core skills (AI automation, web development, data analysis)"""
+
+CLASSIFICATION_FIELDS = """
+    "is_opportunity": true/false,
+    "confidence_score": 0.0-1.0,
+    "priority": "high/medium/low",
+    "intent": "brief description of what they want",
+    "services_needed": "list of services/technologies",
+    "budget_amount": "estimated budget or budget range",
+    "urgency": "high/medium/low",
+    "summary": "brief summary of the opportunity"
+"""
+
+REPLY_SYSTEM_PROMPT = "You are a helpful freelancer responding to Reddit posts. Be genuine and professional."
+
+REPLY_GUIDELINES = """Generate a natural, helpful reply to the Reddit post in the user message. The post is classified as an opportunity.
+Use the template given with the post as a base but adapt it naturally.
+
+Guidelines:
+1. Be helpful and professional
+2. Show understanding of their needs
+3. Offer relevant expertise
+4. Keep it concise but informative
+5. Sound natural and human-like
+6. Don't be overly promotional
+7. Make sure the reply flows naturally"""
+
+# How often a process re-checks the database for persona/template changes made elsewhere
+FINGERPRINT_CHECK_SECONDS = 30
+
+
+class CompiledPrompts:
+    """Static prompt prefixes plus the persona and reply templates they were built from.
+
+    Every message list starts with a system message that is identical for
+    all posts: instructions, skill rules, output format, persona and any
+    active AIPromptTemplate additions. Post-specific text only appears in
+    the final user message, so the provider can reuse its cached prefix.
+    """
+
+    def __init__(self):
+        from reddit.models import AIPersona, ReplyTemplate
+        from .models import AIPromptTemplate
+
+        self.persona = AIPersona.objects.filter(is_active=True).first()
+
+        self.reply_templates = {}
+        for template in ReplyTemplate.objects.filter(is_active=True):
+            self.reply_templates.setdefault(template.template_type, []).append(template)
+
+        learned = {
+            template.template_type: template.prompt_template
+            for template in AIPromptTemplate.objects.filter(is_active=True).order_by('version')
+        }
+
+        classification_head = f"{CLASSIFICATION_SYSTEM_PROMPT}\n\n{CLASSIFICATION_GUIDELINES}"
+        if learned.get('classification'):
+            classification_head += f"\n\nAdditional instructions:\n{learned['classification']}"
+
+        # Single and batch prompts share everything up to the output format
+        self.classification_system = (
+            f"{classification_head}\n\n"
+            f"Determine if the Reddit post in the user message is a freelance/project opportunity.\n"
+            f"Always respond with valid JSON in this exact format:\n{{{CLASSIFICATION_FIELDS}}}"
+        )
+        self.batch_classification_system = (
+            f"{classification_head}\n\n"
+            f"Determine for each Reddit post in the user message if it's a freelance/project opportunity.\n"
+            f"Always respond with a valid JSON array containing exactly one object per post, in this exact format:\n"
+            f"[\n  {{\n    \"post_id\": <the Post ID>,{CLASSIFICATION_FIELDS}  }}\n]"
+        )
+
+        reply_system = f"{REPLY_SYSTEM_PROMPT}\n\n{REPLY_GUIDELINES}"
+        if self.persona:
+            reply_system += f"\n\nPersona Style: {self.persona.style}"
+            if self.persona.include_portfolio and self.persona.portfolio_url:
+                reply_system += f"\nInclude portfolio link: {self.persona.portfolio_url}"
+            if self.persona.include_cta:
+                reply_system += f"\nInclude call-to-action: {self.persona.cta_text}"
+        if learned.get('reply_generation'):
+            reply_system += f"\n\nAdditional instructions:\n{learned['reply_generation']}"
+        self.reply_system = reply_system
+
+    def classification_messages(self, post, content):
+        return [
+            {"role": "system", "content": self.classification_system},
+            {"role": "user", "content": f"Post Title: {post.title}\nPost Content: {content}"},
+        ]
+
+    def batch_classification_messages(self, posts, contents):
+        posts_block = "\n---\n".join(
+            f"Post ID: {post.id}\nPost Title: {post.title}\nPost Content: {contents[post.id]}"
+            for post in posts
+        )
+        return [
+            {"role": "system", "content": self.batch_classification_system},
+            {"role": "user", "content": f"{len(posts)} posts:\n\n{posts_block}"},
+        ]
+
+    def reply_messages(self, post, content, classification, template_content):
+        return [
+            {"role": "system", "content": self.reply_system},
+            {"role": "user", "content": (
+                f"Post Title: {post.title}\n"
+                f"Post Content: {content}\n"
+                f"Opportunity Summary: {classification.summary}\n"
+                f"Services Needed: {classification.services_needed}\n\n"
+                f"Template:\n{template_content}"
+            )},
+        ]
+
+
+_compiled = None
+_fingerprint = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _source_fingerprint():
+    """Row count and latest update of every table the static prompts are built from"""
+    from reddit.models import AIPersona, ReplyTemplate
+    from .models import AIPromptTemplate
+
+    return tuple(
+        tuple(model.objects.aggregate(count=Count('id'), latest=Max('updated_at')).values())
+        for model in (AIPersona, ReplyTemplate, AIPromptTemplate)
+    )
+
+
+def get_compiled_prompts():
+    """Process-wide CompiledPrompts, rebuilt when the persona or templates change.
+
+    Saves and deletes in this process invalidate it immediately via signals;
+    changes made by other processes are noticed within FINGERPRINT_CHECK_SECONDS.
+    """
+    global _compiled, _fingerprint, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _compiled is not None and now - _checked_at < FINGERPRINT_CHECK_SECONDS:
+            return _compiled
+
+        fingerprint = _source_fingerprint()
+        if _compiled is None or fingerprint != _fingerprint:
+            _compiled = CompiledPrompts()
+            _fingerprint = fingerprint
+            logger.info("Rebuilt static prompt prefixes")
+        _checked_at = now
+        return _compiled
+
+
+def invalidate_prompts(**kwargs):
+    """Signal receiver: drop the compiled prompts so the next call rebuilds them"""
+    global _compiled
+    with _lock:
+        _compiled = None
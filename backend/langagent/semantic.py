@@ -0,0 +1,301 @@
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from django.conf import settings
+from .embeddings import get_embedder, post_text
+
+logger = logging.getLogger(__name__)
+
+
+def _spherical_kmeans(vectors, k, iterations=10):
+    """Cluster unit vectors by cosine similarity; deterministic farthest-point init"""
+    centroids = [vectors[0]]
+    for _ in range(1, k):
+        closest = np.max(vectors @ np.array(centroids).T, axis=1)
+        centroids.append(vectors[np.argmin(closest)])
+    centroids = np.array(centroids, dtype=np.float32)
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for j in range(k):
+            members = vectors[assignment == j]
+            if len(members):
+                centroids[j] = members.mean(axis=0)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = centroids / norms
+    return centroids
+
+
+class SemanticIndex:
+    """Post embeddings in a memory-mapped float32 matrix on disk.
+
+    Each post's title and content is embedded once and appended as a row of
+    `vectors.f32`, with its post id at the same row of `ids.i64`. Readers map
+    both files read-only, so every worker process shares the same pages, and
+    similarity against the whole index is a single matrix-vector product.
+    Appends are serialized across processes with a lock file.
+
+    The files live in a generation directory named by `meta.json`.
+    Switching the embedding model starts a new, empty generation and
+    atomically replaces `meta.json` to point at it, so files other processes
+    still have mapped are never truncated under them; they move to the new
+    generation the next time they look. Generations before the previous
+    one are deleted.
+    """
+
+    VECTORS_FILE = 'vectors.f32'
+    IDS_FILE = 'ids.i64'
+    META_FILE = 'meta.json'
+    LOCK_FILE = 'index.lock'
+
+    # How long lead centroids are reused before being recomputed
+    CENTROID_TTL_SECONDS = 300
+
+    def __init__(self, directory=None, embedder=None, centroid_count=None):
+        self.directory = str(directory or settings.SEMANTIC_INDEX_DIR)
+        self.embedder = embedder or get_embedder()
+        self.dimensions = self.embedder.dimensions
+        self.centroid_count = centroid_count or settings.SEMANTIC_CENTROIDS
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._rows = {}
+        self._centroids = None
+        self._centroids_at = 0.0
+        self._generation = None
+        self._meta_inode = None
+
+        with self._file_lock():
+            self._check_meta()
+        self._refresh()
+
+    def _path(self, name, generation=None):
+        if generation is None:
+            return os.path.join(self.directory, name)
+        return os.path.join(self.directory, generation, name)
+
+    def _data_path(self, name):
+        return self._path(name, self._generation)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by every process using this index directory"""
+        with open(self._path(self.LOCK_FILE), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _meta(self):
+        return {'embedder': self.embedder.name, 'dimensions': self.dimensions}
+
+    def _read_meta(self):
+        """(meta.json contents, its inode), or (None, None) if there's no index yet"""
+        try:
+            with open(self._path(self.META_FILE)) as f:
+                return json.load(f), os.fstat(f.fileno()).st_ino
+        except (FileNotFoundError, ValueError):
+            return None, None
+
+    def _check_meta(self):
+        """Start a new generation if the index was built with a different embedder"""
+        meta, inode = self._read_meta()
+        generation = (meta or {}).get('generation')
+        if (
+            meta is not None and generation
+            and {key: meta.get(key) for key in ('embedder', 'dimensions')} == self._meta()
+            and os.path.isdir(self._path(generation))
+        ):
+            self._generation, self._meta_inode = generation, inode
+            return
+        if meta is not None:
+            logger.warning(f"Semantic index was built with another embedder; rebuilding for {self.embedder.name}")
+
+        generation = f"{time.time_ns()}-{os.getpid()}"
+        os.makedirs(self._path(generation))
+        for name in (self.VECTORS_FILE, self.IDS_FILE):
+            open(self._path(name, generation), 'wb').close()
+        temporary = self._path(f'{self.META_FILE}.{os.getpid()}.tmp')
+        with open(temporary, 'w') as f:
+            json.dump({**self._meta(), 'generation': generation}, f)
+        os.replace(temporary, self._path(self.META_FILE))
+        self._generation = generation
+        self._meta_inode = self._read_meta()[1]
+        self._remove_old_generations()
+
+    def _remove_old_generations(self):
+        """Delete all but the newest two generations, and files from before generations existed.
+
+        Unlinking leaves existing mappings intact; only a process two
+        generations behind could miss its files.
+        """
+        for name in (self.VECTORS_FILE, self.IDS_FILE):
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+        generations = sorted(
+            (entry.name for entry in os.scandir(self.directory) if entry.is_dir()),
+            key=lambda name: int(name.split('-')[0]) if name.split('-')[0].isdigit() else 0,
+        )
+        for generation in generations[:-2]:
+            if generation != self._generation:
+                shutil.rmtree(self._path(generation), ignore_errors=True)
+
+    def _follow_generation(self):
+        """Switch to the generation meta.json points at, if another process started a new one"""
+        try:
+            inode = os.stat(self._path(self.META_FILE)).st_ino
+        except FileNotFoundError:
+            return
+        if inode == self._meta_inode:
+            return
+        meta, inode = self._read_meta()
+        self._meta_inode = inode
+        if meta is None or {key: meta.get(key) for key in ('embedder', 'dimensions')} != self._meta():
+            # Another embedder took over the directory; keep using our own generation
+            return
+        if meta.get('generation') != self._generation:
+            self._generation = meta['generation']
+            self._rows = {}
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+
+    def _refresh(self):
+        """Re-map the files if other processes appended rows since the last look"""
+        with self._lock:
+            self._follow_generation()
+            row_bytes = self.dimensions * 4
+            count = min(
+                os.path.getsize(self._data_path(self.IDS_FILE)) // 8,
+                os.path.getsize(self._data_path(self.VECTORS_FILE)) // row_bytes,
+            )
+            if count == len(self._ids):
+                return
+
+            known = len(self._ids)
+            self._ids = np.memmap(self._data_path(self.IDS_FILE), dtype=np.int64, mode='r', shape=(count,))
+            self._vectors = np.memmap(
+                self._data_path(self.VECTORS_FILE), dtype=np.float32, mode='r', shape=(count, self.dimensions)
+            )
+            for row in range(known, count):
+                self._rows.setdefault(int(self._ids[row]), row)
+
+    def __len__(self):
+        self._refresh()
+        return len(self._ids)
+
+    def __contains__(self, post_id):
+        self._refresh()
+        return post_id in self._rows
+
+    def add_posts(self, posts):
+        """Embed and append posts that aren't indexed yet; return how many were added"""
+        self._refresh()
+        new_posts = {post.id: post for post in posts if post.id not in self._rows}
+        if not new_posts:
+            return 0
+
+        posts = list(new_posts.values())
+        vectors = self.embedder.embed([post_text(post) for post in posts])
+
+        with self._file_lock():
+            # Another process may have indexed some of them while we were embedding
+            self._refresh()
+            keep = [i for i, post in enumerate(posts) if post.id not in self._rows]
+            if keep:
+                ids = np.array([posts[i].id for i in keep], dtype=np.int64)
+                with open(self._data_path(self.VECTORS_FILE), 'ab') as f:
+                    f.write(np.ascontiguousarray(vectors[keep], dtype=np.float32).tobytes())
+                with open(self._data_path(self.IDS_FILE), 'ab') as f:
+                    f.write(ids.tobytes())
+            self._refresh()
+
+        return len(keep)
+
+    def vector(self, post):
+        """Embedding of a post, indexing it first if needed"""
+        if post.id not in self:
+            self.add_posts([post])
+        with self._lock:
+            return np.array(self._vectors[self._rows[post.id]])
+
+    def _lead_post_ids(self):
+        from reddit.models import Classification
+        return list(
+            Classification.objects
+            .filter(is_opportunity=True, confidence_score__gt=0.5)
+            .values_list('post_id', flat=True)
+        )
+
+    def centroids(self):
+        """Cluster centres of confirmed leads, or None if there are none yet"""
+        if self._centroids is not None and time.monotonic() - self._centroids_at < self.CENTROID_TTL_SECONDS:
+            return self._centroids
+
+        from reddit.models import RedditPost
+        lead_ids = self._lead_post_ids()
+        self._refresh()
+        missing = [post_id for post_id in lead_ids if post_id not in self._rows]
+        if missing:
+            self.add_posts(RedditPost.objects.filter(id__in=missing))
+
+        with self._lock:
+            rows = [self._rows[post_id] for post_id in lead_ids if post_id in self._rows]
+            lead_vectors = np.asarray(self._vectors[sorted(rows)]) if rows else None
+
+        self._centroids = (
+            _spherical_kmeans(lead_vectors, min(self.centroid_count, len(lead_vectors)))
+            if lead_vectors is not None else None
+        )
+        self._centroids_at = time.monotonic()
+        return self._centroids
+
+    def score(self, post):
+        """Highest cosine similarity between a post and the lead centroids (None without leads)"""
+        centroids = self.centroids()
+        if centroids is None:
+            return None
+        return float(np.max(centroids @ self.vector(post)))
+
+    def similar(self, post, limit=10, leads_only=False):
+        """Most similar indexed posts as a list of (post_id, similarity), best first"""
+        query = self.vector(post)
+        with self._lock:
+            ids = np.asarray(self._ids)
+            similarities = self._vectors @ query
+
+        candidates = ids != post.id
+        if leads_only:
+            candidates &= np.isin(ids, np.array(self._lead_post_ids(), dtype=np.int64))
+        positions = np.flatnonzero(candidates)
+        if not len(positions):
+            return []
+
+        limit = min(limit, len(positions))
+        top = positions[np.argpartition(-similarities[positions], limit - 1)[:limit]]
+        top = top[np.argsort(-similarities[top])]
+        return [(int(ids[i]), float(similarities[i])) for i in top]
+
+
+_semantic_index = None
+_semantic_index_lock = threading.Lock()
+
+
+def get_semantic_index():
+    """Process-wide SemanticIndex using the configured embedder"""
+    global _semantic_index
+    with _semantic_index_lock:
+        if _semantic_index is None:
+            _semantic_index = SemanticIndex()
+        return _semantic_index
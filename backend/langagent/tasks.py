@@ -2,8 +2,7 @@ from celery import shared_task
 import logging
 from django.utils import timezone
 from datetime import timedelta
-from decouple import config
-import openai
+from .governor import create_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +72,7 @@ def update_prompt_templates(feedback_id):
 def analyze_and_improve_template(feedback, template):
     """Use AI to analyze feedback and improve prompt template"""
     try:
-        client = openai.OpenAI(api_key=config('OPENAI_API_KEY'))
+        client = create_openai_client()
         
         analysis_prompt = f"""
         Analyze this feedback and improve the AI prompt template:
@@ -110,6 +109,34 @@ def analyze_and_improve_template(feedback, template):
         logger.error(f"Error analyzing template: {e}")
         return None
 
+@shared_task
+def prune_classification_cache():
+    """Evict expired and overflow classification cache entries"""
+    from .cache import ClassificationCache
+    
+    try:
+        evicted = ClassificationCache().evict()
+        logger.info(f"Pruned {evicted} classification cache entries")
+        return evicted
+    except Exception as e:
+        logger.error(f"Error pruning classification cache: {e}")
+        return 0
+
+@shared_task
+def index_new_posts(hours_back=24):
+    """Embed recently fetched posts into the semantic index"""
+    from reddit.models import RedditPost
+    from .semantic import get_semantic_index
+    
+    try:
+        posts = RedditPost.objects.filter(fetched_at__gte=timezone.now() - timedelta(hours=hours_back))
+        added = get_semantic_index().add_posts(posts)
+        logger.info(f"Added {added} posts to the semantic index")
+        return added
+    except Exception as e:
+        logger.error(f"Error indexing posts: {e}")
+        return 0
+
 @shared_task
 def update_ai_performance_metrics():
     """Update AI performance metrics daily"""
@@ -123,7 +150,8 @@ def update_ai_performance_metrics():
             # Get today's metrics
             metrics, created = AIPerformanceMetrics.objects.get_or_create(
                 date=today,
-                template_type=template_type
+                template_type=template_type,
+                model=''
             )
             
             # Calculate metrics based on recent activity
@@ -234,7 +262,7 @@ def update_templates_from_patterns(success_count, failure_count, improvement_cou
 def analyze_patterns_and_improve(template, success_count, failure_count, improvement_count):
     """Analyze feedback patterns and improve template"""
     try:
-        client = openai.OpenAI(api_key=config('OPENAI_API_KEY'))
+        client = create_openai_client()
         
         analysis_prompt = f"""
         Analyze these feedback patterns and improve the AI prompt template:
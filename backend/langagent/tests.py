@@ -1,3 +1,526 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+import httpx
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from openai import APIConnectionError, RateLimitError
+from reddit.models import AIPersona, Keyword, RedditPost, ReplyTemplate, Subreddit, SystemConfig
+from .agent import RedditLeadAgent
+from .cache import ClassificationCache, content_hash
+from . import prompts
+from .embeddings import HashingEmbedder
+from .governor import LocalStateStore, OpenAIGovernor, OpenAIUnavailable
+from .models import AIPromptTemplate, ClassificationCacheEntry
+from .prefilter import LeadPreFilter
+from .semantic import SemanticIndex
+from .tokens import OMISSION_MARKER, count_tokens, fit_to_budget
 
-# Create your tests here.
+
+class FitToBudgetTests(SimpleTestCase):
+    FILLER = ' '.join(f'Sentence number {i} talks about the weather and nothing much.' for i in range(80))
+
+    def test_text_inside_budget_is_unchanged(self):
+        text = 'Need a Django developer. Budget is $300.'
+        self.assertEqual(fit_to_budget(text, 200), (text, False))
+        self.assertEqual(fit_to_budget('', 10), ('', False))
+
+    def test_long_text_keeps_head_tail_and_budget_sentences(self):
+        text = (
+            'I run a small bakery and need help with my website. ' + self.FILLER
+            + ' My budget is $500 for this. ' + self.FILLER
+            + ' Please DM me if interested.'
+        )
+        fitted, truncated = fit_to_budget(text, 200)
+        self.assertTrue(truncated)
+        self.assertLessEqual(count_tokens(fitted), 200)
+        self.assertTrue(fitted.startswith('I run a small bakery'))
+        self.assertTrue(fitted.endswith('Please DM me if interested.'))
+        self.assertIn('My budget is $500 for this.', fitted)
+        self.assertIn(OMISSION_MARKER.strip(), fitted)
+        # Kept sentences stay in their original order
+        self.assertLess(fitted.index('Sentence number 0 '), fitted.index('$500'))
+        self.assertLess(fitted.index('$500'), fitted.index('Sentence number 79 '))
+
+    def test_unbroken_text_is_cut_to_budget(self):
+        fitted, truncated = fit_to_budget('x' * 20000, 100)
+        self.assertTrue(truncated)
+        self.assertLessEqual(count_tokens(fitted), 100)
+
+
+class LeadPreFilterTests(TestCase):
+    def setUp(self):
+        Keyword.objects.create(keyword='developer')
+
+    def prefilter(self, **kwargs):
+        return LeadPreFilter(enabled=True, semantic=False, min_length=80, **kwargs)
+
+    @staticmethod
+    def post(title, content=''):
+        return SimpleNamespace(id=1, title=title, content=content)
+
+    def test_posts_without_signals_reach_the_llm(self):
+        posts = [
+            self.post('Anyone know a good Django contractor?',
+                      'Happy to discuss rates, DM me with examples of past work on similar sites.'),
+            self.post('Need a React Native person for a small app',
+                      'Send me your portfolio and availability, the app has three screens and a login.'),
+        ]
+        for threshold in (None, 0, -2):
+            prefilter = self.prefilter(reject_threshold=threshold)
+            for post in posts:
+                result = prefilter.score(post)
+                self.assertEqual(result.score, 0, result.reason)
+                self.assertFalse(result.rejected, result.reason)
+
+    def test_threshold_boundary(self):
+        prefilter = self.prefilter(reject_threshold=-2)
+        self_promotion = prefilter.score(self.post(
+            'Web apps, fast',
+            'I can build your next web app in Django or React, reasonable rates, message me for details.',
+        ))
+        self.assertEqual(self_promotion.score, -2)
+        self.assertTrue(self_promotion.rejected)
+
+        too_short = prefilter.score(self.post('Quick question', 'Thoughts?'))
+        self.assertEqual(too_short.score, -1)
+        self.assertFalse(too_short.rejected)
+        self.assertTrue(self.prefilter(reject_threshold=-1).score(self.post('Quick question', 'Thoughts?')).rejected)
+
+    def test_for_hire_posts_are_rejected_and_leads_kept(self):
+        prefilter = self.prefilter()
+        self.assertTrue(prefilter.score(self.post(
+            '[For Hire] Full stack developer',
+            'Ten years of experience with Django, React and AWS. Check out my portfolio for details.',
+        )).rejected)
+        lead = prefilter.score(self.post(
+            '[Hiring] Django developer',
+            'Budget is $500 for a small dashboard, looking for a developer who can start this week.',
+        ))
+        self.assertGreater(lead.score, 0)
+        self.assertFalse(lead.rejected)
+
+    def test_disabled_prefilter_rejects_nothing(self):
+        prefilter = LeadPreFilter(enabled=False, semantic=False)
+        self.assertFalse(prefilter.score(self.post('[For Hire] dev', 'hire me')).rejected)
+
+
+class SemanticIndexTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def index(self, dimensions=64):
+        return SemanticIndex(self.directory, embedder=HashingEmbedder(dimensions), centroid_count=2)
+
+    @staticmethod
+    def posts(*ids):
+        return [SimpleNamespace(id=i, title=f'Need a Django developer {i}', content='Budget $500') for i in ids]
+
+    def generations(self):
+        return sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+
+    def test_processes_share_appended_rows(self):
+        writer, reader = self.index(), self.index()
+        self.assertEqual(writer.add_posts(self.posts(1, 2)), 2)
+        self.assertEqual(reader.add_posts(self.posts(2, 3)), 1)
+        self.assertEqual(len(writer), 3)
+        self.assertIn(3, writer)
+        self.assertEqual(len(self.generations()), 1)
+
+    def test_new_embedder_starts_a_new_generation_without_touching_mapped_files(self):
+        old = self.index()
+        old.add_posts(self.posts(1, 2))
+        mapped = old._vectors
+        expected = np.array(mapped)
+        old_files = os.path.join(self.directory, old._generation)
+
+        other = self.index(dimensions=32)
+        self.assertNotEqual(other._generation, old._generation)
+        self.assertEqual(len(other), 0)
+        # The old files are neither truncated nor replaced, so the mapping stays valid
+        self.assertEqual(os.path.getsize(os.path.join(old_files, 'vectors.f32')), expected.nbytes)
+        np.testing.assert_array_equal(mapped, expected)
+        # A process with a different embedder keeps its own generation
+        self.assertEqual(len(old), 2)
+
+        # Back to the first embedder: yet another generation, which `old` follows
+        self.index().add_posts(self.posts(5))
+        self.assertEqual(len(old), 1)
+        self.assertIn(5, old)
+        # Only the newest two generations are kept; unlinking doesn't affect live mappings
+        self.assertEqual(len(self.generations()), 2)
+        self.assertFalse(os.path.exists(old_files))
+        np.testing.assert_array_equal(mapped, expected)
+
+    def test_files_from_before_generations_are_replaced(self):
+        open(os.path.join(self.directory, 'vectors.f32'), 'wb').close()
+        open(os.path.join(self.directory, 'ids.i64'), 'wb').close()
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as f:
+            json.dump({'embedder': 'hashing-64', 'dimensions': 64}, f)
+
+        index = self.index()
+        index.add_posts(self.posts(1))
+        self.assertEqual(len(self.index()), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'vectors.f32')))
+
+
+OPENAI_REQUEST = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+
+
+def rate_limit_error(retry_after=None):
+    headers = {'retry-after': str(retry_after)} if retry_after else {}
+    return RateLimitError('Rate limited', response=httpx.Response(429, headers=headers, request=OPENAI_REQUEST), body=None)
+
+
+class OpenAIGovernorTests(SimpleTestCase):
+    def governor(self, **kwargs):
+        kwargs.setdefault('max_concurrency', 8)
+        kwargs.setdefault('max_retries', 3)
+        kwargs.setdefault('circuit_failures', 10)
+        kwargs.setdefault('circuit_cooldown', 30)
+        return OpenAIGovernor(store=LocalStateStore(), acquire_timeout=0, **kwargs)
+
+    def setUp(self):
+        sleep = mock.patch('langagent.governor.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_limit_grows_by_one_over_limit_after_each_success(self):
+        governor = self.governor()
+        governor.record_failure(rate_limited=True)
+        governor.record_failure(rate_limited=True)
+        self.assertEqual(governor.stats()['concurrency_limit'], 2)
+
+        governor.record_success()
+        self.assertEqual(governor.stats()['concurrency_limit'], 2.5)
+        governor.record_success()
+        self.assertEqual(governor.stats()['concurrency_limit'], 2.9)
+        for _ in range(100):
+            governor.record_success()
+        self.assertEqual(governor.stats()['concurrency_limit'], 8)
+
+    def test_rate_limit_halves_the_limit(self):
+        governor = self.governor()
+        responses = [rate_limit_error(), ('ok', {})]
+
+        def send():
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        self.assertEqual(governor.call(send), 'ok')
+        # Halved to 4 by the 429, then +1/4 for the retry that went through
+        self.assertEqual(governor.stats()['concurrency_limit'], 4.25)
+        self.assertEqual(governor.stats()['in_flight'], 0)
+
+        governor.record_failure(rate_limited=False)
+        self.assertEqual(governor.stats()['concurrency_limit'], 4.25)
+
+    def test_retry_after_pauses_every_caller(self):
+        governor = self.governor()
+        error = rate_limit_error(retry_after=5)
+        self.assertEqual(governor._retry_after(error), 5)
+        self.assertGreaterEqual(governor._backoff(0, 5), 5)
+        governor.record_failure(rate_limited=True, retry_after=5)
+        self.assertGreater(governor.stats()['paused_for_seconds'], 4)
+        with self.assertRaisesRegex(OpenAIUnavailable, 'No OpenAI request slot'):
+            governor.acquire()
+
+    def test_low_remaining_headers_halve_the_limit(self):
+        governor = self.governor()
+        governor.record_success({'x-ratelimit-limit-requests': '100', 'x-ratelimit-remaining-requests': '5'})
+        self.assertEqual(governor.stats()['concurrency_limit'], 4)
+
+    def test_circuit_breaker_opens_half_opens_and_closes(self):
+        governor = self.governor(max_concurrency=4, circuit_failures=3)
+        self.assertFalse(governor.record_failure(rate_limited=False))
+        self.assertFalse(governor.record_failure(rate_limited=False))
+        self.assertTrue(governor.record_failure(rate_limited=False))
+
+        self.assertTrue(governor.stats()['circuit_open'])
+        with self.assertRaisesRegex(OpenAIUnavailable, 'circuit breaker open'):
+            governor.acquire()
+        send = mock.Mock(return_value=('ok', {}))
+        with self.assertRaises(OpenAIUnavailable):
+            governor.call(send)
+        send.assert_not_called()
+
+        # Cooldown over: a single trial call at the minimum limit
+        governor.store.update(lambda state: state.update(open_until=time.time() - 1))
+        lease = governor.acquire()
+        with self.assertRaisesRegex(OpenAIUnavailable, 'No OpenAI request slot'):
+            governor.acquire()
+        governor.release(lease)
+
+        # The trial succeeds: failures reset and the limit grows again
+        self.assertEqual(governor.call(send), 'ok')
+        stats = governor.stats()
+        self.assertFalse(stats['circuit_open'])
+        self.assertEqual(stats['consecutive_failures'], 0)
+        self.assertEqual(stats['concurrency_limit'], 2)
+        leases = [governor.acquire(), governor.acquire()]
+        self.assertEqual(len(set(leases)), 2)
+
+    def test_retries_are_exhausted(self):
+        governor = self.governor(max_retries=2)
+        send = mock.Mock(side_effect=APIConnectionError(request=OPENAI_REQUEST))
+        with self.assertRaises(APIConnectionError):
+            governor.call(send)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        stats = governor.stats()
+        self.assertEqual(stats['consecutive_failures'], 3)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_opening_the_breaker_stops_retrying(self):
+        governor = self.governor(max_retries=5, circuit_failures=2)
+        send = mock.Mock(side_effect=APIConnectionError(request=OPENAI_REQUEST))
+        with self.assertRaises(APIConnectionError):
+            governor.call(send)
+        self.assertEqual(send.call_count, 2)
+        self.assertTrue(governor.stats()['circuit_open'])
+
+    def test_other_errors_are_not_retried(self):
+        governor = self.governor()
+        send = mock.Mock(side_effect=ValueError('bad request'))
+        with self.assertRaises(ValueError):
+            governor.call(send)
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(governor.stats()['consecutive_failures'], 0)
+
+
+def create_posts(*contents, first_id=1):
+    subreddit, _ = Subreddit.objects.get_or_create(name='forhire')
+    return [
+        RedditPost.objects.create(
+            reddit_id=f'p{i}', title='Need a Django developer', content=content, author='someone',
+            subreddit=subreddit, url=f'https://reddit.com/p{i}', created_at=timezone.now(),
+        )
+        for i, content in enumerate(contents, first_id)
+    ]
+
+
+def create_agent(governor=None):
+    """RedditLeadAgent with a mock OpenAI client; its with_raw_response.create answers each request"""
+    governor = governor or OpenAIGovernor(
+        store=LocalStateStore(), max_concurrency=2, max_retries=0, circuit_failures=10, circuit_cooldown=30,
+    )
+    with mock.patch('langagent.agent.create_openai_client'), \
+            mock.patch('langagent.agent.get_openai_governor', return_value=governor):
+        return RedditLeadAgent()
+
+
+def completion(content):
+    """A raw chat completion response as the governor reads it"""
+    message = SimpleNamespace(content=content if isinstance(content, str) else json.dumps(content))
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+    return mock.Mock(headers={}, parse=mock.Mock(return_value=SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)))
+
+
+class ClassifyWithUnavailableOpenAITests(TestCase):
+    def setUp(self):
+        self.posts = create_posts('Budget is $100', 'Budget is $200')
+        self.agent = create_agent()
+        self.governor = self.agent.governor
+        self.create = self.agent.client.chat.completions.with_raw_response.create
+
+    def test_exhausted_retries_reach_the_caller(self):
+        self.create.side_effect = APIConnectionError(request=OPENAI_REQUEST)
+        with self.assertRaises(APIConnectionError):
+            self.agent.classify_post(self.posts[0])
+        # No per-post fallback requests after the batch request gave up
+        with self.assertRaises(APIConnectionError):
+            self.agent.classify_posts_batch(self.posts)
+        self.assertEqual(self.create.call_count, 2)
+        self.assertFalse(RedditPost.objects.filter(classification__isnull=False).exists())
+
+    def test_open_breaker_reaches_the_caller(self):
+        for _ in range(10):
+            self.governor.record_failure(rate_limited=False)
+        with self.assertRaises(OpenAIUnavailable):
+            self.agent.process_post(self.posts[0])
+        with self.assertRaises(OpenAIUnavailable):
+            self.agent.process_unclassified_posts(max_in_flight=1)
+        self.create.assert_not_called()
+
+
+class BatchClassificationTests(TestCase):
+    def setUp(self):
+        SystemConfig.set_value('ai_classification_tiers', 'gpt-4o-mini')
+        self.posts = create_posts('Budget is $100', 'Budget is $200', 'Budget is $300')
+        self.agent = create_agent()
+        self.create = self.agent.client.chat.completions.with_raw_response.create
+
+    def requested_contents(self, call):
+        prompt = json.dumps(call.kwargs['messages'])
+        return [post.content for post in self.posts if post.content in prompt]
+
+    def test_missing_and_invalid_entries_fall_back_to_single_requests(self):
+        first, second, third = self.posts
+        self.create.side_effect = [
+            completion([
+                {'post_id': first.id, 'is_opportunity': True, 'confidence_score': 0.9, 'urgency': 'high'},
+                {'post_id': second.id, 'is_opportunity': True, 'confidence_score': 'very'},
+                {'post_id': 'unknown'},
+            ]),
+            completion({'is_opportunity': False, 'confidence_score': 0.2}),
+            completion({'is_opportunity': True, 'confidence_score': 0.8}),
+        ]
+        results = self.agent.classify_posts_batch(self.posts)
+
+        self.assertEqual(self.create.call_count, 3)
+        batch_call, *single_calls = self.create.call_args_list
+        self.assertEqual(self.requested_contents(batch_call), [post.content for post in self.posts])
+        self.assertEqual([self.requested_contents(call) for call in single_calls], [[second.content], [third.content]])
+        self.assertEqual(results[first.id].urgency_level, 'high')
+        self.assertFalse(results[second.id].is_opportunity)
+        self.assertTrue(results[third.id].is_opportunity)
+        self.assertEqual(RedditPost.objects.filter(classification__isnull=False).count(), 3)
+
+    def test_malformed_response_falls_back_for_every_post(self):
+        self.create.side_effect = [completion("Sorry, I can't help with that.")] + [
+            completion({'is_opportunity': False, 'confidence_score': 0.1}) for _ in self.posts
+        ]
+        results = self.agent.classify_posts_batch(self.posts)
+
+        self.assertEqual(self.create.call_count, 4)
+        self.assertEqual(
+            [self.requested_contents(call) for call in self.create.call_args_list[1:]],
+            [[post.content] for post in self.posts],
+        )
+        self.assertTrue(all(results[post.id] is not None for post in self.posts))
+
+
+class ClassificationCacheTests(TestCase):
+    def setUp(self):
+        counters = mock.patch.multiple(ClassificationCache, hits=0, misses=0)
+        counters.start()
+        self.addCleanup(counters.stop)
+        self.cache = ClassificationCache(ttl_hours=24, max_entries=2)
+
+    @staticmethod
+    def classify(post, **fields):
+        from reddit.models import Classification
+        fields.setdefault('is_opportunity', True)
+        return Classification.objects.create(post=post, confidence_score=0.9, urgency_level='high', **fields)
+
+    def test_reposts_with_different_formatting_share_a_key(self):
+        self.assertEqual(
+            content_hash('Need a Django developer!', 'Budget:  $500.\n\nDM me'),
+            content_hash('need a django developer', 'budget $500 DM me'),
+        )
+        self.assertNotEqual(content_hash('Need a Django developer', '$500'), content_hash('Need a Django developer', '$600'))
+
+    def test_hit_clones_the_classification(self):
+        original, repost, other = create_posts('Budget is $500!', 'budget is $500', 'Budget is $900')
+        self.assertIsNone(self.cache.lookup(original))
+        self.cache.store(original, self.classify(original, summary='Needs a dashboard'))
+
+        cloned = self.cache.lookup(repost)
+        self.assertEqual(cloned.post, repost)
+        self.assertEqual(cloned.classified_by, 'cache')
+        self.assertEqual((cloned.is_opportunity, cloned.urgency_level, cloned.summary), (True, 'high', 'Needs a dashboard'))
+        self.assertIsNone(self.cache.lookup(other))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['process_hits'], stats['process_misses'], stats['total_hits']), (1, 2, 1))
+        self.assertEqual(stats['process_hit_rate'], 0.333)
+
+    def test_expired_entries_miss_and_are_evicted(self):
+        original, repost = create_posts('Budget is $500', 'Budget is $500')
+        self.cache.store(original, self.classify(original))
+        ClassificationCacheEntry.objects.update(created_at=timezone.now() - timedelta(hours=25))
+        self.assertIsNone(self.cache.lookup(repost))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertFalse(ClassificationCacheEntry.objects.exists())
+
+    def test_least_recently_used_entries_are_evicted_beyond_max_entries(self):
+        first, second, third, repost = create_posts('Budget $1', 'Budget $2', 'Budget $3', 'Budget $1')
+        self.cache.store(first, self.classify(first))
+        self.cache.store(second, self.classify(second))
+        self.cache.lookup(repost)
+        self.cache.store(third, self.classify(third))
+
+        kept = set(ClassificationCacheEntry.objects.values_list('content_hash', flat=True))
+        self.assertEqual(kept, {content_hash(post.title, post.content) for post in (first, third)})
+
+    def test_disabled_cache_is_bypassed(self):
+        SystemConfig.set_value('classification_cache_enabled', 'false')
+        cache = ClassificationCache()
+        original, repost = create_posts('Budget is $500', 'Budget is $500')
+        cache.store(original, self.classify(original))
+        self.assertIsNone(cache.lookup(repost))
+        self.assertFalse(ClassificationCacheEntry.objects.exists())
+
+    def test_batch_sends_duplicate_content_once(self):
+        SystemConfig.set_value('ai_classification_tiers', 'gpt-4o-mini')
+        agent = create_agent()
+        create = agent.client.chat.completions.with_raw_response.create
+        original, repost, other = create_posts('Budget is $500', 'Budget is $500', 'Budget is $900')
+        create.side_effect = [completion([
+            {'post_id': original.id, 'is_opportunity': True, 'confidence_score': 0.9},
+            {'post_id': other.id, 'is_opportunity': False, 'confidence_score': 0.1},
+        ])]
+
+        results = agent.classify_posts_batch([original, repost, other])
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(results[repost.id].classified_by, 'cache')
+        self.assertTrue(results[repost.id].is_opportunity)
+
+        # Later batches don't send cached content at all
+        later, = create_posts('Budget is $900', first_id=4)
+        self.assertFalse(agent.classify_posts_batch([later])[later.id].is_opportunity)
+        self.assertEqual(create.call_count, 1)
+
+
+class CompiledPromptsTests(TestCase):
+    def setUp(self):
+        state = mock.patch.multiple(prompts, _compiled=None, _fingerprint=None, _checked_at=0.0)
+        state.start()
+        self.addCleanup(state.stop)
+        self.persona = AIPersona.objects.create(name='Default', style='Friendly and brief')
+
+    def test_prompts_are_compiled_once(self):
+        compiled = prompts.get_compiled_prompts()
+        self.assertIn('Friendly and brief', compiled.reply_system)
+        with self.assertNumQueries(0):
+            self.assertIs(prompts.get_compiled_prompts(), compiled)
+        # After the check interval an unchanged fingerprint keeps the same prompts
+        with mock.patch.object(prompts, 'FINGERPRINT_CHECK_SECONDS', 0), self.assertNumQueries(3):
+            self.assertIs(prompts.get_compiled_prompts(), compiled)
+
+    def test_saves_and_deletes_in_this_process_invalidate_immediately(self):
+        compiled = prompts.get_compiled_prompts()
+        AIPromptTemplate.objects.create(
+            template_type='classification', name='Learned', prompt_template='Ignore posts about homework.',
+        )
+        rebuilt = prompts.get_compiled_prompts()
+        self.assertIsNot(rebuilt, compiled)
+        self.assertIn('Ignore posts about homework.', rebuilt.classification_system)
+        self.assertIn('Ignore posts about homework.', rebuilt.batch_classification_system)
+
+        self.persona.delete()
+        self.assertNotIn('Friendly and brief', prompts.get_compiled_prompts().reply_system)
+
+    def test_changes_from_other_processes_are_noticed_by_fingerprint(self):
+        compiled = prompts.get_compiled_prompts()
+        # Queryset updates and bulk inserts send no signals, like changes made in another process
+        AIPersona.objects.update(style='Formal', updated_at=timezone.now() + timedelta(seconds=1))
+        ReplyTemplate.objects.bulk_create([
+            ReplyTemplate(name='Web', template_type='web_development', content='Happy to help with {services}'),
+        ])
+        self.assertIs(prompts.get_compiled_prompts(), compiled)
+
+        with mock.patch.object(prompts, 'FINGERPRINT_CHECK_SECONDS', 0):
+            rebuilt = prompts.get_compiled_prompts()
+        self.assertIsNot(rebuilt, compiled)
+        self.assertIn('Persona Style: Formal', rebuilt.reply_system)
+        self.assertEqual([template.name for template in rebuilt.reply_templates['web_development']], ['Web'])
@@ -0,0 +1,181 @@
+import logging
+import math
+import re
+from functools import lru_cache
+from .prefilter import BUDGET
+
+logger = logging.getLogger(__name__)
+
+# USD per 1K (prompt, completion) tokens, used for cost estimates only
+MODEL_PRICES_PER_1K = {
+    'gpt-4': (0.03, 0.06),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4o': (0.005, 0.015),
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+}
+
+# Sentences worth keeping from the middle of a long post
+TECH = re.compile(
+    r'\b(python|django|flask|fastapi|react|next\.?js|node|javascript|typescript|api|sql|postgres|'
+    r'ai|ml|llm|gpt|openai|langchain|langgraph|rag|chatbot|automation|scrap\w*|dashboard|'
+    r'website|web ?app|mobile|ios|android|deadline|asap|urgent)\b'
+)
+
+OMISSION_MARKER = ' [...] '
+
+# Shares of the budget given to the opening and closing sentences
+HEAD_SHARE = 0.4
+TAIL_SHARE = 0.25
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable for {model}, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text, model='gpt-4'):
+    """Tokens in text for model; about four characters per token if tiktoken can't load"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = MODEL_PRICES_PER_1K.get(model, MODEL_PRICES_PER_1K['gpt-4'])
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def _sentences(text, max_piece_tokens, model):
+    """Split text into sentences, breaking run-on ones into pieces of at most max_piece_tokens"""
+    pieces = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence, model)
+        if tokens <= max_piece_tokens:
+            pieces.append((sentence, tokens))
+            continue
+        words = sentence.split()
+        chunk_count = math.ceil(tokens / max_piece_tokens)
+        chunk_size = max(1, math.ceil(len(words) / chunk_count))
+        for start in range(0, len(words), chunk_size):
+            piece = ' '.join(words[start:start + chunk_size])
+            tokens = count_tokens(piece, model)
+            if tokens <= max_piece_tokens:
+                pieces.append((piece, tokens))
+                continue
+            # A single enormous "word" (URL, base64, keyboard mash): cut by characters
+            width = max(1, len(piece) * max_piece_tokens // tokens)
+            for offset in range(0, len(piece), width):
+                chunk = piece[offset:offset + width]
+                pieces.append((chunk, count_tokens(chunk, model)))
+    return pieces
+
+
+def fit_to_budget(text, max_tokens, model='gpt-4'):
+    """Shorten text to about max_tokens; return (text, truncated).
+
+    Keeps the opening and closing sentences, plus any sentences in between
+    that mention a budget or a technology, in their original order. Gaps
+    are marked with "[...]".
+    """
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text, False
+
+    pieces = _sentences(text, max(8, max_tokens // 8), model)
+    marker_tokens = count_tokens(OMISSION_MARKER, model)
+    keep = set()
+    used = 0
+
+    for index, (_, tokens) in enumerate(pieces):
+        if used + tokens > max_tokens * HEAD_SHARE:
+            break
+        keep.add(index)
+        used += tokens
+
+    tail_used = 0
+    for index in range(len(pieces) - 1, -1, -1):
+        tokens = pieces[index][1]
+        if index in keep or tail_used + tokens > max_tokens * TAIL_SHARE:
+            break
+        keep.add(index)
+        tail_used += tokens
+    used += tail_used
+
+    # Budget and tech sentences from the middle, while they fit with their markers
+    for index, (piece, tokens) in enumerate(pieces):
+        if index in keep or not (BUDGET.search(piece.lower()) or TECH.search(piece.lower())):
+            continue
+        if used + tokens + 2 * marker_tokens > max_tokens:
+            continue
+        keep.add(index)
+        used += tokens + marker_tokens
+
+    parts = []
+    previous = -1
+    for index in sorted(keep):
+        if index != previous + 1:
+            parts.append(OMISSION_MARKER.strip())
+        parts.append(pieces[index][0])
+        previous = index
+    if previous != len(pieces) - 1:
+        parts.append(OMISSION_MARKER.strip())
+
+    return ' '.join(parts), True
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def usage_by_subreddit(since):
+    """Token, cost and latency distribution of AI calls since a datetime, per subreddit"""
+    from .models import AIUsageRecord
+    rows = AIUsageRecord.objects.filter(created_at__gte=since).values_list(
+        'subreddit', 'call_type', 'prompt_tokens', 'completion_tokens', 'cost_usd', 'latency_ms', 'content_truncated'
+    )
+
+    grouped = {}
+    for subreddit, call_type, prompt_tokens, completion_tokens, cost, latency, truncated in rows:
+        entry = grouped.setdefault(subreddit, {
+            'subreddit': subreddit, 'calls': 0, 'classification_calls': 0, 'reply_calls': 0,
+            'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0, 'truncated': 0,
+            'tokens': [], 'latencies': [],
+        })
+        entry['calls'] += 1
+        entry['classification_calls' if call_type == 'classification' else 'reply_calls'] += 1
+        entry['prompt_tokens'] += prompt_tokens
+        entry['completion_tokens'] += completion_tokens
+        entry['cost_usd'] += cost
+        entry['truncated'] += int(truncated)
+        entry['tokens'].append(prompt_tokens + completion_tokens)
+        entry['latencies'].append(latency)
+
+    summary = []
+    for entry in grouped.values():
+        tokens = sorted(entry.pop('tokens'))
+        latencies = sorted(entry.pop('latencies'))
+        entry['cost_usd'] = round(entry['cost_usd'], 4)
+        entry['tokens_p50'] = _percentile(tokens, 0.5)
+        entry['tokens_p95'] = _percentile(tokens, 0.95)
+        entry['latency_ms_p50'] = round(_percentile(latencies, 0.5), 1)
+        entry['latency_ms_p95'] = round(_percentile(latencies, 0.95), 1)
+        summary.append(entry)
+    return sorted(summary, key=lambda entry: entry['cost_usd'], reverse=True)
@@ -0,0 +1,239 @@
+import re
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from praw.exceptions import RedditAPIException
+from prawcore.exceptions import TooManyRequests
+from .client import create_reddit_client
+from .models import RedditAccount, ReplyOutbox, SystemConfig
+from .ratelimit import create_rate_budget, get_reddit_rate_budget
+import logging
+
+logger = logging.getLogger(__name__)
+
+# "Take a break for 9 minutes before trying again."
+RATELIMIT_WAIT = re.compile(r'(\d+)\s*(second|minute|hour)', re.IGNORECASE)
+RATELIMIT_UNITS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+
+def rate_limit_wait(error):
+    """Seconds Reddit asked us to wait if `error` is a rate limit, 0 if it doesn't say, None if it isn't one"""
+    if isinstance(error, TooManyRequests):
+        retry_after = error.response.headers.get('retry-after') if error.response is not None else None
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return 0
+    if isinstance(error, RedditAPIException):
+        for item in error.items:
+            if item.error_type == 'RATELIMIT':
+                match = RATELIMIT_WAIT.search(item.message or '')
+                if match:
+                    return int(match.group(1)) * RATELIMIT_UNITS[match.group(2).lower()]
+                return 0
+    return None
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _session(account=None):
+    """Process-wide praw client and token bucket of one account, rebuilt when the account changes.
+
+    Without an account it's the REDDIT_USERNAME session from settings, so
+    its OAuth token is reused instead of requested again on every call.
+    """
+    with _sessions_lock:
+        if account is None:
+            key = None
+            version = (
+                settings.REDDIT_USERNAME, settings.REDDIT_PASSWORD, settings.REDDIT_CLIENT_ID,
+                settings.REDDIT_CLIENT_SECRET, settings.REDDIT_API_BASE_URL,
+            )
+        else:
+            key = account.username
+            version = (account.updated_at, account.requests_per_minute)
+        session = _sessions.get(key)
+        if session is None or session[0] != version:
+            if account is None:
+                session = (version, create_reddit_client(authenticated=True), get_reddit_rate_budget())
+            else:
+                session = (
+                    version,
+                    create_reddit_client(account=account),
+                    create_rate_budget(f'account:{account.username}', account.requests_per_minute),
+                )
+            _sessions[key] = session
+        return session
+
+
+class AccountPool:
+    """The Reddit accounts replies are posted from.
+
+    An account is eligible for a reply when it's active, not cooling down
+    after Reddit rate-limited it, and either has no subreddits assigned or
+    has the reply's subreddit. `choose` picks the least loaded eligible
+    account: fewest outbox entries queued or in flight, then fewest posted in
+    the last hour. Each account has its own praw session and token bucket,
+    shared by all workers like the app-wide one.
+    Without any RedditAccount rows the pool is just REDDIT_USERNAME from
+    settings, as before.
+    """
+
+    def __init__(self):
+        try:
+            self.cooldown_seconds = float(SystemConfig.get_value('account_cooldown_seconds', 600))
+        except (TypeError, ValueError):
+            self.cooldown_seconds = 600.0
+        self.accounts = {
+            account.username: account
+            for account in RedditAccount.objects.prefetch_related('subreddits')
+        }
+        self._load = None
+
+    @property
+    def uses_settings_account(self):
+        return not self.accounts
+
+    @staticmethod
+    def _serves(account, subreddit_id):
+        subreddit_ids = {subreddit.id for subreddit in account.subreddits.all()}
+        return not subreddit_ids or subreddit_id in subreddit_ids
+
+    def _eligible(self, account, subreddit_id, now):
+        return account.is_active and not account.is_cooling_down(now) and self._serves(account, subreddit_id)
+
+    def is_available(self, username, subreddit_id, now=None):
+        if self.uses_settings_account:
+            return username == settings.REDDIT_USERNAME
+        account = self.accounts.get(username)
+        return account is not None and self._eligible(account, subreddit_id, now or timezone.now())
+
+    def _current_load(self):
+        if self._load is None:
+            since = timezone.now() - timedelta(hours=1)
+            rows = ReplyOutbox.objects.values('account').annotate(
+                pending=Count('id', filter=Q(state__in=['queued', 'in_flight'])),
+                recent=Count('id', filter=Q(state='posted', posted_at__gte=since)),
+            )
+            self._load = {row['account']: [row['pending'], row['recent']] for row in rows}
+        return self._load
+
+    def choose(self, subreddit_id, exclude=(), now=None):
+        """Username of the least loaded eligible account, or None if no account may post there now"""
+        if self.uses_settings_account:
+            return settings.REDDIT_USERNAME if settings.REDDIT_USERNAME not in exclude else None
+        now = now or timezone.now()
+        candidates = [
+            username for username, account in self.accounts.items()
+            if username not in exclude and self._eligible(account, subreddit_id, now)
+        ]
+        if not candidates:
+            return None
+        load = self._current_load()
+        username = min(candidates, key=lambda name: (*load.get(name, [0, 0]), name))
+        # Count the reply we're about to hand it, so a batch spreads across accounts
+        load.setdefault(username, [0, 0])[0] += 1
+        return username
+
+    def next_available_at(self, subreddit_id, now=None):
+        """When the first account eligible for the subreddit comes out of its cooldown, or None"""
+        now = now or timezone.now()
+        ends = [
+            account.cooldown_until for account in self.accounts.values()
+            if account.is_active and account.is_cooling_down(now) and self._serves(account, subreddit_id)
+        ]
+        return min(ends) if ends else None
+
+    def _account_session(self, username):
+        return _session(None if self.uses_settings_account else self.accounts[username])
+
+    def client(self, username):
+        return self._account_session(username)[1]
+
+    def rate_budget(self, username):
+        return self._account_session(username)[2]
+
+    def start_cooldown(self, username, wait_seconds, now=None):
+        """Keep the account out of the pool after a rate limit; returns when it's back"""
+        now = now or timezone.now()
+        until = now + timedelta(seconds=wait_seconds or self.cooldown_seconds)
+        account = self.accounts.get(username)
+        if account is not None:
+            account.cooldown_until = until
+            RedditAccount.objects.filter(id=account.id).update(cooldown_until=until)
+        logger.warning(f"Reddit rate-limited {username}; not posting from it until {until.isoformat()}")
+        return until
+
+    def stats(self, now=None):
+        """Utilisation and throughput of every account, for the API"""
+        now = now or timezone.now()
+        hour_ago = now - timedelta(hours=1)
+        day_ago = now - timedelta(hours=24)
+        rows = {
+            row['account']: row for row in ReplyOutbox.objects.values('account').annotate(
+                queued=Count('id', filter=Q(state='queued')),
+                in_flight=Count('id', filter=Q(state='in_flight')),
+                posted_last_hour=Count('id', filter=Q(state='posted', posted_at__gte=hour_ago)),
+                posted_last_24h=Count('id', filter=Q(state='posted', posted_at__gte=day_ago)),
+                failed_last_24h=Count('id', filter=Q(state='failed', updated_at__gte=day_ago)),
+                last_posted_at=Max('posted_at'),
+            )
+        }
+
+        if self.uses_settings_account:
+            accounts = [{
+                'username': settings.REDDIT_USERNAME, 'is_active': True,
+                'cooldown_until': None, 'subreddits': [],
+            }]
+        else:
+            accounts = [{
+                'username': account.username,
+                'is_active': account.is_active,
+                'cooldown_until': account.cooldown_until if account.is_cooling_down(now) else None,
+                'subreddits': sorted(subreddit.name for subreddit in account.subreddits.all()),
+            } for account in self.accounts.values()]
+
+        # Posts per hour one account can make at the configured reply spacing
+        try:
+            spacing = (
+                float(SystemConfig.get_value('reply_min_spacing_seconds', 3))
+                + float(SystemConfig.get_value('reply_spacing_jitter_seconds', 5)) / 2
+            )
+        except (TypeError, ValueError):
+            spacing = 5.5
+        capacity_per_account = 3600 / max(spacing, 1.0)
+
+        for account in accounts:
+            row = rows.get(account['username'], {})
+            account.update({
+                'cooling_down': account['cooldown_until'] is not None,
+                'queued': row.get('queued', 0),
+                'in_flight': row.get('in_flight', 0),
+                'posted_last_hour': row.get('posted_last_hour', 0),
+                'posted_last_24h': row.get('posted_last_24h', 0),
+                'posts_per_hour': round(row.get('posted_last_24h', 0) / 24, 2),
+                'failed_last_24h': row.get('failed_last_24h', 0),
+                'last_posted_at': row.get('last_posted_at'),
+                'utilisation': round(row.get('posted_last_hour', 0) / capacity_per_account, 3),
+            })
+
+        available = [a for a in accounts if a['is_active'] and not a['cooling_down']]
+        capacity = capacity_per_account * len(available)
+        posted_last_hour = sum(a['posted_last_hour'] for a in accounts)
+        return {
+            'accounts': len(accounts),
+            'available': len(available),
+            'cooling_down': sum(1 for a in accounts if a['cooling_down']),
+            'busy': sum(1 for a in accounts if a['queued'] or a['in_flight']),
+            'queued': sum(a['queued'] for a in accounts),
+            'in_flight': sum(a['in_flight'] for a in accounts),
+            'posted_last_hour': posted_last_hour,
+            'capacity_per_hour': round(capacity, 1),
+            'utilisation': round(posted_last_hour / capacity, 3) if capacity else None,
+            'unassigned': rows.get('', {}).get('queued', 0),
+            'per_account': sorted(accounts, key=lambda a: a['username']),
+        }
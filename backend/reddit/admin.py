@@ -2,20 +2,22 @@ from django.contrib import admin
 from .models import (
     Keyword, Subreddit, RedditPost, Classification, Reply, 
     Notification, AIPersona, PerformanceMetrics, SystemConfig, 
-    Leaderboard, ReplyTemplate
+    Leaderboard, ReplyTemplate, PostingSlot, ReplyOutbox, RedditAccount
+)
+from langagent.models import (
+    AILearningData, AIPromptTemplate, AIPerformanceMetrics, ClassificationCacheEntry, AIUsageRecord
 )
-from langagent.models import AILearningData, AIPromptTemplate, AIPerformanceMetrics
 
 @admin.register(Keyword)
 class KeywordAdmin(admin.ModelAdmin):
-    list_display = ['keyword', 'is_active', 'created_at']
+    list_display = ['keyword', 'is_active', 'weight', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['keyword']
     ordering = ['keyword']
 
 @admin.register(Subreddit)
 class SubredditAdmin(admin.ModelAdmin):
-    list_display = ['name', 'is_active', 'created_at']
+    list_display = ['name', 'is_active', 'last_seen_created_at', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name']
     ordering = ['name']
@@ -24,7 +26,7 @@ class SubredditAdmin(admin.ModelAdmin):
 class RedditPostAdmin(admin.ModelAdmin):
     list_display = [
         'title', 'author', 'subreddit', 'score', 'comment_count', 
-        'created_at', 'is_opportunity', 'priority'
+        'created_at', 'is_opportunity', 'priority', 'classification_priority'
     ]
     list_filter = [
         'is_opportunity', 'priority', 'created_at', 'monitoring_enabled',
@@ -46,9 +48,9 @@ class RedditPostAdmin(admin.ModelAdmin):
 class ClassificationAdmin(admin.ModelAdmin):
     list_display = [
         'post', 'is_opportunity', 'priority', 'confidence_score',
-        'created_at'
+        'classified_by', 'prefilter_score', 'created_at'
     ]
-    list_filter = ['is_opportunity', 'priority', 'created_at']
+    list_filter = ['is_opportunity', 'priority', 'classified_by', 'created_at']
     search_fields = ['post__title', 'summary', 'intent']
     ordering = ['-created_at']
 
@@ -123,6 +125,32 @@ class SystemConfigAdmin(admin.ModelAdmin):
     ordering = ['key']
     readonly_fields = ['updated_at']
 
+@admin.register(RedditAccount)
+class RedditAccountAdmin(admin.ModelAdmin):
+    list_display = ['username', 'is_active', 'requests_per_minute', 'cooldown_until', 'updated_at']
+    list_filter = ['is_active']
+    search_fields = ['username', 'notes']
+    filter_horizontal = ['subreddits']
+    ordering = ['username']
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(ReplyOutbox)
+class ReplyOutboxAdmin(admin.ModelAdmin):
+    list_display = [
+        'idempotency_key', 'account', 'state', 'attempts', 'available_at',
+        'reddit_comment_id', 'posted_at', 'created_at'
+    ]
+    list_filter = ['state', 'account', 'created_at']
+    search_fields = ['idempotency_key', 'reddit_comment_id', 'content']
+    ordering = ['-created_at']
+    readonly_fields = ['idempotency_key', 'created_at', 'updated_at', 'posted_at']
+
+@admin.register(PostingSlot)
+class PostingSlotAdmin(admin.ModelAdmin):
+    list_display = ['account', 'next_slot_at', 'last_posted_at', 'updated_at']
+    ordering = ['account']
+    readonly_fields = ['updated_at']
+
 @admin.register(ReplyTemplate)
 class ReplyTemplateAdmin(admin.ModelAdmin):
     list_display = ['name', 'template_type', 'is_active', 'created_at']
@@ -168,13 +196,34 @@ class AIPromptTemplateAdmin(admin.ModelAdmin):
 @admin.register(AIPerformanceMetrics)
 class AIPerformanceMetricsAdmin(admin.ModelAdmin):
     list_display = [
-        'date', 'template_type', 'total_requests', 'successful_requests',
-        'success_rate'
+        'date', 'template_type', 'model', 'total_requests', 'successful_requests',
+        'escalated_requests', 'avg_response_time', 'success_rate'
     ]
-    list_filter = ['date', 'template_type']
+    list_filter = ['date', 'template_type', 'model']
     ordering = ['-date']
     readonly_fields = ['success_rate']
 
     def success_rate(self, obj):
         return f"{obj.success_rate:.1f}%"
     success_rate.short_description = 'Success Rate'
+
+@admin.register(ClassificationCacheEntry)
+class ClassificationCacheEntryAdmin(admin.ModelAdmin):
+    list_display = [
+        'content_hash', 'is_opportunity', 'priority', 'confidence_score',
+        'hit_count', 'last_hit_at', 'created_at'
+    ]
+    list_filter = ['is_opportunity', 'priority', 'created_at']
+    search_fields = ['content_hash', 'summary']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'last_hit_at', 'hit_count']
+
+@admin.register(AIUsageRecord)
+class AIUsageRecordAdmin(admin.ModelAdmin):
+    list_display = [
+        'post', 'subreddit', 'call_type', 'model', 'prompt_tokens',
+        'completion_tokens', 'cost_usd', 'latency_ms', 'content_truncated', 'created_at'
+    ]
+    list_filter = ['call_type', 'model', 'content_truncated', 'created_at']
+    search_fields = ['subreddit', 'post__title']
+    ordering = ['-created_at']
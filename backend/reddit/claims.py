@@ -0,0 +1,131 @@
+import os
+import socket
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+from .models import RedditPost, SystemConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Posts at or above this priority are reported separately in the queue stats
+HIGH_PRIORITY_THRESHOLD = 6.0
+# Claim order: the stored priority only scores freshness at ingest, so ties go to the newest post
+CLAIM_ORDER = ('-classification_priority', '-created_at')
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class PostClaimer:
+    """Hands out unclassified posts to one worker at a time, highest priority first.
+
+    `claim` locks a small batch of unleased rows with SELECT ... FOR UPDATE
+    SKIP LOCKED, so concurrent workers pick disjoint batches without waiting
+    on each other, and stamps them with this worker's id and a lease expiry.
+    Finished posts drop their lease. Posts that failed keep it until it
+    expires, so they're retried by any worker once per lease instead of in
+    a tight loop, and a dead worker's posts are reclaimed the same way.
+    """
+
+    def __init__(self, worker_id=None, lease_seconds=None):
+        self.worker_id = worker_id or default_worker_id()
+        if lease_seconds is None:
+            try:
+                lease_seconds = float(SystemConfig.get_value('classification_lease_seconds', 600))
+            except (TypeError, ValueError):
+                lease_seconds = 600
+        self.lease = timedelta(seconds=lease_seconds)
+
+    def _claimable(self, now):
+        return RedditPost.objects.filter(classification__isnull=True).filter(
+            Q(claim_expires_at__isnull=True) | Q(claim_expires_at__lte=now)
+        )
+
+    def claim(self, limit):
+        """Lease up to `limit` unclassified posts to this worker, highest priority first"""
+        now = timezone.now()
+        with transaction.atomic():
+            # of=('self',): the classification join is nullable and can't be locked
+            rows = list(
+                self._claimable(now)
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by(*CLAIM_ORDER)
+                .values_list('id', 'claim_expires_at')[:limit]
+            )
+            post_ids = [post_id for post_id, _ in rows]
+            if not post_ids:
+                return []
+            RedditPost.objects.filter(id__in=post_ids).update(
+                claimed_by=self.worker_id,
+                claim_expires_at=now + self.lease,
+            )
+
+        reclaimed = sum(1 for _, expires_at in rows if expires_at is not None)
+        if reclaimed:
+            logger.warning(f"Reclaimed {reclaimed} posts whose classification lease expired")
+        return list(
+            RedditPost.objects.filter(id__in=post_ids).select_related('subreddit')
+            .order_by(*CLAIM_ORDER)
+        )
+
+    def claim_post(self, post_id):
+        """Lease a single post; return it, or None if it's classified or leased elsewhere"""
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = (
+                self._claimable(now)
+                .select_for_update(skip_locked=True, of=('self',))
+                .filter(id=post_id)
+                .values_list('id', flat=True)
+            )
+            if not claimed:
+                return None
+            RedditPost.objects.filter(id=post_id).update(
+                claimed_by=self.worker_id,
+                claim_expires_at=now + self.lease,
+            )
+        return RedditPost.objects.select_related('subreddit').get(id=post_id)
+
+    def finish(self, posts):
+        """Drop this worker's leases on posts that now have a classification"""
+        RedditPost.objects.filter(
+            id__in=[post.id for post in posts],
+            claimed_by=self.worker_id,
+            classification__isnull=False,
+        ).update(claimed_by='', claim_expires_at=None)
+
+
+def classification_queue_stats(now=None):
+    """Depth of the classification queue and how long its oldest posts have waited"""
+    now = now or timezone.now()
+    high_priority = Q(classification_priority__gte=HIGH_PRIORITY_THRESHOLD)
+    stats = RedditPost.objects.filter(classification__isnull=True).aggregate(
+        depth=Count('id'),
+        leased=Count('id', filter=Q(claim_expires_at__gt=now)),
+        high_priority_depth=Count('id', filter=high_priority),
+        top_priority=Max('classification_priority'),
+        oldest_fetched_at=Min('fetched_at'),
+        oldest_high_priority_fetched_at=Min('fetched_at', filter=high_priority),
+    )
+    for key in ('oldest', 'oldest_high_priority'):
+        fetched_at = stats.pop(f'{key}_fetched_at')
+        stats[f'{key}_age_seconds'] = round((now - fetched_at).total_seconds(), 1) if fetched_at else 0.0
+    return stats
+
+
+def classification_backpressure():
+    """(backlog, limit) if unclassified posts have reached classify_backlog_limit, else None.
+
+    Fetching stops adding posts while this returns a value; set the limit to 0 to disable it.
+    """
+    try:
+        limit = int(SystemConfig.get_value('classify_backlog_limit', 500))
+    except (TypeError, ValueError):
+        limit = 500
+    if limit <= 0:
+        return None
+    backlog = RedditPost.objects.filter(classification__isnull=True).count()
+    return (backlog, limit) if backlog >= limit else None
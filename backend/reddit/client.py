@@ -0,0 +1,30 @@
+import praw
+from django.conf import settings
+
+
+def create_reddit_client(authenticated=False, account=None):
+    """praw client for the configured app, logged in as REDDIT_USERNAME when authenticated.
+
+    Given a RedditAccount, logs in as that account instead, with its own app
+    credentials if it has any. With REDDIT_API_BASE_URL set, both the OAuth
+    API and the token endpoint point at that server instead of reddit.com
+    (see reddit.fake_services).
+    """
+    kwargs = {
+        'client_id': settings.REDDIT_CLIENT_ID,
+        'client_secret': settings.REDDIT_CLIENT_SECRET,
+        'user_agent': settings.REDDIT_USER_AGENT,
+    }
+    if account is not None:
+        kwargs['username'] = account.username
+        kwargs['password'] = account.password
+        if account.client_id:
+            kwargs['client_id'] = account.client_id
+            kwargs['client_secret'] = account.client_secret
+    elif authenticated:
+        kwargs['username'] = settings.REDDIT_USERNAME
+        kwargs['password'] = settings.REDDIT_PASSWORD
+    if settings.REDDIT_API_BASE_URL:
+        base_url = settings.REDDIT_API_BASE_URL.rstrip('/')
+        kwargs.update(oauth_url=base_url, reddit_url=base_url, check_for_updates=False)
+    return praw.Reddit(**kwargs)
@@ -0,0 +1,474 @@
+import base64
+import html
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Posts in a synthetic recording, as (title, body) templates
+SYNTHETIC_LEADS = [
+    ("[Hiring] Need a {tech} developer to build a {thing}", "Budget is ${budget}. Looking for someone who can start this week."),
+    ("Looking for a freelancer to automate our {thing}", "We use {tech} today. Paying ${budget} for the first milestone."),
+    ("[Task] Build a {thing} with {tech}", "Need help asap, happy to pay ${budget}/hr for an experienced dev."),
+]
+SYNTHETIC_NOISE = [
+    ("[For Hire] {tech} developer available for {thing} projects", "Portfolio in my profile, DM me."),
+    ("What's the best way to learn {tech}?", "I keep getting stuck building a {thing} and want some advice."),
+    ("Show off: I built a {thing} in {tech} this weekend", "Feedback welcome, source is on GitHub."),
+]
+SYNTHETIC_TECH = ['Django', 'React', 'Next.js', 'Python', 'LangChain', 'FastAPI', 'Node', 'data analysis']
+SYNTHETIC_THINGS = ['dashboard', 'chatbot', 'web app', 'scraper', 'RAG pipeline', 'landing page', 'API', 'report']
+
+# Rough hiring signal used when a recording has no response for a post
+LEAD_HINT = re.compile(r'\b(hiring|need|looking for|budget|paying|\$\d+)', re.IGNORECASE)
+FOR_HIRE_HINT = re.compile(r'\[for hire\]', re.IGNORECASE)
+
+_POST_BLOCK = re.compile(r'Post ID: (\d+)\nPost Title: (.*?)\nPost Content: (.*?)(?=\n---\nPost ID: |\Z)', re.DOTALL)
+_SINGLE_POST = re.compile(r'Post Title: (.*?)\nPost Content: (.*?)(?=\nOpportunity Summary: |\Z)', re.DOTALL)
+
+
+def synthetic_recording(subreddits=('forhire', 'slavelabour', 'webdev'), posts_per_subreddit=200, lead_share=0.3,
+                        seed=0):
+    """Deterministic recording of made-up listings; one post every 5 minutes per subreddit"""
+    rng = random.Random(seed)
+    now = time.time()
+    listings = {}
+    for subreddit in subreddits:
+        posts = []
+        for index in range(posts_per_subreddit):
+            templates = SYNTHETIC_LEADS if rng.random() < lead_share else SYNTHETIC_NOISE
+            title, body = rng.choice(templates)
+            values = {
+                'tech': rng.choice(SYNTHETIC_TECH),
+                'thing': rng.choice(SYNTHETIC_THINGS),
+                'budget': rng.choice([50, 200, 500, 1500, 5000]),
+            }
+            reddit_id = f'{zlib.crc32(f"{seed}:{subreddit}:{index}".encode()):x}'
+            posts.append({
+                'id': reddit_id,
+                'title': title.format(**values),
+                'selftext': (body.format(**values) + ' ') * rng.randint(1, 6),
+                'author': f'user_{rng.randint(1, 5000)}',
+                'subreddit': subreddit,
+                'score': rng.randint(0, 50),
+                'num_comments': rng.randint(0, 20),
+                'created_utc': now - index * 300,
+            })
+        listings[subreddit] = posts
+    return {'listings': listings, 'classifications': {}, 'replies': {}}
+
+
+def recording_from_database(limit=1000):
+    """Recording of stored posts, with their classifications and replies as the canned AI responses"""
+    from reddit.models import Classification, Reply, RedditPost
+
+    posts = RedditPost.objects.select_related('subreddit').order_by('-created_at')[:limit]
+    listings = {}
+    post_ids = []
+    for post in posts:
+        post_ids.append(post.id)
+        listings.setdefault(post.subreddit.name, []).append({
+            'id': post.reddit_id,
+            'title': post.title,
+            'selftext': post.content,
+            'author': post.author,
+            'subreddit': post.subreddit.name,
+            'score': post.score,
+            'num_comments': post.comment_count,
+            'created_utc': post.created_at.timestamp(),
+        })
+
+    classifications = {}
+    for classification in Classification.objects.filter(post_id__in=post_ids).select_related('post'):
+        classifications[classification.post.title] = {
+            'is_opportunity': classification.is_opportunity,
+            'confidence_score': classification.confidence_score,
+            'priority': classification.priority,
+            'intent': classification.intent,
+            'services_needed': classification.services_needed,
+            'budget_amount': classification.budget_amount,
+            'urgency': classification.urgency_level,
+            'summary': classification.summary,
+        }
+    replies = {
+        reply.post.title: reply.content
+        for reply in Reply.objects.filter(post_id__in=post_ids).select_related('post')
+    }
+    return {'listings': listings, 'classifications': classifications, 'replies': replies}
+
+
+class FakeServices:
+    """Local HTTP stand-in for the Reddit and OpenAI APIs.
+
+    Replays a recording: subreddit listings (`/r/<name>/new`, `/hot`,
+    `/api/info`), and chat completions looked up by post title, falling back
+    to a deterministic keyword guess for posts the recording doesn't cover.
+    Replies posted through `/api/comment` are kept in memory and show up in
+    `/api/info` and `/user/<name>/comments`. Every request sleeps `latency_ms` (plus up to `jitter_ms`),
+    and `error_rate` of them fail with a 503 (Reddit) or a 429/500 (OpenAI).
+    Point REDDIT_API_BASE_URL at `url` and OPENAI_BASE_URL at `url + '/v1'`.
+    Listings are shifted so the newest recorded post is "now" at startup;
+    `release` can instead reveal them a few at a time, oldest first.
+    """
+
+    def __init__(self, recording=None, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=0):
+        recording = recording or synthetic_recording(seed=seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.classifications = recording.get('classifications', {})
+        self.replies = recording.get('replies', {})
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.comments = {}
+        self.stats = {}
+        # Posts per subreddit listed so far, oldest first; None lists everything
+        self.visible = None
+
+        posts = [post for listing in recording.get('listings', {}).values() for post in listing]
+        shift = time.time() - max((post['created_utc'] for post in posts), default=time.time())
+        self.listings = {}
+        self.things = {}
+        for name, listing in recording.get('listings', {}).items():
+            submissions = []
+            for post in sorted(listing, key=lambda post: post['created_utc'], reverse=True):
+                data = self._submission_data(post, name, shift)
+                submissions.append(data)
+                self.things[data['name']] = ('t3', data)
+            self.listings[name.lower()] = submissions
+
+    @staticmethod
+    def _submission_data(post, subreddit, shift):
+        reddit_id = post['id']
+        return {
+            'id': reddit_id,
+            'name': f't3_{reddit_id}',
+            'title': post['title'],
+            'selftext': post.get('selftext', ''),
+            'author': post.get('author', 'fake_user'),
+            'subreddit': subreddit,
+            'subreddit_name_prefixed': f'r/{subreddit}',
+            'permalink': f'/r/{subreddit}/comments/{reddit_id}/',
+            'url': f'https://www.reddit.com/r/{subreddit}/comments/{reddit_id}/',
+            'score': post.get('score', 1),
+            'num_comments': post.get('num_comments', 0),
+            'created_utc': post['created_utc'] + shift,
+            'is_self': True,
+        }
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve in a background thread; port 0 picks a free one. Returns the base URL."""
+        self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-services', daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Reddit/OpenAI services listening on {self.url}")
+        return self.url
+
+    def serve_forever(self, host='127.0.0.1', port=8765):
+        self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+        self._server.daemon_threads = True
+        self._server.serve_forever()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, endpoint, error=False):
+        with self._lock:
+            entry = self.stats.setdefault(endpoint, {'requests': 0, 'errors': 0})
+            entry['requests'] += 1
+            entry['errors'] += int(error)
+
+    def _delay_and_maybe_fail(self):
+        """Sleep the configured latency; return True if this request should fail"""
+        with self._lock:
+            delay = self.latency_ms + self._rng.uniform(0, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay / 1000)
+        return fail
+
+    # Reddit
+
+    def release(self, count):
+        """List `count` more posts per subreddit, as if they had just been submitted"""
+        with self._lock:
+            self.visible = (self.visible or 0) + count
+            return all(self.visible >= len(listing) for listing in self.listings.values())
+
+    def _visible_listing(self, name):
+        listing = self.listings.get(name, [])
+        if self.visible is None:
+            return listing
+        return listing[max(0, len(listing) - self.visible):]
+
+    def listing(self, subreddit, sort, params):
+        names = [name.lower() for name in subreddit.split('+')]
+        submissions = [data for name in names for data in self._visible_listing(name)]
+        if len(names) > 1:
+            submissions.sort(key=lambda data: data['created_utc'], reverse=True)
+        if sort == 'hot':
+            submissions = sorted(submissions, key=lambda data: data['score'], reverse=True)
+
+        limit = min(int(params.get('limit', 25)), 100)
+        positions = {data['name']: index for index, data in enumerate(submissions)}
+        after = None
+        if params.get('before'):
+            # Items newer than the cursor; nothing at all if it isn't in the listing
+            end = positions.get(params['before'], 0)
+            page = submissions[max(0, end - limit):end]
+        else:
+            start = positions[params['after']] + 1 if params.get('after') in positions else 0
+            page = submissions[start:start + limit]
+            if start + limit < len(submissions) and page:
+                after = page[-1]['name']
+        return _listing([('t3', data) for data in page], after)
+
+    def info(self, fullnames):
+        with self._lock:
+            found = []
+            for fullname in fullnames:
+                if fullname in self.comments:
+                    data = self.comments[fullname]
+                    # Engagement keeps growing so refresh code sees changes
+                    data['score'] += 1
+                    found.append(('t1', dict(data)))
+                elif fullname in self.things:
+                    found.append(self.things[fullname])
+        return _listing(found, None)
+
+    def user_comments(self, params):
+        """The fake account's comments, newest first"""
+        limit = int(params.get('limit', 25))
+        with self._lock:
+            comments = sorted(self.comments.values(), key=lambda data: data['created_utc'], reverse=True)
+            return _listing([('t1', dict(data)) for data in comments[:limit]], None)
+
+    def post_comment(self, form):
+        parent = form.get('thing_id', '')
+        with self._lock:
+            comment_id = f'c{len(self.comments) + 1:x}'
+            data = {
+                'id': comment_id,
+                'name': f't1_{comment_id}',
+                # Reddit HTML-escapes &, < and > in the bodies it returns
+                'body': html.escape(form.get('text', ''), quote=False),
+                'parent_id': parent,
+                'link_id': parent,
+                'author': 'fake_account',
+                'subreddit': self.things.get(parent, ('t3', {}))[1].get('subreddit', 'fake'),
+                'score': 1,
+                'created_utc': time.time(),
+                'permalink': f'/comments/{parent[3:]}/_/{comment_id}/',
+                'replies': '',
+            }
+            self.comments[data['name']] = data
+        return {'json': {'errors': [], 'data': {'things': [{'kind': 't1', 'data': data}]}}}
+
+    # OpenAI
+
+    def _classification(self, title, content):
+        if title in self.classifications:
+            return dict(self.classifications[title])
+        text = f'{title}\n{content}'
+        is_lead = bool(LEAD_HINT.search(text)) and not FOR_HIRE_HINT.search(title)
+        # Spread confidences deterministically so some land in the escalation band
+        spread = (zlib.crc32(title.encode('utf-8')) % 1000) / 1000
+        return {
+            'is_opportunity': is_lead,
+            'confidence_score': round(0.55 + 0.4 * spread if is_lead else 0.05 + 0.5 * spread, 3),
+            'priority': 'high' if is_lead and spread > 0.5 else 'medium' if is_lead else 'low',
+            'intent': 'Hire a developer' if is_lead else 'No hiring intent',
+            'services_needed': 'web development' if is_lead else '',
+            'budget_amount': '',
+            'urgency': 'medium',
+            'summary': title[:200],
+        }
+
+    def chat_completion(self, body):
+        messages = body.get('messages', [])
+        system = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+        user = '\n'.join(m['content'] for m in messages if m.get('role') == 'user')
+
+        if 'Determine for each Reddit post' in system:
+            content = json.dumps([
+                dict(self._classification(title, text.strip()), post_id=int(post_id))
+                for post_id, title, text in _POST_BLOCK.findall(user)
+            ])
+        else:
+            match = _SINGLE_POST.search(user)
+            title, text = (match.group(1), match.group(2)) if match else ('', user)
+            if 'Determine if the Reddit post' in system:
+                content = json.dumps(self._classification(title, text))
+            else:
+                content = self.replies.get(title) or (
+                    f"Hi! I've built a few projects like \"{title[:80]}\" and would be happy to help. "
+                    f"Happy to share examples if useful."
+                )
+
+        prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        return {
+            'id': f'chatcmpl-fake{zlib.crc32(user.encode("utf-8")):x}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-4'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }
+
+    def embeddings(self, body):
+        from langagent.embeddings import HashingEmbedder
+
+        texts = body.get('input', [])
+        texts = [texts] if isinstance(texts, str) else texts
+        vectors = HashingEmbedder(body.get('dimensions') or 256).embed(texts)
+        data = []
+        for index, vector in enumerate(vectors):
+            if body.get('encoding_format') == 'base64':
+                embedding = base64.b64encode(np.asarray(vector, dtype='<f4').tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({'object': 'embedding', 'index': index, 'embedding': embedding})
+        tokens = sum(len(text) for text in texts) // 4
+        return {
+            'object': 'list',
+            'data': data,
+            'model': body.get('model', 'text-embedding-3-small'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+        }
+
+
+def _listing(things, after):
+    return {
+        'kind': 'Listing',
+        'data': {
+            'after': after,
+            'before': None,
+            'dist': len(things),
+            'children': [{'kind': kind, 'data': data} for kind, data in things],
+        },
+    }
+
+
+def _handler_for(services):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            logger.debug(f"fake services: {format % args}")
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length).decode('utf-8') if length else ''
+
+        def _route(self, method):
+            parsed = urlparse(self.path)
+            path = parsed.path.rstrip('/') or '/'
+            params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+            raw_body = self._body() if method == 'POST' else ''
+
+            if path == '/_fake/stats':
+                return self._send(200, {'endpoints': services.stats, 'comments': len(services.comments)})
+
+            is_openai = path.startswith('/v1/')
+            endpoint = path if is_openai else re.sub(r'^/r/[^/]+/', '/r/<subreddit>/', path)
+            # Token requests always succeed; praw doesn't retry them
+            failed = services._delay_and_maybe_fail() and path != '/api/v1/access_token'
+            services._count(endpoint, error=failed)
+
+            if failed and is_openai:
+                if services._rng.random() < 0.5:
+                    return self._send(429, {'error': {'message': 'Rate limit reached (fake)', 'type': 'requests'}},
+                                      {'retry-after-ms': '200'})
+                return self._send(500, {'error': {'message': 'Internal error (fake)', 'type': 'server_error'}})
+            if failed:
+                return self._send(503, {'message': 'Service Unavailable (fake)', 'error': 503})
+
+            if is_openai:
+                body = json.loads(raw_body or '{}')
+                ratelimit = {
+                    'x-ratelimit-limit-requests': '10000',
+                    'x-ratelimit-remaining-requests': '9999',
+                    'x-ratelimit-limit-tokens': '2000000',
+                    'x-ratelimit-remaining-tokens': '1999000',
+                }
+                if path == '/v1/chat/completions':
+                    return self._send(200, services.chat_completion(body), ratelimit)
+                if path == '/v1/embeddings':
+                    return self._send(200, services.embeddings(body), ratelimit)
+                return self._send(404, {'error': {'message': f'Unknown endpoint {path}'}})
+
+            form = {key: values[-1] for key, values in parse_qs(raw_body).items()}
+            if path == '/api/v1/access_token':
+                return self._send(200, {
+                    'access_token': 'fake-token', 'token_type': 'bearer', 'expires_in': 86400, 'scope': '*',
+                })
+            if path == '/api/v1/me':
+                return self._send(200, {'name': 'fake_account', 'id': 'fake'})
+            if path == '/api/info':
+                fullnames = [name for name in params.get('id', '').split(',') if name]
+                return self._send(200, services.info(fullnames))
+            if path == '/message/comments':
+                # Nobody answers the fake account's comments
+                return self._send(200, _listing([], None))
+            if path == '/api/comment' and method == 'POST':
+                return self._send(200, services.post_comment(form))
+            if re.match(r'^/user/[^/]+/comments$', path):
+                return self._send(200, services.user_comments(params))
+            match = re.match(r'^/r/([^/]+)/(new|hot)$', path)
+            if match:
+                return self._send(200, services.listing(match.group(1), match.group(2), params))
+            return self._send(404, {'message': 'Not Found', 'error': 404})
+
+        def do_GET(self):
+            self._route('GET')
+
+        def do_POST(self):
+            self._route('POST')
+
+    return Handler
@@ -1,25 +1,88 @@
-import praw
 from django.conf import settings
+from django.db import connection
+from django.db.models import Q
 from django.utils import timezone
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pytz
+from .client import create_reddit_client
 from .models import RedditPost, Keyword, Subreddit
+from .matcher import KeywordMatcher
+from .priority import ClassificationPriority
+from .ratelimit import get_reddit_rate_budget
+from .scheduler import PollScheduler
 import logging
+import threading
 import time
 
 logger = logging.getLogger(__name__)
 
+# Reddit listings return at most 100 items per request
+LISTING_PAGE_SIZE = 100
+# First fetch of a subreddit without a cursor (reduced from 100)
+NEW_LISTING_LIMIT = 50
+# Upper bound when catching up on a busy subreddit past its cursor
+MAX_NEW_LISTING_LIMIT = 500
+# Hot posts checked on the first fetch only (reduced from 50)
+HOT_LISTING_LIMIT = 25
+
+
+class SubredditFetchResult:
+    """Outcome of fetching a single subreddit.
+
+    `cursor` is the newest submission seen in /new; it becomes the
+    subreddit's cursor once the posts have been saved.
+    """
+
+    def __init__(self, subreddit_name, posts=None, error=None, elapsed=0.0, subreddit=None, cursor=None):
+        self.subreddit_name = subreddit_name
+        self.posts = posts or []
+        self.error = error
+        self.elapsed = elapsed
+        self.subreddit = subreddit
+        self.cursor = cursor
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return {
+            'subreddit': self.subreddit_name,
+            'posts': len(self.posts),
+            'error': str(self.error) if self.error else None,
+            'elapsed': round(self.elapsed, 3),
+        }
+
 
 class RedditFetcher:
     def __init__(self):
-        self.reddit = praw.Reddit(
-            client_id=settings.REDDIT_CLIENT_ID,
-            client_secret=settings.REDDIT_CLIENT_SECRET,
-            user_agent=settings.REDDIT_USER_AGENT,
-        )
+        self.reddit = self._create_reddit_client()
+        self.keyword_matcher = None
+        self.rate_budget = get_reddit_rate_budget()
+        self.last_fetch_results = []
+        self.last_save_failed_subreddit_ids = set()
+        self._thread_local = threading.local()
+        self._subreddit_ids = None
+        self._subreddit_ids_lock = threading.Lock()
     
-    def fetch_posts(self, hours_back=96, group_id=None):  # Added group_id parameter
-        """Fetch posts from monitored subreddits"""
+    def _create_reddit_client(self):
+        return create_reddit_client()
+    
+    def _get_thread_reddit(self):
+        """praw sessions are not thread-safe, so each worker thread gets its own client"""
+        reddit = getattr(self._thread_local, 'reddit', None)
+        if reddit is None:
+            reddit = self._create_reddit_client()
+            self._thread_local.reddit = reddit
+        return reddit
+    
+    def fetch_posts(self, hours_back=96, group_id=None, concurrency=None, due_only=False):  # Added group_id parameter
+        """Fetch posts from monitored subreddits.
+        
+        With due_only, only subreddits whose adaptive poll interval has
+        elapsed are fetched.
+        """
         active_subreddits = Subreddit.objects.filter(is_active=True)
         active_keywords = Keyword.objects.filter(is_active=True)
         
@@ -32,122 +95,299 @@ class RedditFetcher:
             logger.warning("No active subreddits configured")
             return []
         
+        if due_only:
+            active_subreddits = active_subreddits.filter(
+                Q(next_fetch_at__isnull=True) | Q(next_fetch_at__lte=timezone.now())
+            )
+            if not active_subreddits.exists():
+                logger.info("No subreddits due for polling")
+                return []
+        
         if not active_keywords.exists():
             logger.warning("No active keywords configured")
             return []
         
-        fetched_posts = []
+        # Compile all keywords once for the whole run instead of per submission
+        self.keyword_matcher = KeywordMatcher.from_active_keywords()
+        
         cutoff_time = timezone.now() - timedelta(hours=hours_back)
+        subreddits = list(active_subreddits)
         
-        for subreddit in active_subreddits:
-            try:
-                subreddit_posts = self._fetch_subreddit_posts(subreddit.name, cutoff_time)
-                fetched_posts.extend(subreddit_posts)
-                logger.info(f"Fetched {len(subreddit_posts)} posts from r/{subreddit.name}")
-                
-                # Rate limiting between subreddits
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error fetching posts from r/{subreddit.name}: {e}")
+        if concurrency is None:
+            concurrency = settings.REDDIT_FETCH_CONCURRENCY
+        
+        if concurrency > 1:
+            results = self.fetch_subreddits_concurrently(subreddits, cutoff_time, concurrency)
+        else:
+            results = [self._fetch_subreddit_result(subreddit, cutoff_time, self.reddit) for subreddit in subreddits]
+        
+        self.last_fetch_results = results
+        PollScheduler().schedule_after_fetch(results)
+        
+        fetched_posts = []
+        for result in results:
+            if result.ok:
+                fetched_posts.extend(result.posts)
+                logger.info(f"Fetched {len(result.posts)} posts from r/{result.subreddit_name} in {result.elapsed:.2f}s")
+            else:
+                logger.error(f"Error fetching posts from r/{result.subreddit_name}: {result.error}")
         
         return fetched_posts
     
+    def fetch_subreddits_concurrently(self, subreddits, cutoff_time, max_workers=None):
+        """Fetch several subreddits in parallel, paced by the shared Reddit rate budget.
+        
+        Returns one SubredditFetchResult per subreddit, in the order given.
+        """
+        max_workers = max_workers or settings.REDDIT_FETCH_CONCURRENCY
+        results = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='reddit-fetch') as executor:
+            futures = {
+                executor.submit(self._fetch_subreddit_in_worker, subreddit, cutoff_time): subreddit.name
+                for subreddit in subreddits
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    results[name] = SubredditFetchResult(name, error=e)
+        
+        return [results[subreddit.name] for subreddit in subreddits]
+    
+    def _fetch_subreddit_in_worker(self, subreddit, cutoff_time):
+        """Thread pool entry point for fetching one subreddit"""
+        try:
+            return self._fetch_subreddit_result(subreddit, cutoff_time, self._get_thread_reddit())
+        finally:
+            # Worker threads open their own DB connections; don't leak them
+            connection.close()
+    
+    def _fetch_subreddit_result(self, subreddit, cutoff_time, reddit):
+        """Fetch one subreddit and capture its posts or error"""
+        started = time.monotonic()
+        try:
+            posts, newest = self._fetch_subreddit_submissions(subreddit, cutoff_time, reddit)
+            return SubredditFetchResult(
+                subreddit.name, posts=posts, elapsed=time.monotonic() - started, subreddit=subreddit, cursor=newest,
+            )
+        except Exception as e:
+            return SubredditFetchResult(subreddit.name, error=e, elapsed=time.monotonic() - started)
+    
     def _fetch_subreddit_posts(self, subreddit_name, cutoff_time):
         """Fetch posts from a specific subreddit"""
         try:
-            subreddit = self.reddit.subreddit(subreddit_name)
-            posts = []
-            
-            # Fetch 50 new posts (reduced from 100)
-            for submission in subreddit.new(limit=50):
-                # Check if post is recent enough
-                post_time = datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC)
-                if post_time < cutoff_time:
-                    continue
-                
-                # Check if post contains any monitored keywords
-                if self._contains_keywords(submission.title + " " + submission.selftext):
-                    post_data = self._extract_post_data(submission)
-                    posts.append(post_data)
-            
-            # Also check 25 hot posts (reduced from 50)
-            for submission in subreddit.hot(limit=25):
-                post_time = datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC)
-                if post_time < cutoff_time:
-                    continue
-                
-                if self._contains_keywords(submission.title + " " + submission.selftext):
-                    post_data = self._extract_post_data(submission)
-                    posts.append(post_data)
-            
-            return posts
+            subreddit, created = Subreddit.objects.get_or_create(
+                name=subreddit_name,
+                defaults={'is_active': True}
+            )
+            return self._fetch_subreddit_submissions(subreddit, cutoff_time, self.reddit)[0]
         except Exception as e:
             logger.error(f"Error fetching from r/{subreddit_name}: {e}")
             return []
     
-    def _contains_keywords(self, text):
-        """Check if text contains any monitored keywords with improved scoring"""
-        text_lower = text.lower()
-        active_keywords = Keyword.objects.filter(is_active=True)
+    def _fetch_subreddit_submissions(self, subreddit, cutoff_time, reddit):
+        """Return (matching posts newer than the subreddit's cursor, newest submission in /new), raising on errors.
+
+        The cursor isn't moved here; `commit_cursors` does that once the posts are saved.
+        """
+        reddit_subreddit = reddit.subreddit(subreddit.name)
+        new_submissions, newest = self._fetch_new_submissions(reddit_subreddit, subreddit, cutoff_time)
+        submissions = list(new_submissions)
         
-        # Score the post based on keyword matches
-        score = 0
-        matched_keywords = []
-        
-        for keyword in active_keywords:
-            if keyword.keyword.lower() in text_lower:
-                score += 1
-                matched_keywords.append(keyword.keyword)
-        
-        # Lower threshold for better lead detection
-        if score >= 1:  # Changed from 2 to 1
-            logger.info(f"Post found with keywords: {matched_keywords}")
-            return True
-        
-        # Check for high-priority keywords (AI, web development, hiring terms)
-        high_priority_keywords = [
-            'ai automation', 'langchain', 'langgraph', 'web development', 'webdev',
-            'django', 'next.js', 'react', 'data analysis', 'need help', 'hiring',
-            'freelancer', 'looking for developer', 'want to hire', 'for hire',
-            'freelance developer', 'developer needed', 'help with project',
-            'build', 'create', 'develop', 'implement', 'setup', 'project',
-            'work', 'job', 'gig', 'contract', 'budget', 'paid', 'compensation'
-        ]
+        # Every post shows up in /new before it can reach /hot, so hot is only
+        # worth a request while the subreddit has no cursor yet
+        if not subreddit.last_seen_fullname:
+            self.rate_budget.acquire()
+            submissions.extend(reddit_subreddit.hot(limit=HOT_LISTING_LIMIT))
+        
+        posts = []
+        seen_ids = set()
+        for submission in submissions:
+            if submission.id in seen_ids:
+                continue
+            seen_ids.add(submission.id)
+            
+            # Check if post is recent enough
+            post_time = datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC)
+            if post_time < cutoff_time:
+                continue
+            
+            # Check if post contains any monitored keywords
+            if self._contains_keywords(submission.title + " " + submission.selftext):
+                post_data = self._extract_post_data(submission)
+                posts.append(post_data)
+        
+        return posts, newest
+    
+    def _fetch_new_submissions(self, reddit_subreddit, subreddit, cutoff_time):
+        """Return (submissions newer than the cursor, newest submission in /new).
+        
+        With a cursor this is a single `before=<fullname>` request. A full
+        page means we may have missed posts, and an empty one either means
+        nothing new was posted or that the cursor post was deleted or removed
+        (which makes `before` empty forever), so both cases fall back to
+        walking /new down to `last_seen_created_at`. On a quiet subreddit that
+        walk stops at its first item, so it costs one more request.
+        """
+        cursor = subreddit.last_seen_fullname
+        if cursor:
+            self.rate_budget.acquire()
+            batch = list(reddit_subreddit.new(limit=LISTING_PAGE_SIZE, params={'before': cursor}))
+            if 0 < len(batch) < LISTING_PAGE_SIZE:
+                return batch, max(batch, key=lambda submission: submission.created_utc)
         
-        for keyword in high_priority_keywords:
-            if keyword in text_lower:
-                logger.info(f"High-priority keyword found: {keyword}")
-                return True
+        limit = MAX_NEW_LISTING_LIMIT if cursor else NEW_LISTING_LIMIT
+        submissions = []
+        newest = None
+        for index, submission in enumerate(reddit_subreddit.new(limit=limit)):
+            # praw pulls the listing a page at a time; charge one token per page
+            if index % LISTING_PAGE_SIZE == 0:
+                self.rate_budget.acquire()
+            if newest is None:
+                newest = submission
+            
+            post_time = datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC)
+            if subreddit.last_seen_created_at and post_time <= subreddit.last_seen_created_at:
+                break
+            if post_time < cutoff_time:
+                break
+            submissions.append(submission)
+        
+        return submissions, newest
+    
+    def commit_cursors(self, results=None):
+        """Advance the cursors of the fetched subreddits whose posts were all saved.
+        
+        A subreddit whose fetch or save failed keeps its old cursor, so those
+        posts are fetched again next time.
+        """
+        for result in self.last_fetch_results if results is None else results:
+            if not result.ok or result.cursor is None or result.subreddit is None:
+                continue
+            if result.subreddit.pk in self.last_save_failed_subreddit_ids:
+                logger.warning(f"Not advancing the cursor of r/{result.subreddit_name}: some posts weren't saved")
+                continue
+            self._advance_cursor(result.subreddit, result.cursor)
+    
+    def _advance_cursor(self, subreddit, newest):
+        """Point the subreddit's cursor at the newest submission in /new"""
+        subreddit.last_seen_fullname = newest.fullname
+        subreddit.last_seen_created_at = datetime.fromtimestamp(newest.created_utc, tz=pytz.UTC)
+        subreddit.cursor_verified_at = timezone.now()
+        Subreddit.objects.filter(pk=subreddit.pk).update(
+            last_seen_fullname=subreddit.last_seen_fullname,
+            last_seen_created_at=subreddit.last_seen_created_at,
+            cursor_verified_at=subreddit.cursor_verified_at,
+        )
+    
+    def _contains_keywords(self, text):
+        """Check if text contains any monitored or high-priority keywords"""
+        if self.keyword_matcher is None:
+            self.keyword_matcher = KeywordMatcher.from_active_keywords()
         
-        return False
+        match = self.keyword_matcher.match(text)
+        if match.keywords:
+            logger.info(f"Post found with keywords: {match.keywords} (score {match.score})")
+        elif match.builtin_keywords:
+            logger.info(f"High-priority keyword found: {match.builtin_keywords}")
+        
+        return bool(match)
     
     def _extract_post_data(self, submission):
         """Extract relevant data from a Reddit submission"""
-        # Get or create the subreddit instance
         subreddit_name = submission.subreddit.display_name
-        subreddit, created = Subreddit.objects.get_or_create(
-            name=subreddit_name,
-            defaults={'is_active': True}
-        )
         
         return {
             'reddit_id': submission.id,
             'title': submission.title,
             'content': submission.selftext,
             'author': str(submission.author) if submission.author else '[deleted]',
-            'subreddit': subreddit,  # Use the Subreddit instance
+            'subreddit_id': self._get_subreddit_id(subreddit_name),
             'url': f"https://reddit.com{submission.permalink}",
             'score': submission.score,
             'comment_count': submission.num_comments,
             'created_at': datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC),
         }
     
-    def save_posts(self, posts_data):
-        """Save fetched posts to database"""
-        saved_posts = []
+    def _get_subreddit_id(self, subreddit_name):
+        """Resolve a subreddit name to its id from an in-memory map, creating it if new"""
+        with self._subreddit_ids_lock:
+            if self._subreddit_ids is None:
+                self._subreddit_ids = dict(Subreddit.objects.values_list('name', 'id'))
+            subreddit_id = self._subreddit_ids.get(subreddit_name)
+        
+        if subreddit_id is None:
+            subreddit, created = Subreddit.objects.get_or_create(
+                name=subreddit_name,
+                defaults={'is_active': True}
+            )
+            subreddit_id = subreddit.id
+            with self._subreddit_ids_lock:
+                self._subreddit_ids[subreddit_name] = subreddit_id
+        
+        return subreddit_id
+    
+    def save_posts(self, posts_data, batch_size=None):
+        """Save fetched posts to database in bulk, skipping ones we already have.
+        
+        Each chunk costs one existence query, one INSERT and one SELECT to load
+        the created rows back with their ids. Returns the posts this call
+        created, not ones a concurrent fetch inserted at the same time.
+        """
+        batch_size = batch_size or settings.REDDIT_SAVE_BATCH_SIZE
+        self.last_save_failed_subreddit_ids = set()
         
+        # The same submission can be fetched twice in one run (e.g. crossposts, new + hot)
+        unique_posts = {}
         for post_data in posts_data:
+            unique_posts.setdefault(post_data['reddit_id'], post_data)
+        unique_posts = list(unique_posts.values())
+        
+        # Queue position for the AI stage, fixed at ingest
+        priority = ClassificationPriority()
+        now = timezone.now()
+        for post_data in unique_posts:
+            post_data.setdefault('classification_priority', priority.score_post_data(post_data, now))
+        
+        saved_posts = []
+        for start in range(0, len(unique_posts), batch_size):
+            chunk = unique_posts[start:start + batch_size]
+            try:
+                saved_posts.extend(self._bulk_save_chunk(chunk))
+            except Exception as e:
+                logger.error(f"Bulk save failed for {len(chunk)} posts, saving one by one: {e}")
+                saved_posts.extend(self._save_posts_individually(chunk))
+        
+        return saved_posts
+    
+    def _bulk_save_chunk(self, chunk):
+        reddit_ids = [post_data['reddit_id'] for post_data in chunk]
+        existing_ids = set(
+            RedditPost.objects.filter(reddit_id__in=reddit_ids).values_list('reddit_id', flat=True)
+        )
+        new_posts = [RedditPost(**post_data) for post_data in chunk if post_data['reddit_id'] not in existing_ids]
+        if not new_posts:
+            return []
+        
+        # ignore_conflicts covers rows another worker inserted since the check above,
+        # but it also means the returned objects have no primary keys
+        RedditPost.objects.bulk_create(new_posts, ignore_conflicts=True)
+        # bulk_create stamps fetched_at on each object; rows another worker got in
+        # first carry its timestamp instead, so they aren't reported as ours
+        stamps = {post.reddit_id: post.fetched_at for post in new_posts}
+        created_posts = [
+            post for post in RedditPost.objects.filter(reddit_id__in=list(stamps))
+            if post.fetched_at == stamps[post.reddit_id]
+        ]
+        for post in created_posts:
+            logger.info(f"Saved post: {post.title[:50]}...")
+        return created_posts
+    
+    def _save_posts_individually(self, chunk):
+        saved_posts = []
+        for post_data in chunk:
             try:
                 # Check if post already exists
                 if RedditPost.objects.filter(reddit_id=post_data['reddit_id']).exists():
@@ -160,21 +400,23 @@ class RedditFetcher:
                 
             except Exception as e:
                 logger.error(f"Error saving post {post_data.get('reddit_id', 'unknown')}: {e}")
+                self.last_save_failed_subreddit_ids.add(post_data.get('subreddit_id'))
         
         return saved_posts
     
-    def fetch_and_save(self, hours_back=96, group_id=None):  # Added group_id parameter
+    def fetch_and_save(self, hours_back=96, group_id=None, due_only=False):  # Added group_id parameter
         """Main method to fetch and save posts"""
         logger.info(f"Starting Reddit fetch for last {hours_back} hours")
         if group_id:
             logger.info(f"Filtering by group ID: {group_id}")
         
         # Fetch posts
-        posts_data = self.fetch_posts(hours_back, group_id)
+        posts_data = self.fetch_posts(hours_back, group_id, due_only=due_only)
         logger.info(f"Fetched {len(posts_data)} posts")
         
-        # Save posts
+        # Save posts, then move the cursors past them
         saved_posts = self.save_posts(posts_data)
         logger.info(f"Saved {len(saved_posts)} new posts")
+        self.commit_cursors()
         
         return saved_posts 
\ No newline at end of file
@@ -0,0 +1,50 @@
+import base64
+import hashlib
+import logging
+from cryptography.fernet import Fernet, InvalidToken
+from django import forms
+from django.conf import settings
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+# Every Fernet token starts with its version byte, 0x80, base64-encoded
+FERNET_TOKEN_PREFIX = 'gAAAAA'
+
+
+def _fernet():
+    """Fernet for REDDIT_ACCOUNT_ENCRYPTION_KEY, or a key derived from SECRET_KEY when that's empty"""
+    key = settings.REDDIT_ACCOUNT_ENCRYPTION_KEY
+    if not key:
+        key = base64.urlsafe_b64encode(hashlib.sha256(settings.SECRET_KEY.encode()).digest())
+    return Fernet(key)
+
+
+class EncryptedTextField(models.TextField):
+    """Text stored Fernet-encrypted in the database and decrypted on load.
+
+    Values written before the field was encrypted are read back as they
+    are and encrypted the next time the row is saved. Since every
+    encryption differs, the field can't be used in lookups.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if not value:
+            return value
+        try:
+            return _fernet().decrypt(value.encode()).decode()
+        except InvalidToken:
+            if value.startswith(FERNET_TOKEN_PREFIX):
+                logger.error(f"Can't decrypt {self.model.__name__}.{self.name}; was the encryption key changed?")
+                return ''
+            return value
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if not value:
+            return value
+        return _fernet().encrypt(value.encode()).decode()
+
+    def formfield(self, **kwargs):
+        kwargs.setdefault('widget', forms.PasswordInput(render_value=True))
+        return super().formfield(**kwargs)
@@ -0,0 +1,372 @@
+import json
+import logging
+import math
+import resource
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.utils import timezone
+from reddit.fake_services import FakeServices, synthetic_recording
+
+SUBREDDIT_NAMES = [
+    'forhire', 'slavelabour', 'webdev', 'django', 'reactjs',
+    'startups', 'entrepreneur', 'smallbusiness', 'freelance', 'hiring',
+]
+BENCHMARK_KEYWORDS = ['developer', 'freelancer', 'build', 'need', 'hiring', 'django', 'react', 'automate']
+
+# Compared against --baseline: (metric, True if higher is better)
+REGRESSION_METRICS = [('posts_per_sec', True), ('p95_ms', False), ('queries_per_post', False)]
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class QueryCounter:
+    """Counts SQL queries on every connection, including ones opened by worker threads"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        self._wrapped = []
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+            self._wrapped.append(connection)
+
+    def __enter__(self):
+        self._install(connections['default'])
+        connection_created.connect(self._install)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self._install)
+        for wrapped in self._wrapped:
+            if self in wrapped.execute_wrappers:
+                wrapped.execute_wrappers.remove(self)
+
+
+class StageResult:
+    """Timings of one pipeline stage; `samples` are per batch or per post, in seconds"""
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+        self.items = 0
+        self.elapsed = 0.0
+        self.queries = 0
+        self.extra = {}
+
+    def as_dict(self):
+        samples = sorted(self.samples)
+        return {
+            'items': self.items,
+            'samples': len(samples),
+            'elapsed_seconds': round(self.elapsed, 3),
+            'posts_per_sec': round(self.items / self.elapsed, 2) if self.elapsed else 0.0,
+            'p50_ms': round(_percentile(samples, 0.5) * 1000, 2),
+            'p95_ms': round(_percentile(samples, 0.95) * 1000, 2),
+            'p99_ms': round(_percentile(samples, 0.99) * 1000, 2),
+            'queries': self.queries,
+            'queries_per_post': round(self.queries / self.items, 2) if self.items else 0.0,
+            'peak_rss_mb': _peak_rss_mb(),
+            **self.extra,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark fetch-save, pre-filter, classification, reply generation and posting '
+        'end to end against the local fake Reddit/OpenAI services, in a throwaway database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000, help='Posts in the synthetic corpus')
+        parser.add_argument('--subreddits', type=int, default=5, help='Subreddits the posts are spread over')
+        parser.add_argument('--lead-share', type=float, default=0.3, help='Share of posts written as hiring posts')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--latency-ms', type=float, default=0, help='Fake API latency per request')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra fake API latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake API requests that fail')
+        parser.add_argument(
+            '--reddit-requests-per-minute',
+            type=int,
+            default=60000,
+            help='Reddit budget during the run; the real one would mostly measure pacing',
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Results JSON of an earlier run to compare against')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=10.0,
+            help='Fail if a stage is more than this many percent worse than the baseline',
+        )
+
+    def handle(self, *args, **options):
+        if options['verbosity'] < 2:
+            # Per-post INFO logging would dominate the timings
+            for name in ('reddit', 'langagent'):
+                logging.getLogger(name).setLevel(logging.WARNING)
+
+        subreddits = [
+            SUBREDDIT_NAMES[i] if i < len(SUBREDDIT_NAMES) else f'bench{i}'
+            for i in range(options['subreddits'])
+        ]
+        posts_per_subreddit = math.ceil(options['posts'] / len(subreddits))
+        recording = synthetic_recording(
+            subreddits=subreddits,
+            posts_per_subreddit=posts_per_subreddit,
+            lead_share=options['lead_share'],
+            seed=options['seed'],
+        )
+        services = FakeServices(
+            recording,
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+
+        base_url = services.start()
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                REDDIT_API_BASE_URL=base_url,
+                OPENAI_BASE_URL=f'{base_url}/v1',
+                OPENAI_API_KEY='benchmark',
+                OPENAI_GOVERNOR_BACKEND='local',
+                REDDIT_CLIENT_ID='benchmark',
+                REDDIT_CLIENT_SECRET='benchmark',
+                REDDIT_USERNAME='benchmark',
+                REDDIT_PASSWORD='benchmark',
+                REDDIT_RATE_BUDGET_BACKEND='local',
+                REDDIT_REQUESTS_PER_MINUTE=options['reddit_requests_per_minute'],
+            ):
+                stages = self._run(services, subreddits, posts_per_subreddit)
+        finally:
+            services.stop()
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+        results = self._results(options, stages, services)
+        self._print(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = self._regressions(baseline, results, options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) beyond {options['threshold']:g}%")
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']:g}% vs baseline"))
+
+    def _setup_data(self, subreddits):
+        from langagent.prompts import invalidate_prompts
+        from reddit.models import AIPersona, Keyword, ReplyTemplate, Subreddit, SystemConfig
+
+        for name in subreddits:
+            Subreddit.objects.create(name=name, is_active=True)
+        for keyword in BENCHMARK_KEYWORDS:
+            Keyword.objects.create(keyword=keyword, is_active=True)
+        AIPersona.objects.create(name='Benchmark', style='Friendly and concise', is_active=True)
+        for template_type in ('general', 'web_development', 'ai_automation'):
+            ReplyTemplate.objects.create(
+                name=f'Benchmark {template_type}',
+                template_type=template_type,
+                content='Hi! I have built similar [tech] projects and would be glad to help.',
+                is_active=True,
+            )
+        invalidate_prompts()
+        # Post replies as fast as the outbox allows
+        SystemConfig.set_value('reply_min_spacing_seconds', '0')
+        SystemConfig.set_value('reply_spacing_jitter_seconds', '0')
+
+    def _timed(self, stage, work, items, workers=1):
+        """Run work(item) for each item, recording one sample per call; return the results"""
+
+        def run(item):
+            started = time.perf_counter()
+            try:
+                return work(item)
+            finally:
+                stage.samples.append(time.perf_counter() - started)
+                if workers > 1:
+                    connection.close()
+
+        started = time.perf_counter()
+        with QueryCounter() as queries:
+            if workers > 1 and len(items) > 1:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='benchmark') as executor:
+                    results = list(executor.map(run, items))
+            else:
+                results = [run(item) for item in items]
+        stage.elapsed += time.perf_counter() - started
+        stage.queries += queries.count
+        return results
+
+    def _run(self, services, subreddits, posts_per_subreddit):
+        from langagent.agent import RedditLeadAgent
+        from reddit.fetcher import LISTING_PAGE_SIZE, NEW_LISTING_LIMIT, RedditFetcher
+        from redditlead.celery import app as celery_app
+        from reddit.accounts import AccountPool
+        from reddit.models import Classification, RedditPost, Reply, ReplyOutbox
+        from reddit.outbox import enqueue_reply
+
+        self._setup_data(subreddits)
+        stages = []
+
+        # Fetch-save: posts arrive in rounds small enough that the cursor never misses any
+        fetch = StageResult('fetch_save')
+        fetcher = RedditFetcher()
+        hours_back = math.ceil(posts_per_subreddit * 300 / 3600) + 1
+        page = LISTING_PAGE_SIZE - 1
+        rounds = 1 + math.ceil(max(0, posts_per_subreddit - NEW_LISTING_LIMIT) / page)
+        services.visible = 0
+        for round_number in range(rounds):
+            services.release(NEW_LISTING_LIMIT if round_number == 0 else page)
+            saved = self._timed(fetch, lambda _: fetcher.fetch_and_save(hours_back=hours_back), [None])[0]
+            fetch.items += len(saved)
+        fetch.extra['rounds'] = rounds
+        stages.append(fetch)
+
+        agent = RedditLeadAgent()
+        batch_size = agent.get_classification_batch_size()
+        workers = agent.get_max_in_flight()
+        posts = list(RedditPost.objects.filter(classification__isnull=True).select_related('subreddit'))
+        batches = [posts[start:start + batch_size] for start in range(0, len(posts), batch_size)]
+
+        # Pre-filter
+        prefilter = StageResult('prefilter')
+        splits = self._timed(prefilter, agent.prefilter.split, batches)
+        prefilter.items = len(posts)
+        prefilter.extra['rejected'] = sum(len(rejected) for _, _, rejected in splits)
+        stages.append(prefilter)
+
+        # Classification of what passed the pre-filter
+        classify = StageResult('classify')
+
+        def classify_batch(split):
+            passed, scores, _ = split
+            classifications = agent.classify_posts_batch(passed)
+            agent._record_prefilter_scores(classifications.values(), scores)
+            return classifications
+
+        self._timed(classify, classify_batch, [split for split in splits if split[0]], workers=workers)
+        classify.items = sum(len(split[0]) for split in splits)
+        classify.extra['leads'] = Classification.objects.filter(
+            is_opportunity=True, confidence_score__gt=0.5
+        ).count()
+        stages.append(classify)
+
+        # Reply generation for confident leads
+        reply = StageResult('reply')
+        leads = list(
+            Classification.objects
+            .filter(is_opportunity=True, confidence_score__gt=0.5)
+            .select_related('post', 'post__subreddit')
+        )
+        self._timed(reply, lambda classification: agent.generate_reply(classification.post, classification), leads,
+                    workers=workers)
+        reply.items = len(leads)
+        stages.append(reply)
+
+        # Posting through the outbox: enqueue_reply wakes the dispatcher, which
+        # runs eagerly here instead of through the broker. Pacing is disabled
+        # in _setup_data, so this measures the outbox itself, not the spacing.
+        post = StageResult('post')
+        pool = AccountPool()
+        pending = list(Reply.objects.filter(status='pending').select_related('post'))
+        always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        try:
+            self._timed(post, lambda pending_reply: enqueue_reply(pending_reply, pool=pool), pending)
+        finally:
+            celery_app.conf.task_always_eager = always_eager
+        post.items = len(pending)
+        post.extra['posted'] = ReplyOutbox.objects.filter(state='posted').count()
+        stages.append(post)
+
+        return stages
+
+    def _results(self, options, stages, services):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+
+        stage_results = {stage.name: stage.as_dict() for stage in stages}
+        elapsed = sum(stage.elapsed for stage in stages)
+        fetched = stage_results['fetch_save']['items']
+        return {
+            'commit': commit,
+            'created_at': timezone.now().isoformat(),
+            'config': {
+                key: options[key]
+                for key in ('posts', 'subreddits', 'lead_share', 'seed', 'latency_ms', 'jitter_ms', 'error_rate')
+            },
+            'stages': stage_results,
+            'total': {
+                'posts': fetched,
+                'elapsed_seconds': round(elapsed, 3),
+                'posts_per_sec': round(fetched / elapsed, 2) if elapsed else 0.0,
+                'queries': sum(stage.queries for stage in stages),
+                'peak_rss_mb': _peak_rss_mb(),
+            },
+            'fake_api_requests': services.stats,
+        }
+
+    def _print(self, results):
+        header = f"{'stage':<12}{'items':>8}{'posts/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'rss MB':>9}"
+        self.stdout.write(header)
+        for name, stage in results['stages'].items():
+            self.stdout.write(
+                f"{name:<12}{stage['items']:>8}{stage['posts_per_sec']:>10}{stage['p50_ms']:>10}"
+                f"{stage['p95_ms']:>10}{stage['p99_ms']:>10}{stage['queries']:>9}{stage['peak_rss_mb']:>9}"
+            )
+        total = results['total']
+        self.stdout.write(self.style.SUCCESS(
+            f"{total['posts']} posts end to end in {total['elapsed_seconds']}s "
+            f"({total['posts_per_sec']} posts/s, {total['queries']} queries, peak RSS {total['peak_rss_mb']} MB)"
+        ))
+
+    def _regressions(self, baseline, results, threshold):
+        regressions = []
+        for name, stage in results['stages'].items():
+            previous = baseline.get('stages', {}).get(name)
+            if not previous:
+                continue
+            for metric, higher_is_better in REGRESSION_METRICS:
+                before, after = previous.get(metric), stage.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before * 100
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append(f"{name}.{metric}: {before} -> {after} ({change:+.1f}%)")
+        return regressions
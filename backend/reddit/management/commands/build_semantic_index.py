@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+from langagent.semantic import SemanticIndex
+from reddit.models import RedditPost
+
+
+class Command(BaseCommand):
+    help = 'Embed stored posts into the semantic lead index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours-back',
+            type=int,
+            default=None,
+            help='Only index posts fetched in the last N hours (default: all posts)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Posts embedded per request (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        index = SemanticIndex()
+        posts = RedditPost.objects.order_by('id')
+        if options['hours_back']:
+            posts = posts.filter(fetched_at__gte=timezone.now() - timedelta(hours=options['hours_back']))
+
+        batch_size = options['batch_size']
+        batch = []
+        added = 0
+        for post in posts.iterator(chunk_size=batch_size):
+            batch.append(post)
+            if len(batch) >= batch_size:
+                added += index.add_posts(batch)
+                batch = []
+        added += index.add_posts(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {added} new posts ({len(index)} total, embedder {index.embedder.name})'
+        ))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from langagent.prefilter import LeadPreFilter
+from reddit.models import Classification
+
+
+class Command(BaseCommand):
+    help = 'Replay the local pre-filter over LLM-labelled posts and report LLM calls saved vs. leads lost'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            action='append',
+            default=None,
+            help='Reject threshold to evaluate; repeat to compare several (default: configured value)',
+        )
+        parser.add_argument(
+            '--min-length',
+            type=float,
+            default=None,
+            help='Override prefilter_min_length for this run',
+        )
+        parser.add_argument(
+            '--semantic',
+            action='store_true',
+            help='Include the semantic index signal even if semantic_prefilter_enabled is off',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Only evaluate the most recent N classifications',
+        )
+
+    def handle(self, *args, **options):
+        # Only LLM decisions are ground truth; pre-filter and cache rows would be circular
+        classifications = (
+            Classification.objects
+            .exclude(Q(classified_by='prefilter') | Q(classified_by='cache'))
+            .exclude(intent='Unable to parse')
+            .select_related('post')
+            .order_by('-created_at')
+        )
+        if options['limit']:
+            classifications = classifications[:options['limit']]
+        classifications = list(classifications)
+
+        if not classifications:
+            self.stdout.write(self.style.WARNING('No LLM classifications to evaluate against'))
+            return
+
+        thresholds = options['threshold'] or [None]
+        for threshold in thresholds:
+            prefilter = LeadPreFilter(
+                reject_threshold=threshold,
+                min_length=options['min_length'],
+                enabled=True,
+                semantic=True if options['semantic'] else None,
+            )
+            report = prefilter.evaluate(classifications)
+            self.stdout.write(
+                f"threshold={report['reject_threshold']:+g}  "
+                f"evaluated={report['evaluated']}  "
+                f"llm_calls_saved={report['llm_calls_saved']:.1%}  "
+                f"recall={report['recall']:.1%}  "
+                f"precision={report['precision']:.1%}  "
+                f"rejected_leads={report['rejected_leads']}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            'recall = share of LLM-confirmed leads the pre-filter lets through; '
+            'precision = share of passed posts that are leads'
+        ))
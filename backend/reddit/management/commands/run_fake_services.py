@@ -0,0 +1,71 @@
+import json
+from django.core.management.base import BaseCommand
+from reddit.fake_services import FakeServices, recording_from_database, synthetic_recording
+
+
+class Command(BaseCommand):
+    help = 'Serve recorded Reddit listings and OpenAI responses locally, for offline benchmarks and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--recording',
+            help='JSON recording to replay (default: a synthetic corpus)',
+        )
+        parser.add_argument(
+            '--export',
+            help='Write a recording of the stored posts, classifications and replies to this file and exit',
+        )
+        parser.add_argument(
+            '--export-limit',
+            type=int,
+            default=1000,
+            help='Most recent posts to include in --export',
+        )
+        parser.add_argument(
+            '--subreddit',
+            action='append',
+            default=None,
+            help='Subreddit in the synthetic corpus; repeat for several',
+        )
+        parser.add_argument('--posts-per-subreddit', type=int, default=200)
+        parser.add_argument('--latency-ms', type=float, default=0, help='Added to every request')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency, up to this much')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests that fail (0-1)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['export']:
+            recording = recording_from_database(limit=options['export_limit'])
+            with open(options['export'], 'w') as f:
+                json.dump(recording, f)
+            posts = sum(len(listing) for listing in recording['listings'].values())
+            self.stdout.write(self.style.SUCCESS(f"Wrote {posts} posts to {options['export']}"))
+            return
+
+        if options['recording']:
+            with open(options['recording']) as f:
+                recording = json.load(f)
+        else:
+            recording = synthetic_recording(
+                subreddits=options['subreddit'] or ('forhire', 'slavelabour', 'webdev'),
+                posts_per_subreddit=options['posts_per_subreddit'],
+                seed=options['seed'],
+            )
+
+        services = FakeServices(
+            recording,
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+        base_url = f"http://{options['host']}:{options['port']}"
+        self.stdout.write(self.style.SUCCESS(f"Fake Reddit/OpenAI services on {base_url}"))
+        self.stdout.write(f"  REDDIT_API_BASE_URL={base_url}")
+        self.stdout.write(f"  OPENAI_BASE_URL={base_url}/v1")
+        try:
+            services.serve_forever(options['host'], options['port'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
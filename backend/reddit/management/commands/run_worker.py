@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Start a Celery worker for one pipeline stage queue, with that queue\'s concurrency and prefetch settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queue', choices=sorted(settings.CELERY_QUEUE_WORKERS))
+        parser.add_argument('--concurrency', type=int, default=None, help='Override the configured concurrency')
+        parser.add_argument(
+            '--prefetch-multiplier',
+            type=int,
+            default=None,
+            help='Override the configured prefetch multiplier',
+        )
+        parser.add_argument('--loglevel', default='INFO')
+
+    def handle(self, *args, **options):
+        from redditlead.celery import app
+
+        queue = options['queue']
+        worker_settings = settings.CELERY_QUEUE_WORKERS[queue]
+        concurrency = options['concurrency'] or worker_settings['concurrency']
+        prefetch = options['prefetch_multiplier'] or worker_settings['prefetch_multiplier']
+
+        self.stdout.write(f"Starting '{queue}' worker: concurrency={concurrency}, prefetch_multiplier={prefetch}")
+        app.worker_main([
+            'worker',
+            '--queues', queue,
+            '--hostname', f'{queue}@%h',
+            '--concurrency', str(concurrency),
+            '--prefetch-multiplier', str(prefetch),
+            '--loglevel', options['loglevel'],
+        ])
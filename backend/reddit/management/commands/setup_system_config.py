@@ -49,6 +49,229 @@ class Command(BaseCommand):
             'Whether Telegram bot notifications are enabled'
         )
         
+        # Posts classified per OpenAI request
+        SystemConfig.set_value(
+            'ai_classification_batch_size',
+            '5',
+            'Number of posts classified per OpenAI request (1 disables batching)'
+        )
+        
+        # Model routing
+        SystemConfig.set_value(
+            'ai_classification_tiers',
+            'gpt-4o-mini,gpt-4',
+            'Comma-separated classification models, cheapest first; uncertain answers move to the next one'
+        )
+        
+        SystemConfig.set_value(
+            'ai_escalation_band_low',
+            '0.3',
+            'Lowest confidence score that is re-run on the next model tier'
+        )
+        
+        SystemConfig.set_value(
+            'ai_escalation_band_high',
+            '0.7',
+            'Highest confidence score that is re-run on the next model tier'
+        )
+        
+        SystemConfig.set_value(
+            'ai_reply_model',
+            'gpt-4',
+            'Model used to generate replies'
+        )
+        
+        # Prompt size
+        SystemConfig.set_value(
+            'ai_max_content_tokens',
+            '1500',
+            'Longest post body sent to OpenAI (tokens); longer posts keep head, tail and budget/tech sentences'
+        )
+        
+        # Concurrent OpenAI requests
+        SystemConfig.set_value(
+            'ai_max_in_flight',
+            '4',
+            'Maximum classification batches sent to OpenAI at the same time (1 runs serially)'
+        )
+        SystemConfig.set_value(
+            'classification_lease_seconds',
+            '600',
+            'How long a worker holds claimed posts before others may retry them'
+        )
+        SystemConfig.set_value(
+            'priority_age_half_life_hours',
+            '6',
+            'Hours after which the freshness bonus of a queued post halves'
+        )
+        SystemConfig.set_value(
+            'classify_backlog_limit',
+            '500',
+            'Pause fetching while this many posts wait for classification (0 disables backpressure)'
+        )
+        
+        # Classification cache
+        SystemConfig.set_value(
+            'classification_cache_enabled',
+            'true',
+            'Reuse classifications for posts with identical normalized title and content'
+        )
+        
+        SystemConfig.set_value(
+            'classification_cache_ttl_hours',
+            '168',
+            'Hours a cached classification stays valid'
+        )
+        
+        SystemConfig.set_value(
+            'classification_cache_max_entries',
+            '10000',
+            'Maximum number of cached classifications (least recently used are evicted)'
+        )
+        
+        # Local pre-filter before LLM classification
+        SystemConfig.set_value(
+            'prefilter_enabled',
+            'true',
+            'Reject obvious non-leads with local rules before sending posts to the LLM'
+        )
+        
+        SystemConfig.set_value(
+            'prefilter_reject_threshold',
+            '-2',
+            'Posts with a negative pre-filter score at or below this value are rejected without an LLM call'
+        )
+        
+        SystemConfig.set_value(
+            'prefilter_min_length',
+            '80',
+            'Posts shorter than this many characters get a small pre-filter penalty'
+        )
+        
+        SystemConfig.set_value(
+            'semantic_prefilter_enabled',
+            'false',
+            'Add a pre-filter signal from embedding similarity to past leads'
+        )
+        
+        SystemConfig.set_value(
+            'semantic_match_threshold',
+            '0.5',
+            'Cosine similarity to a lead centroid that earns the semantic pre-filter bonus'
+        )
+        
+        SystemConfig.set_value(
+            'semantic_mismatch_threshold',
+            '0.2',
+            'Cosine similarity below which the semantic pre-filter penalty applies'
+        )
+        
+        # Adaptive subreddit polling
+        SystemConfig.set_value(
+            'poll_min_interval_minutes',
+            '5',
+            'Shortest interval between polls of a single subreddit (minutes)'
+        )
+        
+        SystemConfig.set_value(
+            'poll_max_interval_minutes',
+            '360',
+            'Longest interval between polls of a single subreddit (minutes)'
+        )
+        
+        SystemConfig.set_value(
+            'poll_target_leads_per_poll',
+            '0.5',
+            'Poll a subreddit once this many leads are expected to have arrived'
+        )
+        
+        SystemConfig.set_value(
+            'poll_history_days',
+            '7',
+            'Days of post history used to learn subreddit arrival rate and lead yield'
+        )
+        
+        SystemConfig.set_value(
+            'poll_budget_fraction',
+            '0.5',
+            'Share of the Reddit API request budget that scheduled polling may use (0.0-1.0)'
+        )
+        
+        # Reply posting pace, per Reddit account
+        SystemConfig.set_value(
+            'reply_min_spacing_seconds',
+            '3',
+            'Minimum time between two replies posted by the same account'
+        )
+        
+        SystemConfig.set_value(
+            'reply_spacing_jitter_seconds',
+            '5',
+            'Random extra spacing, up to this much, added between scheduled replies'
+        )
+        
+        # Reply outbox and posting accounts
+        SystemConfig.set_value(
+            'account_cooldown_seconds',
+            '600',
+            'How long a rate-limited posting account is left out of the pool when Reddit doesn\'t say'
+        )
+        
+        SystemConfig.set_value(
+            'outbox_max_attempts',
+            '3',
+            'Attempts to post a reply before its outbox entry is marked failed'
+        )
+        
+        SystemConfig.set_value(
+            'outbox_retry_backoff_seconds',
+            '60',
+            'Wait before retrying a failed post; doubles with every attempt'
+        )
+        
+        SystemConfig.set_value(
+            'outbox_lease_seconds',
+            '300',
+            'An in-flight outbox entry is retried by another dispatcher after this long'
+        )
+        
+        # Engagement refresh schedule for posted replies and monitored leads
+        SystemConfig.set_value(
+            'refresh_min_interval_minutes',
+            '30',
+            'Shortest time between engagement checks of a reply or lead'
+        )
+        
+        SystemConfig.set_value(
+            'refresh_max_interval_hours',
+            '24',
+            'Longest time between engagement checks of a reply or lead'
+        )
+        
+        SystemConfig.set_value(
+            'refresh_age_factor',
+            '0.25',
+            'Time until the next engagement check, as a fraction of the item\'s age'
+        )
+        
+        SystemConfig.set_value(
+            'refresh_activity_divisor',
+            '4',
+            'Divides the next check interval when the last check saw new votes or comments'
+        )
+        
+        SystemConfig.set_value(
+            'refresh_horizon_days',
+            '14',
+            'Stop checking replies and leads older than this'
+        )
+        
+        SystemConfig.set_value(
+            'refresh_batch_limit',
+            '1000',
+            'Most replies or leads refreshed per run; the most overdue go first'
+        )
+        
         self.stdout.write(
             self.style.SUCCESS('System configuration set up successfully!')
         ) 
\ No newline at end of file
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from reddit.stream import SubmissionStreamer
+
+
+class Command(BaseCommand):
+    help = 'Stream new submissions from all active subreddits and queue matches for classification'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between stream polls (default: 2)',
+        )
+        parser.add_argument(
+            '--refresh-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between reloading active subreddits and keywords (default: 60)',
+        )
+        parser.add_argument(
+            '--hours-back',
+            type=int,
+            default=24,
+            help='Ignore submissions older than this many hours (default: 24)',
+        )
+        parser.add_argument(
+            '--group-id',
+            type=int,
+            default=None,
+            help='Only stream subreddits from this group',
+        )
+        parser.add_argument(
+            '--no-catch-up',
+            action='store_true',
+            help='Skip the incremental fetch that covers posts made while the stream was down',
+        )
+        parser.add_argument(
+            '--max-runtime',
+            type=float,
+            default=None,
+            help='Stop after this many seconds (default: run until interrupted)',
+        )
+
+    def handle(self, *args, **options):
+        streamer = SubmissionStreamer(
+            poll_interval=options['poll_interval'],
+            refresh_interval=options['refresh_interval'],
+            hours_back=options['hours_back'],
+            group_id=options['group_id'],
+        )
+
+        self.stdout.write('Starting submission stream (Ctrl+C to stop)...')
+        stats = streamer.run(
+            catch_up=not options['no_catch_up'],
+            max_runtime=options['max_runtime'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stream stopped: {stats['seen']} seen, {stats['matched']} matched, "
+            f"{stats['saved']} saved, {stats['restarts']} restarts"
+        ))
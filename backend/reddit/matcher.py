@@ -0,0 +1,104 @@
+import re
+from .models import Keyword
+
+
+# Built-in hiring/skill terms that always count as a match, on top of the
+# keywords configured in the database
+HIGH_PRIORITY_KEYWORDS = [
+    'ai automation', 'langchain', 'langgraph', 'web development', 'webdev',
+    'django', 'next.js', 'react', 'data analysis', 'need help', 'hiring',
+    'freelancer', 'looking for developer', 'want to hire', 'for hire',
+    'freelance developer', 'developer needed', 'help with project',
+    'build', 'create', 'develop', 'implement', 'setup', 'project',
+    'work', 'job', 'gig', 'contract', 'budget', 'paid', 'compensation'
+]
+
+
+def _trie_pattern(keywords):
+    """Build a regex for keywords with shared prefixes factored out.
+
+    A flat "a|b|c" alternation retries every keyword at every position; the
+    trie form only follows branches whose prefix already matched, and its
+    greedy optional groups make it prefer the longest keyword.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if terminal else body
+
+    return build(trie)
+
+
+class KeywordMatch:
+    """Result of matching a piece of text against a KeywordMatcher"""
+
+    def __init__(self, keywords, builtin_keywords):
+        self.keywords = keywords
+        self.builtin_keywords = builtin_keywords
+
+    @property
+    def matched(self):
+        return self.keywords + [k for k in self.builtin_keywords if k not in self.keywords]
+
+    @property
+    def score(self):
+        """Number of distinct keywords found in the text"""
+        return len(self.matched)
+
+    def __bool__(self):
+        return bool(self.keywords or self.builtin_keywords)
+
+
+class KeywordMatcher:
+    """Match many keywords against text in a single regex pass.
+
+    All keywords are compiled into one alternation wrapped in a lookahead, so
+    the scan reports the longest keyword starting at every position of the
+    text. Keywords contained in a longer keyword (e.g. "develop" inside
+    "freelance developer") are expanded afterwards from a precomputed table,
+    which keeps the plain substring semantics of the old per-keyword scan.
+    """
+
+    def __init__(self, keywords, builtin_keywords=HIGH_PRIORITY_KEYWORDS):
+        self.keywords = {k.lower() for k in keywords if k and k.strip()}
+        self.builtin_keywords = {k.lower() for k in builtin_keywords}
+
+        all_keywords = sorted(self.keywords | self.builtin_keywords, key=len, reverse=True)
+        self._contained = {
+            keyword: [other for other in all_keywords if other in keyword]
+            for keyword in all_keywords
+        }
+        self._pattern = None
+        if all_keywords:
+            self._pattern = re.compile(f'(?=({_trie_pattern(all_keywords)}))')
+
+    @classmethod
+    def from_active_keywords(cls):
+        """Build a matcher from all active Keyword rows plus the built-in list"""
+        keywords = Keyword.objects.filter(is_active=True).values_list('keyword', flat=True)
+        return cls(list(keywords))
+
+    def match(self, text):
+        """Return a KeywordMatch with every keyword found in text"""
+        if self._pattern is None or not text:
+            return KeywordMatch([], [])
+
+        found = set()
+        for m in self._pattern.finditer(text.lower()):
+            longest = m.group(1)
+            if longest not in found:
+                found.update(self._contained[longest])
+
+        keywords = sorted(k for k in found if k in self.keywords)
+        builtin_keywords = sorted(k for k in found if k in self.builtin_keywords)
+        return KeywordMatch(keywords, builtin_keywords)
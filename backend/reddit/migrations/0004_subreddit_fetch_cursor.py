@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0003_group_keyword_group_subreddit_group'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subreddit',
+            name='cursor_verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subreddit',
+            name='last_seen_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subreddit',
+            name='last_seen_fullname',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0004_subreddit_fetch_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subreddit',
+            name='last_fetched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subreddit',
+            name='next_fetch_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subreddit',
+            name='poll_interval_minutes',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0005_subreddit_poll_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classification',
+            name='classified_by',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='classification',
+            name='prefilter_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='keyword',
+            name='weight',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0006_classification_prefilter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classification',
+            name='escalated',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='classification',
+            name='model_tier',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0007_classification_model_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='redditpost',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='redditpost',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
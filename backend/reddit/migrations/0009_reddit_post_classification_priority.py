@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0008_reddit_post_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='redditpost',
+            name='classification_priority',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='redditpost',
+            index=models.Index(fields=['-classification_priority', 'fetched_at'], name='reddit_redd_classif_838733_idx'),
+        ),
+    ]
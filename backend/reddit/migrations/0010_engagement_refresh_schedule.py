@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0009_reddit_post_classification_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='redditpost',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
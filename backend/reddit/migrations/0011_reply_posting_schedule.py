@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0010_engagement_refresh_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostingSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=100, unique=True)),
+                ('next_slot_at', models.DateTimeField(blank=True, null=True)),
+                ('last_posted_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['account'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='scheduled_for',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0011_reply_posting_schedule'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reply',
+            name='scheduled_for',
+        ),
+        migrations.CreateModel(
+            name='ReplyOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True)),
+                ('account', models.CharField(max_length=100)),
+                ('content', models.TextField()),
+                ('state', models.CharField(choices=[('queued', 'Queued'), ('in_flight', 'In flight'), ('posted', 'Posted'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_by', models.CharField(blank=True, max_length=100)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('reddit_comment_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('posted_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reply', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='reddit.reply')),
+            ],
+            options={
+                'ordering': ['available_at'],
+                'indexes': [models.Index(fields=['state', 'available_at'], name='reddit_repl_state_ac8c81_idx')],
+            },
+        ),
+    ]
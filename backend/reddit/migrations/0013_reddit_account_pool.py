@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-17 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0012_reply_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RedditAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100, unique=True)),
+                ('password', models.CharField(max_length=255)),
+                ('client_id', models.CharField(blank=True, max_length=100)),
+                ('client_secret', models.CharField(blank=True, max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('requests_per_minute', models.IntegerField(default=60)),
+                ('cooldown_until', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subreddits', models.ManyToManyField(blank=True, related_name='posting_accounts', to='reddit.subreddit')),
+            ],
+            options={
+                'ordering': ['username'],
+            },
+        ),
+    ]
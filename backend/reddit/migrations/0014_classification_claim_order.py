@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-17 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0013_reddit_account_pool'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='redditpost',
+            name='reddit_redd_classif_838733_idx',
+        ),
+        migrations.AddIndex(
+            model_name='redditpost',
+            index=models.Index(fields=['-classification_priority', '-created_at'], name='reddit_redd_classif_efce29_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-17 13:27
+
+import reddit.fields
+from django.db import migrations
+
+
+def encrypt_existing_secrets(apps, schema_editor):
+    # Plaintext values load as they are and are encrypted when saved
+    RedditAccount = apps.get_model('reddit', 'RedditAccount')
+    for account in RedditAccount.objects.all():
+        account.save(update_fields=['password', 'client_secret'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reddit', '0014_classification_claim_order'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='redditaccount',
+            name='client_secret',
+            field=reddit.fields.EncryptedTextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='redditaccount',
+            name='password',
+            field=reddit.fields.EncryptedTextField(),
+        ),
+        migrations.RunPython(encrypt_existing_secrets, migrations.RunPython.noop),
+    ]
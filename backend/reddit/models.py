@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from .fields import EncryptedTextField
 
 
 class Group(models.Model):
@@ -25,6 +26,7 @@ class Keyword(models.Model):
     keyword = models.CharField(max_length=100, unique=True)
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='keywords', null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    weight = models.FloatField(default=1.0)  # Contribution to the local lead pre-filter score
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -42,6 +44,16 @@ class Subreddit(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    
+    # Incremental fetch cursor: newest submission already seen in /new
+    last_seen_fullname = models.CharField(max_length=20, blank=True)
+    last_seen_created_at = models.DateTimeField(blank=True, null=True)
+    cursor_verified_at = models.DateTimeField(blank=True, null=True)
+    
+    # Adaptive polling schedule (see reddit.scheduler)
+    poll_interval_minutes = models.FloatField(blank=True, null=True)
+    last_fetched_at = models.DateTimeField(blank=True, null=True)
+    next_fetch_at = models.DateTimeField(blank=True, null=True, db_index=True)
 
     class Meta:
         ordering = ['name']
@@ -77,6 +89,7 @@ class RedditPost(models.Model):
     monitoring_enabled = models.BooleanField(default=True)
     engagement_increased = models.BooleanField(default=False)
     new_comments_since_last_check = models.IntegerField(default=0)
+    next_check_at = models.DateTimeField(blank=True, null=True, db_index=True)
     
     # Follow-up automation fields
     follow_up_sent = models.BooleanField(default=False)
@@ -85,6 +98,11 @@ class RedditPost(models.Model):
     follow_up_response_received = models.BooleanField(default=False)
     follow_up_response_content = models.TextField(blank=True, null=True)
 
+    # Classification queue: priority set at ingest (see reddit.priority) and the lease held by a worker
+    classification_priority = models.FloatField(default=0.0)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claim_expires_at = models.DateTimeField(blank=True, null=True)
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -92,6 +110,7 @@ class RedditPost(models.Model):
             models.Index(fields=['is_opportunity']),
             models.Index(fields=['priority']),
             models.Index(fields=['last_monitored_at']),
+            models.Index(fields=['-classification_priority', '-created_at']),
         ]
 
     def __str__(self):
@@ -139,6 +158,10 @@ class Classification(models.Model):
     budget_amount = models.CharField(max_length=50, blank=True)
     services_needed = models.TextField(blank=True)
     urgency_level = models.CharField(max_length=20, blank=True)
+    classified_by = models.CharField(max_length=50, blank=True)  # 'prefilter', 'cache' or the LLM used
+    model_tier = models.PositiveSmallIntegerField(blank=True, null=True)  # Index in ai_classification_tiers
+    escalated = models.BooleanField(default=False)
+    prefilter_score = models.FloatField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -188,6 +211,9 @@ class Reply(models.Model):
     follow_up_content = models.TextField(blank=True, null=True)
     follow_up_sent_at = models.DateTimeField(blank=True, null=True)
 
+    # Engagement refresh schedule (see reddit.refresh)
+    next_check_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
     class Meta:
         ordering = ['-created_at']
 
@@ -293,6 +319,84 @@ class SystemConfig(models.Model):
         return obj
 
 
+class RedditAccount(models.Model):
+    """A Reddit identity replies can be posted from (see reddit.accounts)"""
+    username = models.CharField(max_length=100, unique=True)
+    # Secrets are encrypted at rest with REDDIT_ACCOUNT_ENCRYPTION_KEY
+    password = EncryptedTextField()
+    # Blank means the app credentials from settings
+    client_id = models.CharField(max_length=100, blank=True)
+    client_secret = EncryptedTextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    requests_per_minute = models.IntegerField(default=60)
+    # Set when Reddit rate-limits the account; it isn't used again before then
+    cooldown_until = models.DateTimeField(blank=True, null=True)
+    # Empty means the account may post in any subreddit
+    subreddits = models.ManyToManyField(Subreddit, blank=True, related_name='posting_accounts')
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['username']
+
+    def __str__(self):
+        return self.username
+
+    def is_cooling_down(self, now=None):
+        return bool(self.cooldown_until and self.cooldown_until > (now or timezone.now()))
+
+
+class ReplyOutbox(models.Model):
+    """A Reply waiting to be posted to Reddit, or the record of posting it (see reddit.outbox)"""
+    STATE_CHOICES = [
+        ('queued', 'Queued'),
+        ('in_flight', 'In flight'),
+        ('posted', 'Posted'),
+        ('failed', 'Failed'),
+    ]
+
+    reply = models.OneToOneField(Reply, on_delete=models.CASCADE, related_name='outbox')
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    account = models.CharField(max_length=100)
+    content = models.TextField()
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    # Not dispatched before this: the pacing slot, or the backoff after a failed attempt
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    reddit_comment_id = models.CharField(max_length=20, blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    posted_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['available_at']
+        indexes = [
+            models.Index(fields=['state', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.idempotency_key} ({self.state})"
+
+
+class PostingSlot(models.Model):
+    """Posting pace of one Reddit account, shared by every worker"""
+    account = models.CharField(max_length=100, unique=True)
+    # Earliest time the next reply may be scheduled for
+    next_slot_at = models.DateTimeField(blank=True, null=True)
+    last_posted_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['account']
+
+    def __str__(self):
+        return f"{self.account}: next slot {self.next_slot_at}"
+
+
 class ReplyTemplate(models.Model):
     """Templates for different types of replies"""
     TEMPLATE_TYPE_CHOICES = [
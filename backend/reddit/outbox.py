@@ -0,0 +1,300 @@
+import html
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .accounts import AccountPool, rate_limit_wait
+from .claims import default_worker_id
+from .models import Notification, Reply, ReplyOutbox, SystemConfig
+from .pacing import ReplyPacer
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How far back the account's own comments are searched before a retry
+EXISTING_COMMENT_LOOKBACK = 100
+# Slack between our clock and Reddit's when comparing comment times with the entry's
+EXISTING_COMMENT_CLOCK_SKEW_SECONDS = 300
+
+
+def _config_float(key, default):
+    try:
+        return float(SystemConfig.get_value(key, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+def idempotency_key(reply):
+    """One comment per reply, ever: the key only depends on the reply and its thread"""
+    return f"t3_{reply.post.reddit_id}:reply-{reply.id}"
+
+
+def _wake_dispatcher(at):
+    from .tasks import dispatch_reply_outbox
+    transaction.on_commit(lambda: dispatch_reply_outbox.apply_async(eta=at))
+
+
+def _assign(entry, reply, pool, exclude=(), prefer=None):
+    """Give a not yet attempted entry an eligible account and its next pacing slot.
+
+    That's `prefer` if it may post there now, otherwise the least loaded one.
+    """
+    if prefer and prefer not in exclude and pool.is_available(prefer, reply.post.subreddit_id):
+        username = prefer
+    else:
+        username = pool.choose(reply.post.subreddit_id, exclude=exclude)
+    if username is None:
+        # Nobody may post there right now; try again when a cooldown ends
+        entry.account = ''
+        entry.available_at = pool.next_available_at(reply.post.subreddit_id) or (
+            timezone.now() + timedelta(seconds=_config_float('outbox_retry_backoff_seconds', 60))
+        )
+        entry.last_error = f"No account may post in r/{reply.post.subreddit.name} right now"
+    else:
+        entry.account = username
+        entry.available_at = ReplyPacer(username).reserve()
+
+
+def enqueue_reply(reply, pool=None, prefer_account=None):
+    """Put a reply in the outbox, or return the entry it already has.
+
+    Enqueueing the same reply again is a no-op unless its earlier entry
+    failed, in which case that entry is queued again. The entry is given an
+    account from the AccountPool (`prefer_account` when it's eligible) and
+    that account's next pacing slot, and the dispatcher is woken up for it
+    once the surrounding transaction commits.
+    """
+    with transaction.atomic():
+        entry, created = ReplyOutbox.objects.select_for_update().get_or_create(
+            reply=reply,
+            defaults={
+                'idempotency_key': idempotency_key(reply),
+                'content': reply.edited_content or reply.content,
+            },
+        )
+        if not created and entry.state != 'failed':
+            return entry, False
+
+        if not created:
+            entry.state = 'queued'
+            entry.content = reply.edited_content or reply.content
+            # An earlier attempt may have gone through, so the next one still
+            # checks for our comment first, from the same account
+            entry.attempts = min(entry.attempts, 1)
+        if entry.attempts:
+            entry.available_at = ReplyPacer(entry.account).reserve()
+        else:
+            _assign(entry, reply, pool or AccountPool(), prefer=prefer_account)
+        entry.save()
+        _wake_dispatcher(entry.available_at)
+    return entry, True
+
+
+class OutboxDispatcher:
+    """Posts outbox entries to Reddit, at most once per reply.
+
+    Entries move queued -> in_flight -> posted or failed. `claim` takes the
+    oldest due entry with SELECT ... FOR UPDATE SKIP LOCKED and leases it, so
+    several dispatchers never post the same entry; an entry whose dispatcher
+    died while it was in flight is claimed again once the lease expires.
+    Any attempt after the first starts by looking for our comment on the
+    thread, because a request that timed out may still have gone through.
+    Failed attempts back off exponentially up to `outbox_max_attempts`.
+
+    Entries are posted from their AccountPool account, with its session and
+    token bucket. When the account is rate-limited, disabled or no longer
+    allowed in the subreddit, the entry moves to another account, unless an
+    earlier attempt may already have posted it from this one.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.lease = timedelta(seconds=_config_float('outbox_lease_seconds', 300))
+        self.max_attempts = int(_config_float('outbox_max_attempts', 3))
+        self.retry_backoff = _config_float('outbox_retry_backoff_seconds', 60)
+        self.pool = AccountPool()
+        self._clients = {}
+        self._pacers = {}
+
+    def _client(self, account):
+        if account not in self._clients:
+            self._clients[account] = self.pool.client(account)
+        return self._clients[account]
+
+    def _pacer(self, account):
+        if account not in self._pacers:
+            self._pacers[account] = ReplyPacer(account)
+        return self._pacers[account]
+
+    def claim(self, now=None):
+        """Lease the oldest due entry to this dispatcher, or return None"""
+        now = now or timezone.now()
+        with transaction.atomic():
+            entry = (
+                ReplyOutbox.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(state='queued', available_at__lte=now)
+                    | Q(state='in_flight', lease_expires_at__lt=now)
+                )
+                .order_by('available_at')
+                .first()
+            )
+            if entry is None:
+                return None
+            if entry.state == 'in_flight':
+                logger.warning(f"Reclaiming {entry.idempotency_key}, its lease held by {entry.claimed_by} expired")
+            entry.state = 'in_flight'
+            entry.attempts += 1
+            entry.claimed_by = self.worker_id
+            entry.lease_expires_at = now + self.lease
+            entry.save(update_fields=['state', 'attempts', 'claimed_by', 'lease_expires_at', 'updated_at'])
+        return entry
+
+    def _requeue(self, entry, available_at, not_attempted=True):
+        """Put a claimed entry back; `not_attempted` if nothing was sent to Reddit for it"""
+        entry.state = 'queued'
+        if not_attempted:
+            entry.attempts -= 1
+        entry.available_at = available_at
+        entry.lease_expires_at = None
+        entry.save()
+        _wake_dispatcher(entry.available_at)
+
+    def dispatch(self):
+        """Post every due entry the accounts' pacing allows; returns how many were posted"""
+        posted_count = 0
+        while True:
+            entry = self.claim()
+            if entry is None:
+                break
+
+            reply = Reply.objects.select_related('post__subreddit').get(id=entry.reply_id)
+            if reply.status not in ('pending', 'approved'):
+                self._fail(entry, reply, f"Reply was {reply.status} before it was posted")
+                continue
+
+            if not self.pool.is_available(entry.account, reply.post.subreddit_id):
+                if entry.attempts > 1:
+                    # Retries stay with the account that may already have posted it
+                    account = self.pool.accounts.get(entry.account)
+                    cooldown_until = account.cooldown_until if account and account.is_active else None
+                    self._requeue(entry, max(
+                        cooldown_until or timezone.now(),
+                        timezone.now() + timedelta(seconds=self.retry_backoff),
+                    ))
+                    continue
+                # Cooling down, disabled or no longer allowed there: hand it to another account
+                entry.attempts -= 1
+                _assign(entry, reply, self.pool, exclude={entry.account})
+                self._requeue(entry, entry.available_at, not_attempted=False)
+                continue
+
+            pacer = self._pacer(entry.account)
+            if pacer.acquire() > 0:
+                # Too soon after the account's previous reply
+                self._requeue(entry, pacer.reserve())
+                continue
+
+            if self._deliver(entry, reply):
+                posted_count += 1
+        return posted_count
+
+    def _deliver(self, entry, reply):
+        reddit = self._client(entry.account)
+        rate_budget = self.pool.rate_budget(entry.account)
+        try:
+            comment_id = None
+            if entry.attempts > 1:
+                comment_id = self._find_existing_comment(reddit, rate_budget, entry, reply)
+                if comment_id:
+                    logger.info(f"{entry.idempotency_key} was already posted as {comment_id}")
+            if not comment_id:
+                rate_budget.acquire()
+                comment_id = reddit.submission(id=reply.post.reddit_id).reply(entry.content).id
+        except Exception as e:
+            wait = rate_limit_wait(e)
+            if wait is None:
+                self._retry_or_fail(entry, reply, e)
+            else:
+                self._rate_limited(entry, reply, wait)
+            return False
+
+        self._mark_posted(entry, reply, comment_id)
+        return True
+
+    def _rate_limited(self, entry, reply, wait):
+        """Rate-limited requests aren't carried out, so this doesn't count as an attempt"""
+        until = self.pool.start_cooldown(entry.account, wait)
+        entry.attempts -= 1
+        if entry.attempts:
+            self._requeue(entry, until, not_attempted=False)
+        else:
+            _assign(entry, reply, self.pool, exclude={entry.account})
+            self._requeue(entry, entry.available_at, not_attempted=False)
+
+    def _find_existing_comment(self, reddit, rate_budget, entry, reply):
+        """Id of a comment of ours on the reply's thread with the same text, made since the entry was queued.
+
+        Reddit returns comment bodies with &, < and > HTML-escaped, so they're
+        unescaped before comparing.
+        """
+        link_id = f"t3_{reply.post.reddit_id}"
+        content = entry.content.strip()
+        since = entry.created_at.timestamp() - EXISTING_COMMENT_CLOCK_SKEW_SECONDS
+        rate_budget.acquire()
+        for comment in reddit.redditor(entry.account).comments.new(limit=EXISTING_COMMENT_LOOKBACK):
+            if comment.link_id != link_id or comment.created_utc < since:
+                continue
+            if html.unescape(comment.body).strip() == content:
+                return comment.id
+        return None
+
+    def _mark_posted(self, entry, reply, comment_id):
+        now = timezone.now()
+        with transaction.atomic():
+            entry.state = 'posted'
+            entry.reddit_comment_id = comment_id
+            entry.posted_at = now
+            entry.lease_expires_at = None
+            entry.last_error = None
+            entry.save()
+
+            reply.status = 'posted'
+            reply.content = entry.content
+            reply.reddit_comment_id = comment_id
+            reply.posted_at = now
+            reply.save()
+
+            Notification.objects.create(
+                title='Reply Posted',
+                message=f"Reply posted to: {reply.post.title[:50]}...",
+                notification_type='reply_posted',
+                post=reply.post
+            )
+        logger.info(f"Posted reply {reply.id} as {comment_id} (attempt {entry.attempts})")
+
+    def _retry_or_fail(self, entry, reply, error):
+        if entry.attempts >= self.max_attempts:
+            self._fail(entry, reply, str(error))
+            return
+        logger.warning(f"Attempt {entry.attempts} to post reply {reply.id} failed, retrying: {error}")
+        entry.state = 'queued'
+        entry.last_error = str(error)
+        entry.available_at = timezone.now() + timedelta(
+            seconds=self.retry_backoff * 2 ** (entry.attempts - 1)
+        )
+        entry.lease_expires_at = None
+        entry.save()
+        _wake_dispatcher(entry.available_at)
+
+    def _fail(self, entry, reply, error):
+        logger.error(f"Giving up on posting reply {reply.id} after {entry.attempts} attempts: {error}")
+        with transaction.atomic():
+            entry.state = 'failed'
+            entry.last_error = error
+            entry.lease_expires_at = None
+            entry.save()
+            if reply.status in ('pending', 'approved'):
+                reply.status = 'failed'
+                reply.error_message = error
+                reply.save()
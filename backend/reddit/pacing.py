@@ -0,0 +1,74 @@
+import random
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+from .models import PostingSlot, SystemConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReplyPacer:
+    """Spaces out the replies one Reddit account posts, across all workers.
+
+    Consecutive replies are at least `reply_min_spacing_seconds` apart, plus
+    up to `reply_spacing_jitter_seconds` of random extra spacing. State lives
+    in the account's PostingSlot row and is only changed while that row is
+    locked, so workers on different hosts never hand out the same slot.
+
+    `reserve` gives a reply the next free slot, which becomes the outbox
+    entry's `available_at`. `acquire` is checked again just before posting,
+    because entries that came due while no dispatcher was running would
+    otherwise all go out at once.
+    """
+
+    def __init__(self, account):
+        self.account = account
+        self.min_spacing = timedelta(seconds=self._float('reply_min_spacing_seconds', 3))
+        self.jitter_seconds = self._float('reply_spacing_jitter_seconds', 5)
+
+    @staticmethod
+    def _float(key, default):
+        try:
+            return float(SystemConfig.get_value(key, default))
+        except (TypeError, ValueError):
+            return float(default)
+
+    def _spacing(self):
+        return self.min_spacing + timedelta(seconds=random.uniform(0, max(0.0, self.jitter_seconds)))
+
+    def _locked_slot(self):
+        PostingSlot.objects.get_or_create(account=self.account)
+        return PostingSlot.objects.select_for_update().get(account=self.account)
+
+    def reserve(self, now=None):
+        """Reserve the account's next posting slot and return its time"""
+        now = now or timezone.now()
+        with transaction.atomic():
+            slot = self._locked_slot()
+            candidates = [now]
+            if slot.next_slot_at:
+                candidates.append(slot.next_slot_at)
+            if slot.last_posted_at:
+                candidates.append(slot.last_posted_at + self.min_spacing)
+            slot_at = max(candidates)
+            slot.next_slot_at = slot_at + self._spacing()
+            slot.save(update_fields=['next_slot_at', 'updated_at'])
+        return slot_at
+
+    def acquire(self, now=None):
+        """Claim the right to post now.
+
+        Returns 0 and records the post when the account's spacing allows it,
+        otherwise the number of seconds to wait before trying again.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            slot = self._locked_slot()
+            if slot.last_posted_at:
+                wait = (slot.last_posted_at + self.min_spacing - now).total_seconds()
+                if wait > 0:
+                    return wait
+            slot.last_posted_at = now
+            slot.save(update_fields=['last_posted_at', 'updated_at'])
+        return 0
@@ -1,129 +1,157 @@
-import praw
 from django.conf import settings
 from django.utils import timezone
+from .client import create_reddit_client
 from .models import Reply, Notification
+from .accounts import AccountPool
+from .outbox import enqueue_reply
+from .ratelimit import get_reddit_rate_budget
+from .refresh import RefreshSchedule
 import logging
-import time
-import random
 
 logger = logging.getLogger(__name__)
 
+# Reddit's /api/info accepts up to 100 fullnames per request
+ENGAGEMENT_BATCH_SIZE = 100
+# Reddit keeps roughly the last 1000 inbox items
+INBOX_REPLY_LIMIT = 1000
+HIGH_ENGAGEMENT_UPVOTES = 5
+
+
+def _posted_from(reply):
+    """Account a posted reply came from; replies from before the outbox were posted as REDDIT_USERNAME"""
+    entry = getattr(reply, 'outbox', None)
+    return entry.account if entry and entry.account else settings.REDDIT_USERNAME
+
 
 class RedditPoster:
     def __init__(self):
-        self.reddit = praw.Reddit(
-            client_id=settings.REDDIT_CLIENT_ID,
-            client_secret=settings.REDDIT_CLIENT_SECRET,
-            user_agent=settings.REDDIT_USER_AGENT,
-            username=settings.REDDIT_USERNAME,
-            password=settings.REDDIT_PASSWORD,
-        )
+        self.reddit = create_reddit_client(authenticated=True)
+        self.rate_budget = get_reddit_rate_budget()
     
-    def post_pending_replies(self):
-        """Post pending replies to Reddit"""
-        pending_replies = Reply.objects.filter(status='pending')
-        posted_count = 0
+    def schedule_pending_replies(self):
+        """Put pending replies in the outbox, spread over the account pool; the dispatcher posts them"""
+        pending_replies = Reply.objects.filter(status='pending', outbox__isnull=True).select_related('post')
         
-        for reply in pending_replies:
-            try:
-                # Add random delay to avoid rate limiting
-                time.sleep(random.uniform(3, 8))
-                
-                success = self._post_reply(reply)
-                if success:
-                    posted_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Error posting reply {reply.id}: {e}")
-                reply.status = 'failed'
-                reply.error_message = str(e)
-                reply.save()
+        pool = AccountPool()
+        scheduled_count = 0
+        for reply in pending_replies.order_by('created_at'):
+            _, created = enqueue_reply(reply, pool=pool)
+            if created:
+                scheduled_count += 1
         
-        return posted_count
-    
-    def _post_reply(self, reply):
-        """Post a single reply to Reddit"""
-        try:
-            # Get the Reddit submission
-            submission = self.reddit.submission(id=reply.post.reddit_id)
-            
-            # Post the comment
-            comment = submission.reply(reply.content)
-            
-            # Update reply status
-            reply.status = 'posted'
-            reply.reddit_comment_id = comment.id
-            reply.posted_at = timezone.now()
-            reply.save()
-            
-            logger.info(f"Successfully posted reply {reply.id} to Reddit")
-            
-            # Create notification
-            Notification.objects.create(
-                title='Reply Posted',
-                message=f"Reply posted to: {reply.post.title[:50]}...",
-                notification_type='reply_posted',
-                post=reply.post
-            )
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error posting reply {reply.id}: {e}")
-            reply.status = 'failed'
-            reply.error_message = str(e)
-            reply.save()
-            return False
+        logger.info(f"Queued {scheduled_count} replies for posting")
+        return scheduled_count
     
     def update_engagement_metrics(self):
-        """Update engagement metrics for posted replies"""
-        posted_replies = Reply.objects.filter(
-            status='posted',
-            reddit_comment_id__isnull=False
-        )
+        """Refresh upvotes and reply counts of posted replies that are due.
         
-        updated_count = 0
+        Only replies whose `next_check_at` has passed (or that were never
+        checked) are refreshed; RefreshSchedule then pushes the next check
+        further out as the reply ages, pulls it in after new votes or replies,
+        and drops replies past the horizon. Comments are looked up
+        ENGAGEMENT_BATCH_SIZE at a time through /api/info and saved with one
+        bulk_update per batch. Reply counts come from the inbox of comment
+        replies of each account the replies were posted from, which is a
+        single paged listing per account instead of one request per comment;
+        a count is only changed for comments with replies still in the inbox.
+        Inbox reads are charged to that account's rate budget.
+        """
+        schedule = RefreshSchedule()
+        posted_replies = list(schedule.due(
+            Reply.objects.filter(status='posted', reddit_comment_id__isnull=False)
+            .exclude(reddit_comment_id='')
+            .select_related('post', 'outbox'),
+            'posted_at',
+        ))
+        if not posted_replies:
+            return 0
         
-        for reply in posted_replies:
+        accounts = {_posted_from(reply) for reply in posted_replies}
+        reply_counts = {}
+        pool = AccountPool()
+        for username in sorted(accounts):
+            reply_counts.update(self._comment_reply_counts(pool, username))
+        updated_count = 0
+        for start in range(0, len(posted_replies), ENGAGEMENT_BATCH_SIZE):
+            batch = posted_replies[start:start + ENGAGEMENT_BATCH_SIZE]
             try:
-                # Add random delay
-                time.sleep(random.uniform(1, 3))
-                
-                # Get the comment from Reddit
-                comment = self.reddit.comment(id=reply.reddit_comment_id)
-                
-                # Update metrics
-                reply.upvotes = comment.score
-                reply.downvotes = 0  # Reddit API doesn't provide downvotes directly
-                reply.reply_count = len(comment.replies)
-                reply.save()
-                
-                # Check for high engagement
-                if reply.upvotes >= 5:
-                    Notification.objects.create(
-                        title='High Engagement',
-                        message=f"High engagement on reply: {reply.post.title[:50]}... ({reply.upvotes} upvotes)",
-                        notification_type='engagement_increase',
-                        post=reply.post
-                    )
-                
-                updated_count += 1
-                
+                updated_count += self._refresh_engagement_batch(batch, reply_counts, schedule)
             except Exception as e:
-                logger.error(f"Error updating engagement for reply {reply.id}: {e}")
+                logger.error(f"Error updating engagement for {len(batch)} replies: {e}")
         
         return updated_count
     
+    def _comment_reply_counts(self, pool, username):
+        """Direct replies per comment id from one account's inbox, or {} if it can't be read"""
+        if username in pool.accounts:
+            reddit, rate_budget = pool.client(username), pool.rate_budget(username)
+        else:
+            reddit, rate_budget = self.reddit, self.rate_budget
+        
+        counts = {}
+        try:
+            for index, message in enumerate(reddit.inbox.comment_replies(limit=INBOX_REPLY_LIMIT)):
+                # praw pulls the listing a page at a time; charge one token per page
+                if index % ENGAGEMENT_BATCH_SIZE == 0:
+                    rate_budget.acquire()
+                if message.parent_id.startswith('t1_'):
+                    comment_id = message.parent_id[3:]
+                    counts[comment_id] = counts.get(comment_id, 0) + 1
+        except Exception as e:
+            logger.warning(f"Couldn't read comment replies from {username}'s inbox, keeping reply counts: {e}")
+            return {}
+        return counts
+    
+    def _refresh_engagement_batch(self, replies, reply_counts, schedule):
+        """Look up one batch of comments in a single request, save their metrics and reschedule them"""
+        by_fullname = {f"t1_{reply.reddit_comment_id}": reply for reply in replies}
+        self.rate_budget.acquire()
+        comments = {comment.fullname: comment for comment in self.reddit.info(fullnames=list(by_fullname))}
+        
+        now = timezone.now()
+        updated = []
+        notifications = []
+        for fullname, reply in by_fullname.items():
+            comment = comments.get(fullname)
+            if comment is None:
+                # Deleted or removed; keep backing off until it ages out
+                reply.next_check_at = schedule.next_check_at(reply.posted_at, now=now)
+                continue
+            previous_upvotes = reply.upvotes
+            previous_replies = reply.reply_count
+            reply.upvotes = comment.score
+            reply.downvotes = 0  # Reddit API doesn't provide downvotes directly
+            reply.reply_count = reply_counts.get(comment.id, reply.reply_count)
+            reply.updated_at = now
+            active = reply.upvotes != previous_upvotes or reply.reply_count != previous_replies
+            reply.next_check_at = schedule.next_check_at(reply.posted_at, active=active, now=now)
+            updated.append(reply)
+            
+            # Notify once, when a reply first crosses the threshold
+            if previous_upvotes < HIGH_ENGAGEMENT_UPVOTES <= reply.upvotes:
+                notifications.append(Notification(
+                    title='High Engagement',
+                    message=f"High engagement on reply: {reply.post.title[:50]}... ({reply.upvotes} upvotes)",
+                    notification_type='engagement_increase',
+                    post=reply.post
+                ))
+        
+        # Every reply in the batch was rescheduled, including ones Reddit didn't return
+        Reply.objects.bulk_update(replies, ['upvotes', 'downvotes', 'reply_count', 'updated_at', 'next_check_at'])
+        if notifications:
+            Notification.objects.bulk_create(notifications)
+        return len(updated)
+    
     def approve_reply(self, reply_id):
         """Approve a reply for posting"""
         try:
-            reply = Reply.objects.get(id=reply_id)
+            reply = Reply.objects.select_related('post').get(id=reply_id)
             reply.status = 'approved'
             reply.save()
             
-            # Post the reply
-            success = self._post_reply(reply)
-            return success
+            # Posted by the outbox dispatcher
+            enqueue_reply(reply)
+            return True
             
         except Reply.DoesNotExist:
             logger.error(f"Reply {reply_id} not found")
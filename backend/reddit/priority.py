@@ -0,0 +1,82 @@
+import math
+from django.utils import timezone
+from langagent.prefilter import BUDGET, FOR_HIRE_TAG, HIRING_TAG, MAX_KEYWORD_SCORE
+from .matcher import KeywordMatcher
+from .models import Keyword, Leaderboard, Subreddit, SystemConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_WEIGHTS = {
+    'hiring_tag': 3.0,
+    'for_hire_tag': -3.0,
+    'budget': 2.0,
+    # Multiplies the capped weighted keyword score
+    'keywords': 1.0,
+    # Multiplies the subreddit's smoothed lead yield (0-1)
+    'subreddit_yield': 4.0,
+    # Multiplies the freshness factor (1 for a brand-new post, halving every half-life)
+    'freshness': 2.0,
+}
+
+
+class ClassificationPriority:
+    """Priority of a post in the classification queue, computed once at ingest.
+
+    Combines the weighted keyword matches, hiring/for-hire tags and budget
+    mentions, the post's age when it was fetched, and its subreddit's lead
+    yield from the Leaderboard (smoothed so subreddits without history sit
+    near the prior). Workers claim the highest priority first, and the
+    newest post among equal priorities (see reddit.claims.CLAIM_ORDER).
+    """
+
+    # Smoothing prior for subreddits with little or no Leaderboard history
+    PRIOR_POSTS = 10.0
+    PRIOR_YIELD = 0.1
+
+    def __init__(self):
+        try:
+            self.half_life_hours = float(SystemConfig.get_value('priority_age_half_life_hours', 6))
+        except (TypeError, ValueError):
+            self.half_life_hours = 6.0
+
+        keywords = Keyword.objects.filter(is_active=True).values_list('keyword', 'weight')
+        self.keyword_weights = {keyword.lower(): weight for keyword, weight in keywords}
+        self.matcher = KeywordMatcher(list(self.keyword_weights), builtin_keywords=[])
+
+        yields = {
+            name.lower(): (opportunities + self.PRIOR_YIELD * self.PRIOR_POSTS) / (posts + self.PRIOR_POSTS)
+            for name, posts, opportunities in Leaderboard.objects.filter(metric_type='subreddit')
+            .values_list('name', 'total_posts', 'total_opportunities')
+        }
+        self.subreddit_yields = {
+            subreddit_id: yields.get(name.lower(), self.PRIOR_YIELD)
+            for subreddit_id, name in Subreddit.objects.values_list('id', 'name')
+        }
+
+    def score(self, title, content, created_at, subreddit_id, now=None):
+        text = f"{title}\n{content}".lower()
+        score = 0.0
+        if HIRING_TAG.search(text):
+            score += PRIORITY_WEIGHTS['hiring_tag']
+        if FOR_HIRE_TAG.search(text):
+            score += PRIORITY_WEIGHTS['for_hire_tag']
+        if BUDGET.search(text):
+            score += PRIORITY_WEIGHTS['budget']
+
+        matched = self.matcher.match(text).keywords
+        if matched:
+            keyword_score = min(MAX_KEYWORD_SCORE, sum(self.keyword_weights.get(k, 1.0) for k in matched))
+            score += PRIORITY_WEIGHTS['keywords'] * keyword_score
+
+        score += PRIORITY_WEIGHTS['subreddit_yield'] * self.subreddit_yields.get(subreddit_id, self.PRIOR_YIELD)
+
+        age_hours = max(0.0, ((now or timezone.now()) - created_at).total_seconds() / 3600)
+        score += PRIORITY_WEIGHTS['freshness'] * math.pow(0.5, age_hours / self.half_life_hours)
+        return round(score, 3)
+
+    def score_post_data(self, post_data, now=None):
+        """Priority for a dict of RedditPost fields, as built by the fetcher"""
+        return self.score(
+            post_data['title'], post_data['content'], post_data['created_at'], post_data['subreddit_id'], now
+        )
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket for pacing calls against an API budget.
+
+    The bucket holds up to `capacity` tokens and refills continuously at
+    `rate` tokens per second. `acquire` blocks until enough tokens are
+    available, so callers are throttled by the budget instead of fixed sleeps.
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now, without blocking"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; return False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    @property
+    def available(self):
+        with self.lock:
+            self._refill()
+            return self.tokens
+
+
+class RedisTokenBucket:
+    """Token bucket shared by every worker through one hash in Redis.
+
+    Refilling and taking tokens happens in a Lua script, so it's atomic
+    across processes and hosts, and the configured rate is the rate of the
+    whole deployment rather than of each worker. If Redis can't be reached
+    the bucket falls back to a process-local TokenBucket until it comes back.
+    """
+
+    # KEYS[1]: bucket; ARGV: capacity, rate, now, tokens wanted, ttl.
+    # Returns {seconds to wait, tokens left}; a wait of 0 means they were taken.
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local wanted = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+if now < updated_at then
+    now = updated_at
+end
+tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+local wait = 0
+if tokens >= wanted then
+    tokens = tokens - wanted
+else
+    wait = (wanted - tokens) / rate
+end
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[5]))
+return {tostring(wait), tostring(tokens)}
+"""
+
+    def __init__(self, client, key, capacity, rate):
+        self.client = client
+        self.key = key
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.fallback = TokenBucket(capacity, rate)
+        self.using_fallback = False
+        self._script = client.register_script(self.SCRIPT)
+
+    def _take(self, tokens):
+        """Seconds to wait before `tokens` are available (0 if they were taken now) and tokens left"""
+        import redis
+
+        # Keep the key around long enough to refill completely
+        ttl = max(60, int(self.capacity / self.rate) + 60)
+        try:
+            wait, left = self._script(keys=[self.key], args=[self.capacity, self.rate, time.time(), tokens, ttl])
+        except redis.RedisError as e:
+            if not self.using_fallback:
+                logger.warning(f"Reddit rate budget {self.key} can't reach Redis, using a local bucket: {e}")
+                self.using_fallback = True
+            return None
+        if self.using_fallback:
+            logger.info(f"Reddit rate budget {self.key} reconnected to Redis")
+            self.using_fallback = False
+        return float(wait), float(left)
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now, without blocking"""
+        result = self._take(tokens)
+        if result is None:
+            return self.fallback.try_acquire(tokens)
+        return result[0] == 0
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; return False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            result = self._take(tokens)
+            if result is None:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                return self.fallback.acquire(tokens, timeout=remaining)
+            wait = result[0]
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    @property
+    def available(self):
+        result = self._take(0)
+        if result is None:
+            return self.fallback.available
+        return result[1]
+
+
+def create_rate_budget(key, per_minute):
+    """Token bucket for `per_minute` requests, shared through Redis unless REDDIT_RATE_BUDGET_BACKEND is 'local'"""
+    if settings.REDDIT_RATE_BUDGET_BACKEND == 'redis':
+        import redis
+        client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=2, socket_connect_timeout=2)
+        return RedisTokenBucket(client, f'reddit:ratelimit:{key}', capacity=per_minute, rate=per_minute / 60.0)
+    return TokenBucket(capacity=per_minute, rate=per_minute / 60.0)
+
+
+_reddit_budget = None
+_reddit_budget_lock = threading.Lock()
+
+
+def get_reddit_rate_budget():
+    """Process-wide handle on Reddit's OAuth requests-per-minute budget.
+
+    With the default 'redis' backend every worker draws from the same
+    budget, so REDDIT_REQUESTS_PER_MINUTE is the limit for the whole
+    deployment. With 'local' each process has its own bucket, and the
+    setting has to be divided by the number of worker processes.
+    """
+    global _reddit_budget
+    with _reddit_budget_lock:
+        if _reddit_budget is None:
+            _reddit_budget = create_rate_budget('app', settings.REDDIT_REQUESTS_PER_MINUTE)
+        return _reddit_budget
@@ -0,0 +1,59 @@
+from django.db.models import F, Q
+from django.utils import timezone
+from datetime import timedelta
+from .models import SystemConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshSchedule:
+    """When to next re-check a posted reply or a monitored lead for engagement.
+
+    The interval is `refresh_age_factor` times the item's age, clamped between
+    `refresh_min_interval_minutes` and `refresh_max_interval_hours`, so items
+    are checked often while they're young and rarely after a few days. If the
+    last check saw activity (new votes or comments) the interval is divided by
+    `refresh_activity_divisor`. Items older than `refresh_horizon_days` aren't
+    checked again.
+
+    Rows store the result in `next_check_at`; NULL means "not checked yet"
+    while the item is inside the horizon, and "dropped" once it's past it.
+    """
+
+    def __init__(self):
+        self.min_interval = timedelta(minutes=self._float('refresh_min_interval_minutes', 30))
+        self.max_interval = timedelta(hours=self._float('refresh_max_interval_hours', 24))
+        self.age_factor = self._float('refresh_age_factor', 0.25)
+        self.activity_divisor = max(1.0, self._float('refresh_activity_divisor', 4))
+        self.horizon = timedelta(days=self._float('refresh_horizon_days', 14))
+        self.batch_limit = int(self._float('refresh_batch_limit', 1000))
+
+    @staticmethod
+    def _float(key, default):
+        try:
+            return float(SystemConfig.get_value(key, default))
+        except (TypeError, ValueError):
+            return float(default)
+
+    def interval(self, age, active=False):
+        interval = age * self.age_factor
+        if active:
+            interval /= self.activity_divisor
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def next_check_at(self, born_at, active=False, now=None):
+        """Next check for an item created at `born_at`, or None once it's past the horizon"""
+        now = now or timezone.now()
+        age = now - (born_at or now)
+        if age >= self.horizon:
+            return None
+        return now + self.interval(age, active)
+
+    def due(self, queryset, born_field, now=None):
+        """Rows of `queryset` due for a check, never-checked ones first, up to `refresh_batch_limit`"""
+        now = now or timezone.now()
+        unchecked = Q(next_check_at__isnull=True, **{f'{born_field}__gte': now - self.horizon})
+        return queryset.filter(Q(next_check_at__lte=now) | unchecked).order_by(
+            F('next_check_at').asc(nulls_first=True)
+        )[:self.batch_limit]
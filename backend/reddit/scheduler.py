@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from datetime import timedelta
+from .models import Subreddit, SystemConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _config_float(key, default):
+    try:
+        return float(SystemConfig.get_value(key, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+class PollScheduler:
+    """Per-subreddit polling intervals learned from recent post and lead history.
+
+    A subreddit's expected leads per hour is its post arrival rate (from
+    RedditPost.fetched_at) times its smoothed lead yield (from
+    Classification.is_opportunity). It is polled whenever roughly
+    `poll_target_leads_per_poll` leads are expected, clamped between the
+    configured min and max interval. If the combined poll rate would exceed
+    the share of the Reddit API budget set aside for polling, all intervals
+    are stretched proportionally.
+    """
+
+    # Smoothing prior so quiet or brand-new subreddits don't get extreme estimates
+    PRIOR_POSTS = 1.0
+    PRIOR_LEADS = 0.1
+
+    def __init__(self):
+        self.min_interval = _config_float('poll_min_interval_minutes', 5)
+        self.max_interval = _config_float('poll_max_interval_minutes', 360)
+        self.target_leads_per_poll = _config_float('poll_target_leads_per_poll', 0.5)
+        self.history_days = _config_float('poll_history_days', 7)
+        self.budget_fraction = _config_float('poll_budget_fraction', 0.5)
+
+    def _clamp(self, minutes):
+        return max(self.min_interval, min(self.max_interval, minutes))
+
+    def compute_schedule(self):
+        """Return the computed polling schedule for every active subreddit"""
+        now = timezone.now()
+        since = now - timedelta(days=self.history_days)
+        subreddits = Subreddit.objects.filter(is_active=True).annotate(
+            recent_posts=Count('posts', filter=Q(posts__fetched_at__gte=since)),
+            recent_leads=Count('posts', filter=Q(
+                posts__fetched_at__gte=since,
+                posts__classification__is_opportunity=True,
+            )),
+        )
+
+        schedule = []
+        for subreddit in subreddits:
+            # Only count the hours we've actually been watching this subreddit
+            window_start = max(since, subreddit.created_at)
+            hours = max((now - window_start).total_seconds() / 3600, 1.0)
+
+            posts_per_hour = (subreddit.recent_posts + self.PRIOR_POSTS) / hours
+            lead_yield = (subreddit.recent_leads + self.PRIOR_LEADS) / (subreddit.recent_posts + self.PRIOR_POSTS)
+            leads_per_hour = posts_per_hour * lead_yield
+            interval = self._clamp(60 * self.target_leads_per_poll / leads_per_hour)
+
+            schedule.append({
+                'subreddit': subreddit,
+                'posts': subreddit.recent_posts,
+                'leads': subreddit.recent_leads,
+                'posts_per_hour': posts_per_hour,
+                'lead_yield': lead_yield,
+                'leads_per_hour': leads_per_hour,
+                'interval_minutes': interval,
+            })
+
+        self._fit_to_budget(schedule)
+        return schedule
+
+    def _fit_to_budget(self, schedule):
+        """Stretch intervals so the total poll rate stays inside the API budget"""
+        budget_per_hour = settings.REDDIT_REQUESTS_PER_MINUTE * 60 * self.budget_fraction
+        polls_per_hour = sum(60 / entry['interval_minutes'] for entry in schedule)
+        if schedule and polls_per_hour > budget_per_hour:
+            factor = polls_per_hour / budget_per_hour
+            logger.info(f"Polling schedule exceeds API budget, stretching intervals by {factor:.2f}x")
+            for entry in schedule:
+                entry['interval_minutes'] = min(self.max_interval, entry['interval_minutes'] * factor)
+
+    def schedule_after_fetch(self, results):
+        """Record fetch times and set each fetched subreddit's next poll.
+
+        `results` is a list of SubredditFetchResult. Failed fetches are retried
+        after the minimum interval rather than the learned one.
+        """
+        now = timezone.now()
+        results_by_name = {result.subreddit_name: result for result in results}
+        updated = []
+
+        for entry in self.compute_schedule():
+            subreddit = entry['subreddit']
+            result = results_by_name.get(subreddit.name)
+            if result is None:
+                continue
+
+            interval = entry['interval_minutes'] if result.ok else self.min_interval
+            subreddit.poll_interval_minutes = entry['interval_minutes']
+            subreddit.last_fetched_at = now
+            subreddit.next_fetch_at = now + timedelta(minutes=interval)
+            updated.append(subreddit)
+
+        Subreddit.objects.bulk_update(updated, ['poll_interval_minutes', 'last_fetched_at', 'next_fetch_at'])
+        return updated
+
+
+def serialize_schedule_entry(entry):
+    subreddit = entry['subreddit']
+    return {
+        'id': subreddit.id,
+        'name': subreddit.name,
+        'posts': entry['posts'],
+        'leads': entry['leads'],
+        'posts_per_hour': round(entry['posts_per_hour'], 3),
+        'lead_yield': round(entry['lead_yield'], 3),
+        'leads_per_hour': round(entry['leads_per_hour'], 4),
+        'interval_minutes': round(entry['interval_minutes'], 1),
+        'last_fetched_at': subreddit.last_fetched_at,
+        'next_fetch_at': subreddit.next_fetch_at,
+    }
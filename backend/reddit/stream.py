@@ -0,0 +1,202 @@
+from django.utils import timezone
+from datetime import datetime, timedelta
+import pytz
+from .claims import classification_backpressure
+from .models import Subreddit
+from .fetcher import RedditFetcher
+from .matcher import KeywordMatcher
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Longest wait before reconnecting after repeated stream failures
+MAX_BACKOFF_SECONDS = 300
+
+
+class SubmissionStreamer:
+    """Long-lived consumer of new submissions across all active subreddits.
+
+    Holds one `stream.submissions()` on the combined a+b+c multireddit, saves
+    keyword matches as they arrive and queues them for classification.
+    Subreddit and keyword changes are picked up every `refresh_interval`
+    seconds without a restart. Each subreddit's fetch cursor doubles as the
+    stream checkpoint, so a restart first catches up through the regular
+    incremental fetch and then skips anything already seen.
+    """
+
+    # How often the classification backlog is checked for backpressure
+    BACKLOG_CHECK_SECONDS = 10.0
+
+    def __init__(self, fetcher=None, poll_interval=2.0, refresh_interval=60.0,
+                 hours_back=24, group_id=None, flush_size=25):
+        self.fetcher = fetcher or RedditFetcher()
+        self.poll_interval = poll_interval
+        self.refresh_interval = refresh_interval
+        self.hours_back = hours_back
+        self.group_id = group_id
+        self.flush_size = flush_size
+
+        self.subreddits = {}
+        self.pending_posts = []
+        self.dirty_cursors = {}
+        self.last_refresh = 0.0
+        self.backlog_checked_at = 0.0
+        self.stats = {'seen': 0, 'matched': 0, 'saved': 0, 'restarts': 0, 'throttled': 0}
+
+    def _active_subreddits(self):
+        subreddits = Subreddit.objects.filter(is_active=True)
+        if self.group_id:
+            subreddits = subreddits.filter(group_id=self.group_id)
+        return {subreddit.name.lower(): subreddit for subreddit in subreddits}
+
+    def refresh_config(self):
+        """Reload keywords and subreddits; return True if the subreddit set changed"""
+        self.fetcher.keyword_matcher = KeywordMatcher.from_active_keywords()
+        subreddits = self._active_subreddits()
+        changed = set(subreddits) != set(self.subreddits)
+        # Cursors are flushed before every refresh, so the rows just loaded are current
+        self.subreddits = subreddits
+        self.last_refresh = time.monotonic()
+        return changed
+
+    def catch_up(self):
+        """Fetch anything posted while the streamer was down, using the subreddit cursors"""
+        saved_posts = self.fetcher.fetch_and_save(hours_back=self.hours_back, group_id=self.group_id)
+        self._enqueue_classification(saved_posts)
+        logger.info(f"Stream catch-up saved {len(saved_posts)} posts")
+        return saved_posts
+
+    def run(self, catch_up=True, max_runtime=None):
+        """Consume the stream until interrupted or max_runtime seconds have passed.
+
+        Ctrl+C stops it cleanly at any point, including during the catch-up
+        and reconnect backoff: buffered posts and cursors are still saved.
+        """
+        started = time.monotonic()
+        try:
+            if catch_up:
+                self.catch_up()
+            self._stream(started, max_runtime)
+        except KeyboardInterrupt:
+            logger.info("Submission stream interrupted")
+        finally:
+            self.flush()
+        return self.stats
+
+    def _stream(self, started, max_runtime):
+        """Keep a stream open, restarting it on changes and failures, until max_runtime"""
+        self.refresh_config()
+        failures = 0
+        while max_runtime is None or time.monotonic() - started < max_runtime:
+            if not self.subreddits:
+                logger.warning("No active subreddits configured; waiting")
+                time.sleep(self.refresh_interval)
+                self.refresh_config()
+                continue
+
+            try:
+                restart = self._consume(started, max_runtime)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                backoff = min(MAX_BACKOFF_SECONDS, self.poll_interval * 2 ** failures)
+                logger.error(f"Submission stream failed, restarting in {backoff:.0f}s: {e}")
+                time.sleep(backoff)
+                restart = True
+            finally:
+                self.flush()
+
+            if restart:
+                self.stats['restarts'] += 1
+
+    def _consume(self, started, max_runtime):
+        """Read one stream until the subreddit set changes; return True to restart it"""
+        multireddit = '+'.join(sorted(self.subreddits))
+        logger.info(f"Streaming submissions from r/{multireddit}")
+        stream = self.fetcher.reddit.subreddit(multireddit).stream.submissions(pause_after=-1)
+        cutoff_time = timezone.now() - timedelta(hours=self.hours_back)
+
+        for submission in stream:
+            if submission is None:
+                # pause_after=-1 yields None after every response, including empty ones
+                self.flush()
+                if max_runtime is not None and time.monotonic() - started >= max_runtime:
+                    return False
+                if time.monotonic() - self.last_refresh >= self.refresh_interval and self.refresh_config():
+                    return True
+                time.sleep(self.poll_interval)
+                self._wait_for_backlog(started, max_runtime)
+                self.fetcher.rate_budget.acquire()
+                continue
+
+            self._handle_submission(submission, cutoff_time)
+            if len(self.pending_posts) >= self.flush_size:
+                self.flush()
+
+        return True
+
+    def _wait_for_backlog(self, started, max_runtime):
+        """Backpressure: pause while the classification backlog is over its limit.
+
+        Posts made in the meantime are picked up by the stream's own lookback
+        or, after a long pause, by the cursors on the next catch-up.
+        """
+        if time.monotonic() - self.backlog_checked_at < self.BACKLOG_CHECK_SECONDS:
+            return
+        self.backlog_checked_at = time.monotonic()
+        throttled = classification_backpressure()
+        while throttled:
+            backlog, limit = throttled
+            logger.warning(f"Stream paused: {backlog} posts waiting for classification (limit {limit})")
+            self.stats['throttled'] += 1
+            if max_runtime is not None and time.monotonic() - started >= max_runtime:
+                return
+            time.sleep(self.BACKLOG_CHECK_SECONDS)
+            throttled = classification_backpressure()
+
+    def _handle_submission(self, submission, cutoff_time):
+        self.stats['seen'] += 1
+        subreddit = self.subreddits.get(submission.subreddit.display_name.lower())
+        post_time = datetime.fromtimestamp(submission.created_utc, tz=pytz.UTC)
+
+        if subreddit is not None:
+            # Skip what the fetcher or a previous stream run already handled
+            if subreddit.last_seen_created_at and post_time <= subreddit.last_seen_created_at:
+                return
+            subreddit.last_seen_fullname = submission.fullname
+            subreddit.last_seen_created_at = post_time
+            self.dirty_cursors[subreddit.pk] = subreddit
+
+        if post_time < cutoff_time:
+            return
+
+        if self.fetcher._contains_keywords(submission.title + " " + submission.selftext):
+            self.stats['matched'] += 1
+            self.pending_posts.append(self.fetcher._extract_post_data(submission))
+
+    def flush(self):
+        """Save buffered matches, queue them for the AI stage and persist cursors"""
+        if self.pending_posts:
+            saved_posts = self.fetcher.save_posts(self.pending_posts)
+            self.pending_posts = []
+            self.stats['saved'] += len(saved_posts)
+            self._enqueue_classification(saved_posts)
+
+        now = timezone.now()
+        for subreddit in self.dirty_cursors.values():
+            Subreddit.objects.filter(pk=subreddit.pk).update(
+                last_seen_fullname=subreddit.last_seen_fullname,
+                last_seen_created_at=subreddit.last_seen_created_at,
+                cursor_verified_at=now,
+            )
+        self.dirty_cursors = {}
+
+    def _enqueue_classification(self, posts):
+        from .tasks import process_post_with_ai
+
+        for post in posts:
+            try:
+                process_post_with_ai.delay(post.id)
+            except Exception as e:
+                logger.error(f"Error queueing post {post.id} for classification: {e}")
@@ -1,17 +1,31 @@
 from celery import shared_task
 from django.utils import timezone
+from .claims import PostClaimer, classification_backpressure, classification_queue_stats
+from .client import create_reddit_client
 from .fetcher import RedditFetcher
 from langagent.agent import RedditLeadAgent
-from .models import RedditPost, Reply, Notification
+from langagent.governor import GOVERNOR_ERRORS
+from .models import Classification, RedditPost, Reply, Notification
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _fetch_throttled():
+    """Backpressure: skip fetching while the classification backlog is over its limit"""
+    throttled = classification_backpressure()
+    if throttled:
+        backlog, limit = throttled
+        logger.warning(f"Skipping fetch: {backlog} posts waiting for classification (limit {limit})")
+    return bool(throttled)
+
+
 @shared_task
 def fetch_reddit_posts():
     """Fetch new Reddit posts from monitored subreddits"""
     try:
+        if _fetch_throttled():
+            return 0
         fetcher = RedditFetcher()
         saved_posts = fetcher.fetch_and_save(hours_back=24)
         
@@ -23,38 +37,116 @@ def fetch_reddit_posts():
         return 0
 
 
+@shared_task
+def fetch_due_subreddits():
+    """Fetch only the subreddits whose adaptive polling interval has elapsed"""
+    try:
+        if _fetch_throttled():
+            return 0
+        fetcher = RedditFetcher()
+        saved_posts = fetcher.fetch_and_save(hours_back=24, due_only=True)
+        
+        logger.info(f"Successfully fetched {len(saved_posts)} new posts from due subreddits")
+        return len(saved_posts)
+        
+    except Exception as e:
+        logger.error(f"Error in fetch_due_subreddits task: {e}")
+        return 0
+
+
 @shared_task
 def process_posts_with_ai():
     """Process unclassified posts with AI"""
     try:
-        agent = RedditLeadAgent()
+        queue = classification_queue_stats()
+        logger.info(
+            f"Classification queue: {queue['depth']} posts ({queue['leased']} leased), "
+            f"oldest waiting {queue['oldest_age_seconds']:.0f}s"
+        )
+        agent = RedditLeadAgent(defer_replies=True)
         processed_count = agent.process_unclassified_posts()
         
         logger.info(f"Successfully processed {processed_count} posts with AI")
         return processed_count
         
+    except GOVERNOR_ERRORS as e:
+        # Unfinished claims expire and the posts are picked up by a later run
+        logger.warning(f"Stopped processing posts with AI, OpenAI is unavailable: {e}")
+        return 0
     except Exception as e:
         logger.error(f"Error in process_posts_with_ai task: {e}")
         return 0
 
 
+@shared_task
+def process_post_with_ai(post_id):
+    """Classify a single freshly ingested post (and draft a reply if it's a lead)"""
+    try:
+        # Skip posts already classified or claimed by a batch worker
+        claimer = PostClaimer()
+        post = claimer.claim_post(post_id)
+        if post is None:
+            return False
+        
+        agent = RedditLeadAgent(defer_replies=True)
+        result = agent.process_post(post)
+        claimer.finish([post])
+        return result is not None
+        
+    except GOVERNOR_ERRORS as e:
+        logger.warning(f"Post {post_id} left for a later run, OpenAI is unavailable: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Error in process_post_with_ai task for post {post_id}: {e}")
+        return False
+
+
+@shared_task
+def generate_post_reply(classification_id):
+    """Draft the reply for a lead classified by one of the classification tasks"""
+    try:
+        classification = Classification.objects.select_related('post', 'post__subreddit').get(id=classification_id)
+        if Reply.objects.filter(post=classification.post).exists():
+            return False
+        
+        agent = RedditLeadAgent()
+        return agent.generate_reply(classification.post, classification) is not None
+        
+    except Classification.DoesNotExist:
+        logger.warning(f"Classification {classification_id} no longer exists, skipping reply")
+        return False
+    except Exception as e:
+        logger.error(f"Error in generate_post_reply task for classification {classification_id}: {e}")
+        return False
+
+
 @shared_task
 def post_replies_to_reddit():
-    """Post approved replies to Reddit"""
+    """Queue pending replies in the outbox for posting"""
     try:
         from .poster import RedditPoster
         
         poster = RedditPoster()
-        posted_count = poster.post_pending_replies()
-        
-        logger.info(f"Successfully posted {posted_count} replies to Reddit")
-        return posted_count
+        return poster.schedule_pending_replies()
         
     except Exception as e:
         logger.error(f"Error in post_replies_to_reddit task: {e}")
         return 0
 
 
+@shared_task
+def dispatch_reply_outbox():
+    """Post the outbox entries that are due"""
+    try:
+        from .outbox import OutboxDispatcher
+        
+        return OutboxDispatcher().dispatch()
+        
+    except Exception as e:
+        logger.error(f"Error in dispatch_reply_outbox task: {e}")
+        return 0
+
+
 @shared_task
 def update_engagement_metrics():
     """Update engagement metrics for posted replies"""
@@ -222,54 +314,81 @@ def daily_maintenance():
 
 @shared_task
 def monitor_old_leads():
-    """Monitor old leads for new activity and engagement changes"""
-    from django.utils import timezone
-    from datetime import timedelta
+    """Check monitored leads that are due for new activity and engagement changes.
     
-    # Get posts that haven't been monitored recently
-    cutoff_date = timezone.now() - timedelta(days=1)
-    old_posts = RedditPost.objects.filter(
-        monitoring_enabled=True,
-        last_monitored_at__lt=cutoff_date,
-        is_opportunity=True
-    )
+    RefreshSchedule decides when each lead is next checked: less often as it
+    ages, sooner after its score or comment count moved, and never again past
+    the refresh horizon. Due leads are looked up 100 at a time through
+    /api/info.
+    """
+    from .poster import ENGAGEMENT_BATCH_SIZE
+    from .ratelimit import get_reddit_rate_budget
+    from .refresh import RefreshSchedule
+    
+    schedule = RefreshSchedule()
+    due_posts = list(schedule.due(
+        RedditPost.objects.filter(monitoring_enabled=True, is_opportunity=True),
+        'created_at',
+    ))
+    if not due_posts:
+        return 0
     
-    for post in old_posts:
+    reddit = create_reddit_client()
+    rate_budget = get_reddit_rate_budget()
+    checked = 0
+    for start in range(0, len(due_posts), ENGAGEMENT_BATCH_SIZE):
+        batch = {f"t3_{post.reddit_id}": post for post in due_posts[start:start + ENGAGEMENT_BATCH_SIZE]}
         try:
-            # Fetch updated post data from Reddit
-            reddit = get_reddit_client()
-            submission = reddit.submission(id=post.reddit_id)
-            
-            # Check for engagement changes
-            old_score = post.score
-            old_comments = post.comment_count
-            
-            if submission.score != old_score or submission.num_comments != old_comments:
+            rate_budget.acquire()
+            submissions = {submission.fullname: submission for submission in reddit.info(fullnames=list(batch))}
+        except Exception as e:
+            logger.error(f"Error monitoring {len(batch)} old leads: {e}")
+            continue
+        
+        now = timezone.now()
+        for fullname, post in batch.items():
+            submission = submissions.get(fullname)
+            active = submission is not None and (
+                submission.score != post.score or submission.num_comments != post.comment_count
+            )
+            if active:
+                old_score = post.score
+                old_comments = post.comment_count
                 post.engagement_increased = True
                 post.new_comments_since_last_check = submission.num_comments - old_comments
                 post.score = submission.score
                 post.comment_count = submission.num_comments
-                post.save()
                 
                 # Send notification for engagement increase
-                if post.engagement_increased:
-                    send_notification.delay(
-                        notification_type='engagement_increase',
-                        title=f'Engagement increased for post: {post.title[:50]}',
-                        message=f'Post score: {old_score} → {post.score}, Comments: {old_comments} → {post.comment_count}',
-                        post_id=post.id
-                    )
-            
-            post.last_monitored_at = timezone.now()
-            post.save()
-            
-        except Exception as e:
-            logger.error(f"Error monitoring old lead {post.reddit_id}: {e}")
+                send_notification.delay(
+                    notification_type='engagement_increase',
+                    title=f'Engagement increased for post: {post.title[:50]}',
+                    message=f'Post score: {old_score} → {post.score}, Comments: {old_comments} → {post.comment_count}',
+                    post_id=post.id
+                )
+            post.last_monitored_at = now
+            post.next_check_at = schedule.next_check_at(post.created_at, active=active, now=now)
+        
+        RedditPost.objects.bulk_update(list(batch.values()), [
+            'score', 'comment_count', 'engagement_increased', 'new_comments_since_last_check',
+            'last_monitored_at', 'next_check_at',
+        ])
+        checked += len(batch)
+    
+    logger.info(f"Checked {checked} monitored leads")
+    return checked
 
 @shared_task
 def send_follow_ups():
-    """Send follow-up replies to posts with increased engagement"""
-    from django.utils import timezone
+    """Queue follow-up replies to posts with increased engagement.
+    
+    Follow-ups are posted through the reply outbox like any other reply,
+    from the account that posted our earlier reply on the thread when it's
+    still eligible.
+    """
+    from django.db import transaction
+    from .accounts import AccountPool
+    from .outbox import enqueue_reply
     
     # Get posts that need follow-ups
     posts_needing_follow_up = RedditPost.objects.filter(
@@ -277,37 +396,35 @@ def send_follow_ups():
         engagement_increased=True
     )
     
+    pool = AccountPool()
     for post in posts_needing_follow_up:
         if post.should_send_follow_up():
             try:
                 # Generate follow-up content
                 follow_up_content = generate_follow_up_content(post)
+                earlier = post.replies.filter(outbox__state='posted').select_related('outbox').order_by('-posted_at').first()
                 
-                # Post follow-up via Reddit
-                reddit = get_reddit_client()
-                submission = reddit.submission(id=post.reddit_id)
-                comment = submission.reply(follow_up_content)
-                
-                # Update post with follow-up info
-                post.follow_up_sent = True
-                post.follow_up_sent_at = timezone.now()
-                post.follow_up_content = follow_up_content
-                post.save()
-                
-                # Create reply record
-                Reply.objects.create(
-                    post=post,
-                    content=follow_up_content,
-                    status='posted',
-                    reddit_comment_id=comment.id,
-                    posted_at=timezone.now()
-                )
+                with transaction.atomic():
+                    # Update post with follow-up info
+                    post.follow_up_sent = True
+                    post.follow_up_sent_at = timezone.now()
+                    post.follow_up_content = follow_up_content
+                    post.save()
+                    
+                    # Create reply record; the outbox dispatcher posts it
+                    reply = Reply.objects.create(
+                        post=post,
+                        content=follow_up_content,
+                        status='approved',
+                        approved_at=timezone.now()
+                    )
+                    enqueue_reply(reply, pool=pool, prefer_account=earlier.outbox.account if earlier else None)
                 
                 # Send notification
                 send_notification.delay(
                     notification_type='follow_up_sent',
-                    title=f'Follow-up sent for: {post.title[:50]}',
-                    message=f'Follow-up posted with {len(follow_up_content)} characters',
+                    title=f'Follow-up queued for: {post.title[:50]}',
+                    message=f'Follow-up of {len(follow_up_content)} characters queued for posting',
                     post_id=post.id
                 )
                 
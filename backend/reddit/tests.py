@@ -1,3 +1,777 @@
-from django.test import TestCase
+import html
+import json
+import os
+import random
+import tempfile
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+import redis
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from . import accounts
+from .accounts import AccountPool
+from .claims import PostClaimer
+from .fetcher import RedditFetcher
+from .matcher import HIGH_PRIORITY_KEYWORDS, KeywordMatcher
+from .models import Classification, Keyword, RedditAccount, RedditPost, Reply, ReplyOutbox, Subreddit, SystemConfig
+from .outbox import OutboxDispatcher, enqueue_reply
+from .ratelimit import RedisTokenBucket, TokenBucket, create_rate_budget
+from .refresh import RefreshSchedule
+from .scheduler import PollScheduler
+from .stream import SubmissionStreamer
 
-# Create your tests here.
+
+def create_post(subreddit, reddit_id, **fields):
+    fields.setdefault('created_at', timezone.now())
+    fields.setdefault('title', f'Post {reddit_id}')
+    fields.setdefault('content', '')
+    return RedditPost.objects.create(
+        reddit_id=reddit_id, author='someone', subreddit=subreddit,
+        url=f'https://reddit.com/{reddit_id}', **fields
+    )
+
+
+def own_comment(comment_id, link_id, content, created_at=None):
+    """One of the bot's comments as praw returns it, with the body HTML-escaped like Reddit does"""
+    return SimpleNamespace(
+        id=comment_id, link_id=link_id, body=html.escape(content, quote=False),
+        created_utc=(created_at or timezone.now()).timestamp(),
+    )
+
+
+def naive_match(text, keywords):
+    """The old per-keyword substring scan the matcher replaces"""
+    text = text.lower()
+    return sorted({k.lower() for k in keywords if k and k.strip() and k.lower() in text})
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    KEYWORDS = [
+        'python developer', 'python', 'django', 'django rest', 'web scraping', 'scrap',
+        'api', 'api integration', 'gpt', 'chatgpt', 'bot', 'telegram bot', 'a',
+    ]
+
+    def assertMatchesNaive(self, matcher, text, keywords, builtin_keywords):
+        result = matcher.match(text)
+        self.assertEqual(result.keywords, naive_match(text, keywords), text)
+        self.assertEqual(result.builtin_keywords, naive_match(text, builtin_keywords), text)
+
+    def test_contained_and_overlapping_keywords(self):
+        matcher = KeywordMatcher(self.KEYWORDS, builtin_keywords=[])
+        for text in [
+            'Looking for a Python Developer for Django REST work',
+            'Need web scraping + API integration, budget $500',
+            'ChatGPT telegram bot wanted',
+            'djangodjango rest apiapi',
+            '',
+        ]:
+            self.assertMatchesNaive(matcher, text, self.KEYWORDS, [])
+
+    def test_builtin_keywords_are_reported_separately(self):
+        matcher = KeywordMatcher(['django'])
+        text = 'Hiring a freelance developer to build a Django project'
+        self.assertMatchesNaive(matcher, text, ['django'], HIGH_PRIORITY_KEYWORDS)
+        self.assertEqual(matcher.match(text).score, len(set(matcher.match(text).matched)))
+
+    def test_blank_keywords_are_ignored(self):
+        matcher = KeywordMatcher(['', '  ', 'react'], builtin_keywords=[])
+        self.assertEqual(matcher.match('React app').keywords, ['react'])
+        self.assertFalse(KeywordMatcher([], builtin_keywords=[]).match('anything'))
+
+    def test_random_texts_match_naive_scan(self):
+        rng = random.Random(1234)
+        alphabet = 'abcdeghilnoprstuy '
+        keywords = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))).strip() or 'x'
+                    for _ in range(60)]
+        builtin_keywords = HIGH_PRIORITY_KEYWORDS + keywords[:10]
+        matcher = KeywordMatcher(keywords, builtin_keywords=builtin_keywords)
+        for _ in range(300):
+            text = ''.join(rng.choice(alphabet + 'ABCDE.') for _ in range(rng.randint(0, 120)))
+            self.assertMatchesNaive(matcher, text, keywords, builtin_keywords)
+
+
+@override_settings(REDDIT_REQUESTS_PER_MINUTE=1)
+class PollSchedulerBudgetTests(TestCase):
+    def setUp(self):
+        # 1 request per minute, half of it for polling: 30 polls an hour
+        SystemConfig.set_value('poll_budget_fraction', '0.5')
+        SystemConfig.set_value('poll_max_interval_minutes', '360')
+        self.scheduler = PollScheduler()
+
+    @staticmethod
+    def polls_per_hour(schedule):
+        return sum(60 / entry['interval_minutes'] for entry in schedule)
+
+    def test_schedule_inside_budget_is_unchanged(self):
+        schedule = [{'interval_minutes': 10.0}, {'interval_minutes': 20.0}]
+        self.scheduler._fit_to_budget(schedule)
+        self.assertEqual([entry['interval_minutes'] for entry in schedule], [10.0, 20.0])
+
+    def test_schedule_over_budget_is_stretched_proportionally(self):
+        schedule = [{'interval_minutes': 1.0}, {'interval_minutes': 2.0}, {'interval_minutes': 4.0}]
+        self.scheduler._fit_to_budget(schedule)
+        self.assertAlmostEqual(self.polls_per_hour(schedule), 30.0)
+        self.assertAlmostEqual(schedule[1]['interval_minutes'], 2 * schedule[0]['interval_minutes'])
+        self.assertAlmostEqual(schedule[2]['interval_minutes'], 4 * schedule[0]['interval_minutes'])
+
+    def test_stretched_intervals_stay_under_the_maximum(self):
+        schedule = [{'interval_minutes': 0.01}, {'interval_minutes': 300.0}]
+        self.scheduler._fit_to_budget(schedule)
+        factor = (60 / 0.01 + 60 / 300.0) / 30
+        self.assertAlmostEqual(schedule[0]['interval_minutes'], 0.01 * factor)
+        self.assertEqual(schedule[1]['interval_minutes'], 360.0)
+
+    def test_empty_schedule(self):
+        schedule = []
+        self.scheduler._fit_to_budget(schedule)
+        self.assertEqual(schedule, [])
+
+
+class PostClaimerTests(TestCase):
+    def setUp(self):
+        subreddit = Subreddit.objects.create(name='forhire')
+        self.posts = [create_post(subreddit, f'p{i}') for i in range(3)]
+
+    def test_leased_posts_are_not_claimed_twice(self):
+        first = PostClaimer('worker-a', lease_seconds=60)
+        second = PostClaimer('worker-b', lease_seconds=60)
+        self.assertEqual(len(first.claim(2)), 2)
+        claimed = second.claim(10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0].claimed_by, 'worker-b')
+        self.assertEqual(second.claim(10), [])
+        self.assertIsNone(second.claim_post(self.posts[0].id))
+
+    def test_expired_lease_is_reclaimed(self):
+        PostClaimer('worker-a', lease_seconds=60).claim(10)
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch('reddit.claims.timezone.now', return_value=later):
+            claimed = PostClaimer('worker-b', lease_seconds=60).claim(10)
+        self.assertEqual(len(claimed), 3)
+        self.assertTrue(all(post.claimed_by == 'worker-b' for post in claimed))
+        self.assertTrue(all(post.claim_expires_at == later + timedelta(seconds=60) for post in claimed))
+
+    def test_finish_only_releases_classified_posts(self):
+        claimer = PostClaimer('worker-a', lease_seconds=60)
+        claimed = claimer.claim(10)
+        Classification.objects.create(post=claimed[0], is_opportunity=False)
+        claimer.finish(claimed)
+
+        released = RedditPost.objects.get(id=claimed[0].id)
+        self.assertEqual((released.claimed_by, released.claim_expires_at), ('', None))
+        # The unclassified ones keep their lease, so they're retried once it expires
+        self.assertEqual(RedditPost.objects.filter(claimed_by='worker-a').count(), 2)
+        self.assertEqual(PostClaimer('worker-b', lease_seconds=60).claim(10), [])
+
+
+class RefreshScheduleTests(TestCase):
+    def setUp(self):
+        for key, value in {
+            'refresh_min_interval_minutes': 30, 'refresh_max_interval_hours': 24,
+            'refresh_age_factor': 0.25, 'refresh_activity_divisor': 4, 'refresh_horizon_days': 14,
+        }.items():
+            SystemConfig.set_value(key, value)
+        self.schedule = RefreshSchedule()
+
+    def test_interval_grows_with_age(self):
+        self.assertEqual(self.schedule.interval(timedelta(hours=8)), timedelta(hours=2))
+        self.assertEqual(self.schedule.interval(timedelta(hours=40)), timedelta(hours=10))
+
+    def test_activity_shortens_interval(self):
+        self.assertEqual(self.schedule.interval(timedelta(hours=40), active=True), timedelta(hours=2.5))
+
+    def test_interval_is_clamped(self):
+        self.assertEqual(self.schedule.interval(timedelta(0)), timedelta(minutes=30))
+        self.assertEqual(self.schedule.interval(timedelta(hours=3), active=True), timedelta(minutes=30))
+        self.assertEqual(self.schedule.interval(timedelta(days=10)), timedelta(hours=24))
+
+    def test_next_check_at_stops_at_horizon(self):
+        now = timezone.now()
+        self.assertEqual(
+            self.schedule.next_check_at(now - timedelta(hours=8), now=now), now + timedelta(hours=2)
+        )
+        self.assertIsNone(self.schedule.next_check_at(now - timedelta(days=14), now=now))
+
+    def test_due_returns_unchecked_and_overdue_rows(self):
+        subreddit = Subreddit.objects.create(name='forhire')
+        now = timezone.now()
+        unchecked = create_post(subreddit, 'new', created_at=now - timedelta(hours=1))
+        overdue = create_post(subreddit, 'overdue', next_check_at=now - timedelta(minutes=1))
+        create_post(subreddit, 'later', next_check_at=now + timedelta(hours=1))
+        create_post(subreddit, 'expired', created_at=now - timedelta(days=20))
+
+        due = list(self.schedule.due(RedditPost.objects.all(), 'created_at', now=now))
+        self.assertEqual(due, [unchecked, overdue])
+
+
+@override_settings(REDDIT_USERNAME='bot')
+class OutboxDispatcherTests(TestCase):
+    def setUp(self):
+        for key, value in {
+            'reply_min_spacing_seconds': 0, 'reply_spacing_jitter_seconds': 0,
+            'outbox_retry_backoff_seconds': 60, 'outbox_max_attempts': 3,
+        }.items():
+            SystemConfig.set_value(key, value)
+        post = create_post(Subreddit.objects.create(name='forhire'), 'abc123')
+        self.reply = Reply.objects.create(post=post, content='Happy to help, sent you a DM.', status='approved')
+
+        # Reddit as seen from the bot account: the thread and the account's own comments
+        self.reddit = mock.MagicMock()
+        self.submit = self.reddit.submission.return_value.reply
+        self.submit.return_value = SimpleNamespace(id='c1')
+        self.own_comments = []
+        self.reddit.redditor.return_value.comments.new.side_effect = lambda limit: list(self.own_comments)
+        for name, value in {'client': self.reddit, 'rate_budget': mock.MagicMock()}.items():
+            patcher = mock.patch.object(AccountPool, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_due(self):
+        ReplyOutbox.objects.filter(state='queued').update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_enqueue_is_idempotent(self):
+        entry, created = enqueue_reply(self.reply)
+        again, created_again = enqueue_reply(self.reply)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.id, entry.id)
+        self.assertEqual(entry.idempotency_key, f't3_abc123:reply-{self.reply.id}')
+        self.assertEqual(entry.account, 'bot')
+
+    def test_double_dispatch_posts_once(self):
+        enqueue_reply(self.reply)
+        enqueue_reply(self.reply)
+        self.assertEqual(OutboxDispatcher('worker-a').dispatch(), 1)
+        self.assertEqual(OutboxDispatcher('worker-b').dispatch(), 0)
+
+        self.submit.assert_called_once_with(self.reply.content)
+        self.reply.refresh_from_db()
+        self.assertEqual((self.reply.status, self.reply.reddit_comment_id), ('posted', 'c1'))
+        self.assertEqual(ReplyOutbox.objects.get().state, 'posted')
+
+    def test_failed_attempts_back_off_then_fail(self):
+        self.submit.side_effect = Exception('503 Service Unavailable')
+        enqueue_reply(self.reply)
+        dispatcher = OutboxDispatcher('worker-a')
+
+        before = timezone.now()
+        self.assertEqual(dispatcher.dispatch(), 0)
+        entry = ReplyOutbox.objects.get()
+        self.assertEqual((entry.state, entry.attempts), ('queued', 1))
+        self.assertEqual(entry.last_error, '503 Service Unavailable')
+        self.assertGreaterEqual(entry.available_at, before + timedelta(seconds=60))
+
+        # Not due yet, so nothing is attempted
+        self.assertEqual(dispatcher.dispatch(), 0)
+        self.assertEqual(self.submit.call_count, 1)
+
+        self.make_due()
+        before = timezone.now()
+        dispatcher.dispatch()
+        entry.refresh_from_db()
+        self.assertEqual((entry.state, entry.attempts), ('queued', 2))
+        self.assertGreaterEqual(entry.available_at, before + timedelta(seconds=120))
+
+        self.make_due()
+        dispatcher.dispatch()
+        entry.refresh_from_db()
+        self.reply.refresh_from_db()
+        self.assertEqual((entry.state, entry.attempts), ('failed', 3))
+        self.assertEqual(self.reply.status, 'failed')
+        self.assertEqual(self.submit.call_count, 3)
+
+    def test_retry_succeeds_after_failure(self):
+        self.submit.side_effect = [Exception('503 Service Unavailable'), SimpleNamespace(id='c2')]
+        enqueue_reply(self.reply)
+        dispatcher = OutboxDispatcher('worker-a')
+        dispatcher.dispatch()
+        self.make_due()
+        self.assertEqual(dispatcher.dispatch(), 1)
+        entry = ReplyOutbox.objects.get()
+        self.assertEqual((entry.state, entry.attempts, entry.reddit_comment_id), ('posted', 2, 'c2'))
+
+    def test_retry_finds_comment_of_timed_out_attempt(self):
+        # The request timed out after Reddit had already created the comment
+        def post_then_time_out(content):
+            self.own_comments.append(own_comment('c9', 't3_abc123', content))
+            raise TimeoutError('read timed out')
+
+        self.submit.side_effect = post_then_time_out
+        self.own_comments.append(own_comment('c8', 't3_other', self.reply.content))
+        enqueue_reply(self.reply)
+        dispatcher = OutboxDispatcher('worker-a')
+        dispatcher.dispatch()
+        self.make_due()
+        self.assertEqual(dispatcher.dispatch(), 1)
+
+        self.assertEqual(self.submit.call_count, 1)
+        self.reddit.redditor.assert_called_with('bot')
+        entry = ReplyOutbox.objects.get()
+        self.assertEqual((entry.state, entry.reddit_comment_id), ('posted', 'c9'))
+
+    def test_retry_finds_comment_with_escaped_characters(self):
+        self.reply.content = 'Q&A bots <under> $500 & fast'
+        self.reply.save()
+
+        def post_then_time_out(content):
+            self.own_comments.append(own_comment('c9', 't3_abc123', content))
+            raise TimeoutError('read timed out')
+
+        self.submit.side_effect = post_then_time_out
+        enqueue_reply(self.reply)
+        dispatcher = OutboxDispatcher('worker-a')
+        dispatcher.dispatch()
+        self.assertEqual(self.own_comments[0].body, 'Q&amp;A bots &lt;under&gt; $500 &amp; fast')
+        self.make_due()
+        self.assertEqual(dispatcher.dispatch(), 1)
+
+        self.assertEqual(self.submit.call_count, 1)
+        self.assertEqual(ReplyOutbox.objects.get().reddit_comment_id, 'c9')
+
+    def test_retry_ignores_same_text_posted_before_the_entry(self):
+        self.submit.side_effect = [TimeoutError('read timed out'), SimpleNamespace(id='c2')]
+        self.own_comments.append(
+            own_comment('c0', 't3_abc123', self.reply.content, created_at=timezone.now() - timedelta(days=1))
+        )
+        enqueue_reply(self.reply)
+        dispatcher = OutboxDispatcher('worker-a')
+        dispatcher.dispatch()
+        self.make_due()
+        self.assertEqual(dispatcher.dispatch(), 1)
+        self.assertEqual(ReplyOutbox.objects.get().reddit_comment_id, 'c2')
+
+    def test_expired_lease_is_reclaimed_and_checked_first(self):
+        entry, _ = enqueue_reply(self.reply)
+        # A dispatcher claimed it and died, maybe after posting
+        ReplyOutbox.objects.filter(id=entry.id).update(
+            state='in_flight', attempts=1, claimed_by='dead-worker',
+            lease_expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        self.assertEqual(OutboxDispatcher('worker-a').dispatch(), 0)
+
+        ReplyOutbox.objects.filter(id=entry.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.own_comments.append(own_comment('c7', 't3_abc123', self.reply.content))
+        self.assertEqual(OutboxDispatcher('worker-a').dispatch(), 1)
+        self.submit.assert_not_called()
+        entry.refresh_from_db()
+        self.assertEqual((entry.claimed_by, entry.attempts, entry.reddit_comment_id), ('worker-a', 2, 'c7'))
+
+
+class RecordingExportTests(TestCase):
+    def test_export_includes_classifications_and_replies(self):
+        post = create_post(Subreddit.objects.create(name='forhire'), 'abc123', title='Need a Django dev')
+        Classification.objects.create(
+            post=post, is_opportunity=True, confidence_score=0.9, priority='high',
+            urgency_level='high', summary='Wants a Django developer',
+        )
+        Reply.objects.create(post=post, content='Happy to help.')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recording.json')
+            call_command('run_fake_services', export=path, stdout=open(os.devnull, 'w'))
+            with open(path) as f:
+                recording = json.load(f)
+
+        self.assertEqual([item['id'] for item in recording['listings']['forhire']], ['abc123'])
+        classification = recording['classifications']['Need a Django dev']
+        self.assertEqual(classification['urgency'], 'high')
+        self.assertTrue(classification['is_opportunity'])
+        self.assertEqual(recording['replies'], {'Need a Django dev': 'Happy to help.'})
+
+
+@override_settings(REDDIT_RATE_BUDGET_BACKEND='local', REDDIT_USERNAME='bot', REDDIT_PASSWORD='secret')
+class AccountPoolTests(TestCase):
+    def setUp(self):
+        accounts._sessions.clear()
+        self.addCleanup(accounts._sessions.clear)
+        self.forhire = Subreddit.objects.create(name='forhire')
+        self.webdev = Subreddit.objects.create(name='webdev')
+        post = create_post(self.forhire, 'abc123')
+        self.replies = [Reply.objects.create(post=post, content=f'Reply {i}') for i in range(3)]
+
+    def create_account(self, username, subreddits=(), **fields):
+        account = RedditAccount.objects.create(username=username, password=f'{username}-password', **fields)
+        account.subreddits.set(subreddits)
+        return account
+
+    def queue(self, account, count, state='queued'):
+        for reply in self.replies[:count]:
+            ReplyOutbox.objects.create(
+                reply=reply, idempotency_key=f'key-{reply.id}', account=account, content=reply.content,
+                state=state, available_at=timezone.now(), posted_at=timezone.now() if state == 'posted' else None,
+            )
+
+    def test_chooses_least_loaded_eligible_account(self):
+        self.create_account('alice')
+        self.create_account('bob')
+        self.create_account('carol', is_active=False)
+        self.queue('alice', 2)
+        self.assertEqual(AccountPool().choose(self.forhire.id), 'bob')
+        self.assertEqual(AccountPool().choose(self.forhire.id, exclude={'bob'}), 'alice')
+
+    def test_recent_posts_break_ties(self):
+        self.create_account('alice')
+        self.create_account('bob')
+        self.queue('alice', 1, state='posted')
+        self.assertEqual(AccountPool().choose(self.forhire.id), 'bob')
+
+    def test_batch_spreads_across_accounts(self):
+        self.create_account('alice')
+        self.create_account('bob')
+        pool = AccountPool()
+        self.assertEqual([pool.choose(self.forhire.id) for _ in range(4)], ['alice', 'bob', 'alice', 'bob'])
+
+    def test_subreddit_restrictions_and_cooldowns(self):
+        self.create_account('alice', subreddits=[self.webdev])
+        bob = self.create_account('bob')
+        pool = AccountPool()
+        self.assertEqual(pool.choose(self.webdev.id, exclude={'bob'}), 'alice')
+        self.assertIsNone(pool.choose(self.forhire.id, exclude={'bob'}))
+
+        until = pool.start_cooldown('bob', 120)
+        self.assertFalse(pool.is_available('bob', self.forhire.id))
+        self.assertIsNone(pool.choose(self.forhire.id))
+        self.assertEqual(pool.next_available_at(self.forhire.id), until)
+        bob.refresh_from_db()
+        self.assertEqual(bob.cooldown_until, until)
+        self.assertTrue(AccountPool().is_available('bob', self.forhire.id, now=until + timedelta(seconds=1)))
+
+    def test_settings_account_without_pool_rows(self):
+        pool = AccountPool()
+        self.assertTrue(pool.uses_settings_account)
+        self.assertEqual(pool.choose(self.forhire.id), 'bot')
+        self.assertIsNone(pool.choose(self.forhire.id, exclude={'bot'}))
+
+    def test_each_account_has_its_own_budget(self):
+        self.create_account('alice', requests_per_minute=30)
+        self.create_account('bob', requests_per_minute=90)
+        pool = AccountPool()
+        with mock.patch('reddit.accounts.create_reddit_client'):
+            alice, bob = pool.rate_budget('alice'), pool.rate_budget('bob')
+            self.assertIsInstance(alice, TokenBucket)
+            self.assertEqual((alice.capacity, alice.rate), (30, 0.5))
+            self.assertEqual((bob.capacity, bob.rate), (90, 1.5))
+            self.assertTrue(alice.try_acquire(30))
+            self.assertFalse(alice.try_acquire())
+            self.assertTrue(bob.try_acquire())
+
+            # Shared by later pools, and rebuilt when the account changes
+            self.assertIs(AccountPool().rate_budget('alice'), alice)
+            RedditAccount.objects.filter(username='alice').update(
+                requests_per_minute=60, updated_at=timezone.now() + timedelta(seconds=1)
+            )
+            self.assertEqual(AccountPool().rate_budget('alice').capacity, 60)
+
+    def test_clients_are_reused_across_pools(self):
+        with mock.patch('reddit.accounts.create_reddit_client') as create_client:
+            client = AccountPool().client('bot')
+            self.assertIs(AccountPool().client('bot'), client)
+            create_client.assert_called_once_with(authenticated=True)
+
+            self.create_account('alice')
+            AccountPool().client('alice')
+            AccountPool().client('alice')
+            self.assertEqual(create_client.call_count, 2)
+
+        with override_settings(REDDIT_PASSWORD='rotated'), \
+                mock.patch('reddit.accounts.create_reddit_client') as create_client:
+            RedditAccount.objects.all().delete()
+            AccountPool().client('bot')
+            create_client.assert_called_once_with(authenticated=True)
+
+
+@override_settings(REDDIT_ACCOUNT_ENCRYPTION_KEY='')
+class EncryptedAccountSecretsTests(TestCase):
+    def raw(self, account, column):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {column} FROM reddit_redditaccount WHERE id = %s', [account.id])
+            return cursor.fetchone()[0]
+
+    def test_secrets_are_encrypted_at_rest(self):
+        account = RedditAccount.objects.create(username='alice', password='hunter2', client_secret='s3cret')
+        self.assertNotIn('hunter2', self.raw(account, 'password'))
+        self.assertNotIn('s3cret', self.raw(account, 'client_secret'))
+        account = RedditAccount.objects.get(id=account.id)
+        self.assertEqual((account.password, account.client_secret), ('hunter2', 's3cret'))
+
+    def test_plaintext_rows_are_read_and_encrypted_on_save(self):
+        account = RedditAccount.objects.create(username='alice', password='x')
+        with connection.cursor() as cursor:
+            # A row saved before the field was encrypted
+            cursor.execute('UPDATE reddit_redditaccount SET password = %s WHERE id = %s', ['legacy', account.id])
+        account = RedditAccount.objects.get(id=account.id)
+        self.assertEqual(account.password, 'legacy')
+        account.save()
+        self.assertNotEqual(self.raw(account, 'password'), 'legacy')
+        self.assertEqual(RedditAccount.objects.get(id=account.id).password, 'legacy')
+
+
+def submission(reddit_id, created_at, subreddit='forhire', title='Need a Django developer'):
+    """A praw submission as the fetcher reads it"""
+    return SimpleNamespace(
+        id=reddit_id, fullname=f't3_{reddit_id}', title=title, selftext='Budget $500',
+        created_utc=created_at.timestamp(), author='someone', permalink=f'/r/{subreddit}/comments/{reddit_id}/',
+        score=1, num_comments=0, subreddit=SimpleNamespace(display_name=subreddit),
+    )
+
+
+class FakeListing:
+    """r/<name> with a /new listing that honours `before` like Reddit does"""
+
+    def __init__(self, submissions, deleted=()):
+        self.submissions = sorted(submissions, key=lambda item: item.created_utc, reverse=True)
+        self.deleted = set(deleted)
+        self.requests = []
+
+    def new(self, limit=None, params=None):
+        before = (params or {}).get('before')
+        self.requests.append(before)
+        if before is None:
+            return iter(self.submissions[:limit])
+        names = [item.fullname for item in self.submissions]
+        if before in self.deleted or before not in names:
+            return iter([])
+        return iter(self.submissions[:names.index(before)][:limit])
+
+    def hot(self, limit=None):
+        return iter([])
+
+
+@override_settings(REDDIT_FETCH_CONCURRENCY=1)
+class FetcherCursorTests(TestCase):
+    def setUp(self):
+        Keyword.objects.create(keyword='django')
+        self.now = timezone.now()
+        self.subreddit = Subreddit.objects.create(
+            name='forhire', last_seen_fullname='t3_gone',
+            last_seen_created_at=self.now - timedelta(hours=1), cursor_verified_at=self.now,
+        )
+
+    def fetcher(self, listing):
+        reddit = mock.MagicMock()
+        reddit.subreddit.return_value = listing
+        with mock.patch('reddit.fetcher.create_reddit_client', return_value=reddit):
+            fetcher = RedditFetcher()
+        fetcher.rate_budget = mock.MagicMock()
+        return fetcher
+
+    def test_deleted_cursor_falls_back_to_walking_new(self):
+        listing = FakeListing([
+            submission('new2', self.now - timedelta(minutes=5)),
+            submission('new1', self.now - timedelta(minutes=30)),
+            submission('old', self.now - timedelta(hours=2)),
+        ], deleted={'t3_gone'})
+        saved = self.fetcher(listing).fetch_and_save(hours_back=24)
+
+        self.assertEqual(sorted(post.reddit_id for post in saved), ['new1', 'new2'])
+        self.assertEqual(listing.requests, ['t3_gone', None])
+        self.subreddit.refresh_from_db()
+        self.assertEqual(self.subreddit.last_seen_fullname, 't3_new2')
+
+        # The next run is back to a single `before` request
+        listing.submissions.insert(0, submission('new3', self.now))
+        listing.requests = []
+        saved = self.fetcher(listing).fetch_and_save(hours_back=24)
+        self.assertEqual([post.reddit_id for post in saved], ['new3'])
+        self.assertEqual(listing.requests, ['t3_new2'])
+
+    def test_quiet_subreddit_saves_nothing(self):
+        listing = FakeListing([submission('old', self.now - timedelta(hours=2))])
+        self.assertEqual(self.fetcher(listing).fetch_and_save(hours_back=24), [])
+        self.assertEqual(RedditPost.objects.count(), 0)
+
+    def test_cursor_stays_put_when_saving_fails(self):
+        listing = FakeListing([submission('new1', self.now - timedelta(minutes=5))], deleted={'t3_gone'})
+        fetcher = self.fetcher(listing)
+        with mock.patch.object(RedditFetcher, 'save_posts', side_effect=RuntimeError('database is down')):
+            with self.assertRaises(RuntimeError):
+                fetcher.fetch_and_save(hours_back=24)
+        self.subreddit.refresh_from_db()
+        self.assertEqual(self.subreddit.last_seen_fullname, 't3_gone')
+
+        with mock.patch.object(RedditFetcher, '_bulk_save_chunk', side_effect=RuntimeError('bulk insert failed')), \
+                mock.patch.object(RedditPost.objects, 'create', side_effect=RuntimeError('insert failed')):
+            self.assertEqual(fetcher.fetch_and_save(hours_back=24), [])
+        self.subreddit.refresh_from_db()
+        self.assertEqual(self.subreddit.last_seen_fullname, 't3_gone')
+
+        # Once the posts are saved the cursor moves past them
+        self.assertEqual(len(fetcher.fetch_and_save(hours_back=24)), 1)
+        self.subreddit.refresh_from_db()
+        self.assertEqual(self.subreddit.last_seen_fullname, 't3_new1')
+
+
+class SavePostsTests(TestCase):
+    def setUp(self):
+        self.subreddit = Subreddit.objects.create(name='forhire')
+
+    def post_data(self, reddit_id):
+        return {
+            'reddit_id': reddit_id, 'title': f'Post {reddit_id}', 'content': '', 'author': 'someone',
+            'subreddit_id': self.subreddit.id, 'url': f'https://reddit.com/{reddit_id}',
+            'created_at': timezone.now(),
+        }
+
+    @staticmethod
+    def fetcher():
+        with mock.patch('reddit.fetcher.create_reddit_client'):
+            return RedditFetcher()
+
+    def test_existing_posts_are_skipped(self):
+        create_post(self.subreddit, 'a')
+        fetcher = self.fetcher()
+        saved = fetcher.save_posts([self.post_data('a'), self.post_data('b'), self.post_data('b')])
+        self.assertEqual([post.reddit_id for post in saved], ['b'])
+        self.assertTrue(all(post.pk for post in saved))
+
+    def test_posts_inserted_concurrently_are_not_reported_as_created(self):
+        bulk_create = RedditPost.objects.bulk_create
+
+        def another_worker_first(objs, **kwargs):
+            # Another fetch inserts 'b' between our existence check and our INSERT
+            RedditPost.objects.create(**self.post_data('b'))
+            return bulk_create(objs, **kwargs)
+
+        fetcher = self.fetcher()
+        with mock.patch.object(RedditPost.objects, 'bulk_create', side_effect=another_worker_first):
+            saved = fetcher.save_posts([self.post_data('a'), self.post_data('b')])
+        self.assertEqual([post.reddit_id for post in saved], ['a'])
+        self.assertEqual(RedditPost.objects.count(), 2)
+
+
+class ConcurrentFetchTests(TestCase):
+    def setUp(self):
+        Keyword.objects.create(keyword='django')
+        self.now = timezone.now()
+        self.subreddits = [Subreddit.objects.create(name=name) for name in ('forhire', 'broken', 'slavelabour')]
+        self.listings = {
+            'forhire': FakeListing([submission('a1', self.now), submission('a2', self.now - timedelta(minutes=5))]),
+            'slavelabour': FakeListing([submission('b1', self.now, subreddit='slavelabour')]),
+        }
+        self.client_threads = []
+
+    def create_client(self):
+        def subreddit(name):
+            self.client_threads.append((id(reddit), threading.get_ident()))
+            if name not in self.listings:
+                raise RuntimeError('403 Forbidden')
+            return self.listings[name]
+
+        reddit = mock.MagicMock()
+        reddit.subreddit.side_effect = subreddit
+        return reddit
+
+    def test_subreddits_are_fetched_in_parallel_from_one_budget(self):
+        with mock.patch('reddit.fetcher.create_reddit_client', side_effect=self.create_client):
+            fetcher = RedditFetcher()
+            fetcher.rate_budget = TokenBucket(capacity=100, rate=0.001)
+            # Warm the keyword matcher and subreddit map, as fetch_posts does
+            fetcher._contains_keywords('')
+            fetcher._get_subreddit_id('forhire')
+            results = fetcher.fetch_subreddits_concurrently(self.subreddits, self.now - timedelta(hours=1), max_workers=3)
+
+        self.assertEqual([result.subreddit_name for result in results], ['forhire', 'broken', 'slavelabour'])
+        self.assertEqual(sorted(post['reddit_id'] for post in results[0].posts), ['a1', 'a2'])
+        self.assertFalse(results[1].ok)
+        self.assertIn('403', str(results[1].error))
+        self.assertEqual([post['reddit_id'] for post in results[2].posts], ['b1'])
+        self.assertEqual(results[2].cursor.id, 'b1')
+
+        # One /new and one /hot request each for the subreddits that answered
+        self.assertEqual(round(fetcher.rate_budget.available), 96)
+        # Workers never touch the main thread's praw client, and never share theirs across threads
+        fetcher.reddit.subreddit.assert_not_called()
+        threads_by_client = {}
+        for client, thread in self.client_threads:
+            threads_by_client.setdefault(client, set()).add(thread)
+        self.assertTrue(all(len(threads) == 1 for threads in threads_by_client.values()))
+
+
+class RedisTokenBucketTests(SimpleTestCase):
+    def bucket(self, *responses):
+        client = mock.MagicMock()
+        self.script = client.register_script.return_value
+        self.script.side_effect = list(responses)
+        return RedisTokenBucket(client, 'reddit:ratelimit:test', capacity=60, rate=1)
+
+    def test_waits_for_the_time_the_script_reports(self):
+        bucket = self.bucket(['0.5', '0'], ['0', '0'])
+        with mock.patch('reddit.ratelimit.time.sleep') as sleep:
+            self.assertTrue(bucket.acquire())
+        sleep.assert_called_once_with(0.5)
+        self.assertEqual(self.script.call_count, 2)
+        keys = self.script.call_args.kwargs['keys']
+        capacity, rate, _, tokens, ttl = self.script.call_args.kwargs['args']
+        self.assertEqual((keys, capacity, rate, tokens, ttl), (['reddit:ratelimit:test'], 60, 1, 1, 120))
+
+        bucket = self.bucket(['2', '0'])
+        self.assertFalse(bucket.try_acquire())
+
+    def test_gives_up_at_the_timeout(self):
+        bucket = self.bucket(['30', '0'])
+        with mock.patch('reddit.ratelimit.time.sleep') as sleep:
+            self.assertFalse(bucket.acquire(timeout=0))
+        sleep.assert_not_called()
+
+    def test_falls_back_to_a_local_bucket_while_redis_is_down(self):
+        bucket = self.bucket(redis.ConnectionError('refused'), redis.ConnectionError('refused'), ['0', '59'])
+        with self.assertLogs('reddit.ratelimit', 'WARNING') as logs:
+            self.assertTrue(bucket.acquire())
+            self.assertTrue(bucket.try_acquire())
+        self.assertEqual(len(logs.records), 1)
+        self.assertTrue(bucket.using_fallback)
+        self.assertEqual(round(bucket.fallback.available), 58)
+
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.using_fallback)
+
+    @override_settings(REDDIT_RATE_BUDGET_BACKEND='redis')
+    def test_redis_backend_shares_one_key_per_budget(self):
+        with mock.patch('redis.Redis.from_url'):
+            budget = create_rate_budget('account:alice', 30)
+        self.assertIsInstance(budget, RedisTokenBucket)
+        self.assertEqual(budget.key, 'reddit:ratelimit:account:alice')
+        self.assertEqual((budget.capacity, budget.rate), (30, 0.5))
+        with override_settings(REDDIT_RATE_BUDGET_BACKEND='local'):
+            self.assertIsInstance(create_rate_budget('app', 30), TokenBucket)
+
+
+class SubmissionStreamerTests(TestCase):
+    def setUp(self):
+        Keyword.objects.create(keyword='django')
+        self.subreddit = Subreddit.objects.create(name='forhire')
+        self.reddit = mock.MagicMock()
+        with mock.patch('reddit.fetcher.create_reddit_client', return_value=self.reddit):
+            self.streamer = SubmissionStreamer(fetcher=RedditFetcher())
+        self.streamer.fetcher.rate_budget = mock.MagicMock()
+        queue = mock.patch('reddit.tasks.process_post_with_ai.delay')
+        self.queued = queue.start()
+        self.addCleanup(queue.stop)
+
+    def test_interrupt_during_catch_up_stops_cleanly(self):
+        with mock.patch.object(RedditFetcher, 'fetch_and_save', side_effect=KeyboardInterrupt):
+            stats = self.streamer.run()
+        self.assertEqual(stats['seen'], 0)
+        self.reddit.subreddit.assert_not_called()
+
+    def test_interrupt_during_reconnect_backoff_saves_buffered_posts(self):
+        posted = timezone.now()
+
+        def submissions(pause_after=None):
+            yield submission('new1', posted)
+            raise RuntimeError('503 Service Unavailable')
+
+        self.reddit.subreddit.return_value.stream.submissions.side_effect = submissions
+        with mock.patch('reddit.stream.time.sleep', side_effect=KeyboardInterrupt) as sleep:
+            stats = self.streamer.run(catch_up=False)
+
+        sleep.assert_called_once()
+        self.assertEqual((stats['seen'], stats['saved']), (1, 1))
+        self.assertTrue(RedditPost.objects.filter(reddit_id='new1').exists())
+        self.queued.assert_called_once()
+        self.subreddit.refresh_from_db()
+        self.assertEqual(self.subreddit.last_seen_fullname, 't3_new1')
@@ -0,0 +1,5 @@
+# Load the Celery app with Django so tasks queued from web and management
+# processes use the configured broker and queue routes
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
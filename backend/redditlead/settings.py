@@ -171,9 +171,92 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Redis redelivers unacknowledged tasks after this long, and ETA tasks (outbox
+# wake-ups at paced slots) stay unacknowledged until they run
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': config('CELERY_VISIBILITY_TIMEOUT_SECONDS', default=12 * 3600, cast=int),
+}
+
+# One queue per pipeline stage, so a slow stage (posting sleeps between replies)
+# can't starve the others. Start one worker per queue: python manage.py run_worker <queue>
+CELERY_TASK_ROUTES = {
+    'reddit.tasks.fetch_reddit_posts': {'queue': 'fetch'},
+    'reddit.tasks.fetch_due_subreddits': {'queue': 'fetch'},
+    'reddit.tasks.process_posts_with_ai': {'queue': 'classify'},
+    'reddit.tasks.process_post_with_ai': {'queue': 'classify'},
+    'langagent.tasks.index_new_posts': {'queue': 'classify'},
+    'reddit.tasks.generate_post_reply': {'queue': 'reply'},
+    'reddit.tasks.post_replies_to_reddit': {'queue': 'post'},
+    'reddit.tasks.dispatch_reply_outbox': {'queue': 'post'},
+    'reddit.tasks.send_follow_ups': {'queue': 'post'},
+    'reddit.tasks.update_engagement_metrics': {'queue': 'engagement'},
+    'reddit.tasks.monitor_old_leads': {'queue': 'engagement'},
+    'reddit.tasks.send_notification': {'queue': 'notify'},
+    'reddit.tasks.send_whatsapp_notification': {'queue': 'notify'},
+    'reddit.tasks.send_notifications': {'queue': 'notify'},
+}
+# Worker settings per queue; 'celery' is the default queue for maintenance and learning tasks.
+# A prefetch multiplier of 1 keeps long tasks from sitting behind each other in one worker.
+CELERY_QUEUE_WORKERS = {
+    'fetch': {'concurrency': config('CELERY_FETCH_CONCURRENCY', default=2, cast=int), 'prefetch_multiplier': 1},
+    'classify': {'concurrency': config('CELERY_CLASSIFY_CONCURRENCY', default=4, cast=int), 'prefetch_multiplier': 1},
+    'reply': {'concurrency': config('CELERY_REPLY_CONCURRENCY', default=4, cast=int), 'prefetch_multiplier': 1},
+    'post': {'concurrency': config('CELERY_POST_CONCURRENCY', default=1, cast=int), 'prefetch_multiplier': 1},
+    'engagement': {'concurrency': config('CELERY_ENGAGEMENT_CONCURRENCY', default=1, cast=int), 'prefetch_multiplier': 1},
+    'notify': {'concurrency': config('CELERY_NOTIFY_CONCURRENCY', default=4, cast=int), 'prefetch_multiplier': 4},
+    'celery': {'concurrency': config('CELERY_DEFAULT_CONCURRENCY', default=2, cast=int), 'prefetch_multiplier': 1},
+}
+CELERY_BEAT_SCHEDULE = {
+    # Cheap when nothing is due; each subreddit carries its own poll interval
+    'fetch-due-subreddits': {
+        'task': 'reddit.tasks.fetch_due_subreddits',
+        'schedule': 60.0,
+    },
+    # Wakes up for retries and expired leases; new entries schedule their own wake-up
+    'dispatch-reply-outbox': {
+        'task': 'reddit.tasks.dispatch_reply_outbox',
+        'schedule': 60.0,
+    },
+    # Only rows whose next_check_at has passed are refreshed (see reddit.refresh)
+    'update-engagement-metrics': {
+        'task': 'reddit.tasks.update_engagement_metrics',
+        'schedule': 300.0,
+    },
+    'monitor-old-leads': {
+        'task': 'reddit.tasks.monitor_old_leads',
+        'schedule': 300.0,
+    },
+    # Posts already in the semantic index are skipped, so the overlap only costs a query
+    'index-new-posts': {
+        'task': 'langagent.tasks.index_new_posts',
+        'schedule': 900.0,
+        'kwargs': {'hours_back': 2},
+    },
+    'prune-classification-cache': {
+        'task': 'langagent.tasks.prune_classification_cache',
+        'schedule': 3600.0,
+    },
+}
 
 # OpenAI Configuration
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+OPENAI_TIMEOUT_SECONDS = config('OPENAI_TIMEOUT_SECONDS', default=60, cast=float)
+# Point the OpenAI client elsewhere, e.g. the fake services (http://127.0.0.1:8765/v1); empty means api.openai.com
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='')
+
+# OpenAI rate-limit governor, shared by all workers through Redis ('redis' or 'local')
+OPENAI_GOVERNOR_BACKEND = config('OPENAI_GOVERNOR_BACKEND', default='redis')
+OPENAI_MAX_CONCURRENCY = config('OPENAI_MAX_CONCURRENCY', default=8, cast=int)
+OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=4, cast=int)
+OPENAI_CIRCUIT_FAILURES = config('OPENAI_CIRCUIT_FAILURES', default=5, cast=int)
+OPENAI_CIRCUIT_COOLDOWN_SECONDS = config('OPENAI_CIRCUIT_COOLDOWN_SECONDS', default=60, cast=int)
+
+# Semantic lead index ('openai' embeddings, or 'hashing' for a local deterministic stand-in)
+EMBEDDING_BACKEND = config('EMBEDDING_BACKEND', default='openai')
+EMBEDDING_MODEL = config('EMBEDDING_MODEL', default='text-embedding-3-small')
+EMBEDDING_DIMENSIONS = config('EMBEDDING_DIMENSIONS', default=256, cast=int)
+SEMANTIC_INDEX_DIR = config('SEMANTIC_INDEX_DIR', default=str(BASE_DIR / 'semantic_index'))
+SEMANTIC_CENTROIDS = config('SEMANTIC_CENTROIDS', default=8, cast=int)
 
 # Reddit Configuration
 REDDIT_CLIENT_ID = config('REDDIT_CLIENT_ID', default='')
@@ -181,6 +264,16 @@ REDDIT_CLIENT_SECRET = config('REDDIT_CLIENT_SECRET', default='')
 REDDIT_USER_AGENT = config('REDDIT_USER_AGENT', default='RedditLead.AI/1.0')
 REDDIT_USERNAME = config('REDDIT_USERNAME', default='')
 REDDIT_PASSWORD = config('REDDIT_PASSWORD', default='')
+# Point praw elsewhere, e.g. the fake services (http://127.0.0.1:8765); empty means reddit.com
+REDDIT_API_BASE_URL = config('REDDIT_API_BASE_URL', default='')
+# Reddit request budget, shared by all workers through Redis ('redis' or 'local').
+# With 'local' every process gets the full REDDIT_REQUESTS_PER_MINUTE, so divide it by the worker count.
+REDDIT_RATE_BUDGET_BACKEND = config('REDDIT_RATE_BUDGET_BACKEND', default='redis')
+REDDIT_REQUESTS_PER_MINUTE = config('REDDIT_REQUESTS_PER_MINUTE', default=100, cast=int)
+REDDIT_FETCH_CONCURRENCY = config('REDDIT_FETCH_CONCURRENCY', default=4, cast=int)
+# Fernet key for RedditAccount passwords and client secrets; empty derives one from SECRET_KEY
+REDDIT_ACCOUNT_ENCRYPTION_KEY = config('REDDIT_ACCOUNT_ENCRYPTION_KEY', default='')
+REDDIT_SAVE_BATCH_SIZE = config('REDDIT_SAVE_BATCH_SIZE', default=500, cast=int)
 
 # Telegram Configuration
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
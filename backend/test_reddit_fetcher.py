@@ -162,7 +162,7 @@ if __name__ == "__main__":
         if leads:
             print(f"\n🎯 Found {len(leads)} potential leads!")
             for lead in leads[:3]:
-                print(f"  - {lead['title'][:60]}... (r/{lead['subreddit'].name})")
+                print(f"  - {lead['title'][:60]}... ({lead['url']})")
     else:
         # Run full test
         success = test_reddit_fetcher()
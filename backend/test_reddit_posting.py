@@ -60,7 +60,7 @@ def test_reddit_posting():
         
         # Test posting (but don't actually post)
         print("\n⚠️  Note: This is a test - no actual posting will occur")
-        print("To actually post, you would call: poster._post_reply(test_reply)")
+        print("To actually post, queue it with reddit.outbox.enqueue_reply(test_reply)")
         
         return True
         